@@ -0,0 +1 @@
+"""Бенчмарки горячих путей бота (запускаются вручную, не требуют подключения к Discord)."""
@@ -0,0 +1,172 @@
+"""
+Микробенчмарк слушателей Logging: ленивые эмбеды против сборки «до проверки».
+
+Гоняет одни и те же синтетические события (правка/удаление сообщения,
+смена ника, голос) через два пути:
+- lazy  — слушатели кога: маска событий сервера проверяется первой,
+          эмбед собирается только если событие будет доставлено
+- eager — как раньше: эмбед собирается всегда, потом send_log проверяет
+
+для серверов без канала логов, с половиной выключенных событий и со всеми
+включёнными. Печатает время и пик выделенной памяти (tracemalloc) на событие —
+эмбед живёт недолго, поэтому считаем именно пик, а не то, что осталось.
+
+Запуск из корня репозитория:
+    python benchmarks/logging_bench.py
+    python benchmarks/logging_bench.py --events 20000
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs import logging as log_cog  # noqa: E402
+
+HALF_DISABLED = ("message_edit", "member_update", "voice_changes", "role_changes", "channel_changes")
+
+
+class FakeChannel(SimpleNamespace):
+    async def send(self, **kwargs):
+        pass
+
+
+def fake_user(uid: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=uid, bot=False, name=f"user{uid}", discriminator="0001", display_name=f"User {uid}",
+        mention=f"<@{uid}>", avatar=None, default_avatar=SimpleNamespace(url="https://cdn.example/avatar.png"),
+    )
+
+
+def fake_guild(gid: int, with_log_channel: bool) -> SimpleNamespace:
+    channels = [FakeChannel(id=gid * 10 + 1, name="general", mention="#general")]
+    if with_log_channel:
+        channels.append(FakeChannel(id=gid * 10 + 2, name="logs", mention="#logs"))
+    by_id = {c.id: c for c in channels}
+    return SimpleNamespace(id=gid, name=f"bench-{gid}", text_channels=channels, get_channel=by_id.get)
+
+
+def events(guild: SimpleNamespace, count: int):
+    """(имя слушателя, аргументы) — четыре вида событий по кругу."""
+    channel = guild.text_channels[0]
+    voice_a = SimpleNamespace(name="Голосовой 1")
+    voice_b = SimpleNamespace(name="Голосовой 2")
+    for i in range(count):
+        user = fake_user(i % 500 + 1)
+        kind = i % 4
+        if kind == 0:
+            before = SimpleNamespace(id=i, author=user, guild=guild, channel=channel, content="старый текст " * 5)
+            after = SimpleNamespace(id=i, author=user, guild=guild, channel=channel, content="новый текст " * 5,
+                                    attachments=[], jump_url=f"https://discord.com/channels/{guild.id}/1/{i}")
+            yield "on_raw_message_edit", (SimpleNamespace(message_id=i, message=after, cached_message=before),)
+        elif kind == 1:
+            message = SimpleNamespace(id=i, author=user, guild=guild, channel=channel, content="удалённое " * 10,
+                                      attachments=[])
+            payload = SimpleNamespace(message_id=i, guild_id=guild.id, channel_id=channel.id, cached_message=message)
+            yield "on_raw_message_delete", (payload,)
+        elif kind == 2:
+            after = fake_user(user.id)
+            after.display_name = "Новый ник"
+            after.guild = guild
+            user.roles = after.roles = []
+            yield "on_member_update", (user, after)
+        else:
+            user.guild = guild
+            before = SimpleNamespace(channel=None, self_mute=False)
+            after = SimpleNamespace(channel=voice_a if i % 8 == 3 else voice_b, self_mute=False)
+            yield "on_voice_state_update", (user, before, after)
+
+
+async def eager(cog: log_cog.Logging, name: str, args: tuple):
+    """Старый порядок: эмбед собирается до проверки события и канала."""
+    if name == "on_raw_message_edit":
+        payload = args[0]
+        guild, event = payload.message.guild, "message_edit"
+        embed = log_cog.message_edit_embed(payload.message, payload.cached_message.content)
+    elif name == "on_raw_message_delete":
+        m = args[0].cached_message
+        guild, event = m.guild, "message_delete"
+        embed = log_cog.message_delete_embed(m.id, m.channel.id, m.author, m.content, len(m.attachments))
+    elif name == "on_member_update":
+        guild, embed, event = args[1].guild, log_cog.nick_change_embed(*args), "member_update"
+    else:
+        guild, embed, event = args[0].guild, log_cog.voice_embed(*args), "voice_changes"
+    await cog.send_log(guild, embed, event)
+
+
+async def lazy(cog: log_cog.Logging, name: str, args: tuple):
+    await getattr(cog, name)(*args)
+
+
+async def measure(cog, stream, path) -> tuple[float, float]:
+    """(мкс на событие, байт пиковых выделений на событие)"""
+    start = time.perf_counter()
+    for name, args in stream:
+        await path(cog, name, args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    allocated = 0
+    for name, args in stream:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        await path(cog, name, args)
+        allocated += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    # очередь диспетчера не отправляем — копится только для учёта
+    for queue in cog.bus.discord.dispatcher._queues.values():
+        if queue.task is not None:
+            queue.task.cancel()
+        queue.items.clear()
+    return elapsed / len(stream) * 1e6, allocated / len(stream)
+
+
+async def run(args):
+    setups = [
+        ("без канала логов", fake_guild(1, False), ()),
+        ("половина событий выключена", fake_guild(2, True), HALF_DISABLED),
+        ("все события включены", fake_guild(3, True), ()),
+    ]
+    guilds = {guild.id: guild for _, guild, _ in setups}
+    bot = SimpleNamespace(get_guild=guilds.get)
+    cog = log_cog.Logging(bot)
+    await cog.cog_load()
+    cog.bus.discord.dispatcher.max_backlog = args.events * 2
+
+    print(f"{'сервер':<28}{'путь':<7}{'мкс/событие':>13}{'байт/событие':>14}")
+    for title, guild, disabled in setups:
+        for event in disabled:
+            cog.config.edit(guild.id)["enabled_events"][event] = False
+            cog.config.commit(guild.id, "enabled_events")
+        stream = list(events(guild, args.events))
+        for path_name, path in (("eager", eager), ("lazy", lazy)):
+            us, allocated = await measure(cog, stream, path)
+            print(f"{title:<28}{path_name:<7}{us:>13.2f}{allocated:>14.0f}")
+    await cog.bus.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000, help="событий на один прогон")
+    args = parser.parse_args()
+
+    # конфиги когов читаются/пишутся в текущем каталоге — работаем во временном
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="logging-bench-")
+    os.chdir(workdir)
+    try:
+        asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Бенчмарк автомод-конвейера Moder.on_message (план правил сервера, utils/automod_rules.py).
+
+Прогоняет синтетический или записанный поток сообщений через план
+с фейковыми Message/Guild и печатает перцентили задержки на сообщение,
+пропускную способность и счётчики каждого правила (в итоговом порядке
+проверки) для разных размеров блок-листа и длин сообщений.
+
+Запуск из корня репозитория:
+    python benchmarks/moderation_bench.py
+    python benchmarks/moderation_bench.py --messages 20000 --domains 10 500 --lengths 40 2000
+    python benchmarks/moderation_bench.py --replay messages.jsonl
+
+Формат --replay: по одной JSON-строке на сообщение
+    {"guild_id": 1, "author_id": 2, "content": "текст"}
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.moderation import Moder  # noqa: E402
+
+GUILD_ID = 1
+
+
+def fake_guild(guild_id: int = GUILD_ID) -> SimpleNamespace:
+    return SimpleNamespace(id=guild_id, name=f"bench-{guild_id}")
+
+
+def fake_message(guild: SimpleNamespace, author_id: int, content: str) -> SimpleNamespace:
+    author = SimpleNamespace(id=author_id, bot=False)
+    return SimpleNamespace(
+        guild=guild, author=author, content=content,
+        mentions=[], role_mentions=[], mention_everyone=False, attachments=[], embeds=[], stickers=[],
+    )
+
+
+def random_domain(rng: random.Random) -> str:
+    name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+    return f"{name}.{rng.choice(['com', 'ru', 'net', 'me', 'io', 'xyz'])}"
+
+
+def synthetic_stream(rng: random.Random, count: int, length: int, blocked: list[str], users: int):
+    """Смесь обычного текста, капса и ссылок (разрешённых и запрещённых)."""
+    words = ["привет", "как", "дела", "hello", "discord", "сервер", "игра", "сегодня", "ok", "lol"]
+    guild = fake_guild()
+    for _ in range(count):
+        parts = []
+        size = 0
+        while size < length:
+            roll = rng.random()
+            if roll < 0.03 and blocked:
+                part = f"https://{rng.choice(blocked)}/x"
+            elif roll < 0.06:
+                part = "https://youtube.com/watch?v=abc"
+            else:
+                part = rng.choice(words)
+            parts.append(part)
+            size += len(part) + 1
+        text = " ".join(parts)[:length]
+        if rng.random() < 0.05:
+            text = text.upper()
+        yield fake_message(guild, rng.randint(1, users), text)
+
+
+def replay_stream(path: str):
+    guilds: dict[int, SimpleNamespace] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            gid = int(row.get("guild_id", GUILD_ID))
+            guild = guilds.setdefault(gid, fake_guild(gid))
+            yield fake_message(guild, int(row.get("author_id", 0)), row.get("content", ""))
+
+
+def percentile(sorted_values: list[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx] / 1000  # нс → мкс
+
+
+def run_pipeline(cog: Moder, messages) -> tuple[list[int], list[dict]]:
+    """Время plan.evaluate на каждое сообщение + статистика правил плана."""
+    timings: list[int] = []
+    clock = time.perf_counter_ns
+    plans = {}
+    for message in messages:
+        plan = plans.get(message.guild.id)
+        if plan is None:
+            plan = plans[message.guild.id] = cog.get_automod_plan(message.guild)
+        start = clock()
+        plan.evaluate(message)
+        timings.append(clock() - start)
+    stats = [st for plan in plans.values() for st in plan.stats()]
+    return timings, stats
+
+
+def report(title: str, result: tuple[list[int], list[dict]]):
+    timings, stats = result
+    total_ns = sum(timings)
+    count = len(timings)
+    rate = count / (total_ns / 1e9) if total_ns else 0.0
+    values = sorted(timings)
+    print(f"\n=== {title} — {count} сообщений, {rate:,.0f} сообщ./с ===")
+    print(
+        f"на сообщение: p50 {percentile(values, 50):.1f} мкс, p95 {percentile(values, 95):.1f} мкс, "
+        f"p99 {percentile(values, 99):.1f} мкс, max {percentile(values, 100):.1f} мкс"
+    )
+    print(f"{'правило':<12}{'проверок':>10}{'срабат.':>9}{'сред. мкс':>11}")
+    for st in stats:
+        print(f"{st['name'][:12]:<12}{st['evaluations']:>10}{st['hits']:>9}{st['avg_us']:>11.1f}")
+
+
+def make_cog(blocked: list[str]) -> Moder:
+    cog = Moder(SimpleNamespace())
+    guild = fake_guild()
+    cfg = cog.get_guild_config(guild)
+    cfg["blocked_domains"] = sorted(set(cfg["blocked_domains"]) | set(blocked))
+    cog.invalidate_domain_matcher(guild.id)
+    return cog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="сообщений на один прогон")
+    parser.add_argument("--domains", type=int, nargs="+", default=[10, 100, 1000], help="размеры блок-листа")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 200, 2000], help="длины сообщений")
+    parser.add_argument("--users", type=int, default=500, help="число разных авторов")
+    parser.add_argument("--replay", help="JSONL-файл с записанными сообщениями")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # путь к записи — относительно каталога запуска, до смены каталога
+    replay = os.path.abspath(args.replay) if args.replay else None
+
+    # Moder читает/пишет свои JSON-файлы в текущем каталоге — работаем во временном
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="moder-bench-")
+    os.chdir(workdir)
+    try:
+        rng = random.Random(args.seed)
+        for domain_count in args.domains:
+            blocked = [random_domain(rng) for _ in range(domain_count)]
+            if replay:
+                cog = make_cog(blocked)
+                report(f"replay, блок-лист {domain_count}", run_pipeline(cog, replay_stream(replay)))
+                continue
+            for length in args.lengths:
+                cog = make_cog(blocked)
+                stream = list(synthetic_stream(rng, args.messages, length, blocked, args.users))
+                report(f"блок-лист {domain_count}, длина {length}", run_pipeline(cog, stream))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,10 @@ from discord import app_commands
 from discord.ext import commands
 import datetime
 import aiohttp
-import io
-import json
-import os
+
+from utils.config_service import get_config_service
+from utils.log_bus import LogRecord, get_log_bus
+from utils.message_cache import get_message_cache
 
 LOG_CONFIG_FILE = "log_config.json"
 
@@ -13,37 +14,28 @@ LOG_CONFIG_FILE = "log_config.json"
 class AdvancedLogging(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.log_config = self.load_config()
+        self.log_config = get_config_service(bot).section(
+            "advanced_logging", LOG_CONFIG_FILE, {"log_channel": None}
+        )
+        self.bus = get_log_bus(bot)
+        self.messages = get_message_cache(bot)
 
-    def load_config(self):
-        """Загрузка конфигурации логгирования"""
-        if os.path.exists(LOG_CONFIG_FILE):
-            with open(LOG_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+    async def cog_load(self):
+        self.bus.discord.route("advanced_logging", self.resolve_log_channel)
 
-    def save_config(self):
-        """Сохранение конфигурации логгирования"""
-        with open(LOG_CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.log_config, f, ensure_ascii=False, indent=2)
+    async def cog_unload(self):
+        self.bus.discord.unroute("advanced_logging")
 
     def get_log_channel(self, guild_id):
         """Получение канала для логов из конфига"""
-        config = self.log_config.get(str(guild_id), {})
-        return config.get('log_channel')
+        return self.log_config.get(guild_id)['log_channel']
 
     @app_commands.command(name="setlogchannel", description="Установить канал для логов")
     @app_commands.describe(channel="Канал для отправки логов")
     @app_commands.default_permissions(manage_guild=True)
     async def set_log_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
         """Установить канал для логов"""
-        guild_id = str(interaction.guild_id)
-
-        if guild_id not in self.log_config:
-            self.log_config[guild_id] = {}
-
-        self.log_config[guild_id]['log_channel'] = channel.id
-        self.save_config()
+        self.log_config.set(interaction.guild_id, 'log_channel', channel.id)
 
         embed = discord.Embed(
             title="✅ Канал логов установлен",
@@ -56,8 +48,7 @@ class AdvancedLogging(commands.Cog):
     @app_commands.default_permissions(manage_guild=True)
     async def log_settings(self, interaction: discord.Interaction):
         """Показать текущие настройки логгирования"""
-        guild_id = str(interaction.guild_id)
-        config = self.log_config.get(guild_id, {})
+        config = self.log_config.get(interaction.guild_id)
 
         embed = discord.Embed(
             title="⚙️ Настройки логгирования",
@@ -87,111 +78,132 @@ class AdvancedLogging(commands.Cog):
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @commands.Cog.listener()
-    async def on_bulk_message_delete(self, messages):
-        """Логирование массового удаления сообщений"""
-        if not messages or not messages[0].guild:
-            return
+    def resolve_log_channel(self, guild):
+        """Канал логов сервера (маршрут шины логов для источника advanced_logging)"""
+        log_channel_id = self.get_log_channel(guild.id)
+        return guild.get_channel(log_channel_id) if log_channel_id else None
 
-        guild = messages[0].guild
-        channel = messages[0].channel
+    def wants(self, guild):
+        """Есть ли куда доставить логи сервера: канал логов, Telegram или JSONL"""
+        return self.resolve_log_channel(guild) is not None or self.bus.delivers(guild)
 
-        # Получаем канал для логов из конфига
-        log_channel_id = self.get_log_channel(guild.id)
-        if not log_channel_id:
+    def publish(self, guild, event, build, *args, attachment=None):
+        """Публикует запись в шину логов, если её есть кому доставить"""
+        if not self.wants(guild):
             return
+        self.bus.publish(LogRecord(guild, "advanced_logging", event, build, args, attachment=attachment))
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Запоминает текст сообщения для лога массового удаления"""
+        if message.guild and not message.author.bot and self.wants(message.guild):
+            self.messages.add(message)
 
-        log_channel = guild.get_channel(log_channel_id)
-        if not log_channel:
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        """Логирование массового удаления сообщений (текст — из кэша discord.py или своего)"""
+        guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
+        if guild is None or not self.wants(guild):
+            for message_id in payload.message_ids:
+                self.messages.discard(message_id)
             return
 
+        # (время, автор, текст, вложений) для каждого сообщения с известным текстом
+        entries = []
+        cached_ids = set()
+        for msg in payload.cached_messages:
+            cached_ids.add(msg.id)
+            self.messages.discard(msg.id)
+            if not msg.author.bot:
+                entries.append((msg.created_at, msg.author.name, msg.content, len(msg.attachments)))
+        unknown = 0
+        for message_id in payload.message_ids - cached_ids:
+            record = await self.messages.take(message_id)
+            if record is None:
+                unknown += 1
+                continue
+            author = guild.get_member(record.author_id)
+            entries.append((discord.utils.snowflake_time(record.id), author.name if author else str(record.author_id),
+                            record.content, record.attachments))
+
+        channel = guild.get_channel(payload.channel_id)
+        channel_name = channel.name if channel else payload.channel_id
+
         # Создаем текстовый файл с удаленными сообщениями
-        log_content = f"Массовое удаление сообщений в #{channel.name}\n"
+        log_content = f"Массовое удаление сообщений в #{channel_name}\n"
         log_content += f"Время: {datetime.datetime.utcnow()}\n"
-        log_content += f"Количество сообщений: {len(messages)}\n"
+        log_content += f"Количество сообщений: {len(payload.message_ids)}\n"
+        if unknown:
+            log_content += f"Без текста (старше кэша): {unknown}\n"
         log_content += "=" * 50 + "\n\n"
 
-        for msg in sorted(messages, key=lambda x: x.created_at):
-            if not msg.author.bot:
-                log_content += f"[{msg.created_at.strftime('%Y-%m-%d %H:%M:%S')}] {msg.author.name}: {msg.content}\n"
-                if msg.attachments:
-                    log_content += f"📎 Вложения: {len(msg.attachments)}\n"
-                log_content += "\n"
-
-        # Создаем файл
-        file = discord.File(
-            io.BytesIO(log_content.encode('utf-8')),
-            filename=f"bulk_delete_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
-        )
-
-        embed = discord.Embed(
-            title="💥 Массовое удаление сообщений",
-            color=discord.Color.dark_red(),
-            timestamp=datetime.datetime.utcnow()
-        )
-        embed.add_field(name="Канал", value=channel.mention, inline=True)
-        embed.add_field(name="Количество", value=len(messages), inline=True)
+        for created_at, author_name, content, attachments in sorted(entries, key=lambda x: x[0]):
+            log_content += f"[{created_at.strftime('%Y-%m-%d %H:%M:%S')}] {author_name}: {content}\n"
+            if attachments:
+                log_content += f"📎 Вложения: {attachments}\n"
+            log_content += "\n"
 
-        await log_channel.send(embed=embed, file=file)
+        filename = f"bulk_delete_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
+        self.publish(guild, "bulk_delete", bulk_delete_embed, payload.channel_id, len(payload.message_ids),
+                     attachment=(filename, log_content.encode('utf-8')))
 
     @commands.Cog.listener()
     async def on_invite_create(self, invite):
         """Логирование создания приглашения"""
-        guild = invite.guild
-        log_channel_id = self.get_log_channel(guild.id)
-        if not log_channel_id:
-            return
-
-        log_channel = guild.get_channel(log_channel_id)
-        if not log_channel:
-            return
-
-        embed = discord.Embed(
-            title="📨 Создано приглашение",
-            color=discord.Color.blue(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Создатель", value=invite.inviter.mention, inline=True)
-        embed.add_field(name="Канал", value=invite.channel.mention, inline=True)
-        embed.add_field(name="Код", value=invite.code, inline=True)
-
-        if invite.max_age > 0:
-            embed.add_field(name="Истекает",
-                            value=f"<t:{int((datetime.datetime.utcnow() + datetime.timedelta(seconds=invite.max_age)).timestamp())}:R>",
-                            inline=True)
-        else:
-            embed.add_field(name="Истекает", value="Никогда", inline=True)
-
-        if invite.max_uses > 0:
-            embed.add_field(name="Макс. использований", value=invite.max_uses, inline=True)
-        else:
-            embed.add_field(name="Макс. использований", value="Неограничено", inline=True)
-
-        await log_channel.send(embed=embed)
+        self.publish(invite.guild, "invite_create", invite_create_embed, invite)
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite):
         """Логирование удаления приглашения"""
-        guild = invite.guild
-        log_channel_id = self.get_log_channel(guild.id)
-        if not log_channel_id:
-            return
-
-        log_channel = guild.get_channel(log_channel_id)
-        if not log_channel:
-            return
-
-        embed = discord.Embed(
-            title="🗑️ Приглашение удалено",
-            color=discord.Color.orange(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Канал", value=invite.channel.mention, inline=True)
-        embed.add_field(name="Код", value=invite.code, inline=True)
-
-        await log_channel.send(embed=embed)
+        self.publish(invite.guild, "invite_delete", invite_delete_embed, invite)
+
+
+def bulk_delete_embed(channel_id, count):
+    embed = discord.Embed(
+        title="💥 Массовое удаление сообщений",
+        color=discord.Color.dark_red(),
+        timestamp=datetime.datetime.utcnow()
+    )
+    embed.add_field(name="Канал", value=f"<#{channel_id}>", inline=True)
+    embed.add_field(name="Количество", value=count, inline=True)
+    return embed
+
+
+def invite_create_embed(invite):
+    embed = discord.Embed(
+        title="📨 Создано приглашение",
+        color=discord.Color.blue(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Создатель", value=invite.inviter.mention, inline=True)
+    embed.add_field(name="Канал", value=invite.channel.mention, inline=True)
+    embed.add_field(name="Код", value=invite.code, inline=True)
+
+    if invite.max_age > 0:
+        embed.add_field(name="Истекает",
+                        value=f"<t:{int((datetime.datetime.utcnow() + datetime.timedelta(seconds=invite.max_age)).timestamp())}:R>",
+                        inline=True)
+    else:
+        embed.add_field(name="Истекает", value="Никогда", inline=True)
+
+    if invite.max_uses > 0:
+        embed.add_field(name="Макс. использований", value=invite.max_uses, inline=True)
+    else:
+        embed.add_field(name="Макс. использований", value="Неограничено", inline=True)
+    return embed
+
+
+def invite_delete_embed(invite):
+    embed = discord.Embed(
+        title="🗑️ Приглашение удалено",
+        color=discord.Color.orange(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Канал", value=invite.channel.mention, inline=True)
+    embed.add_field(name="Код", value=invite.code, inline=True)
+    return embed
 
 
 async def setup(bot):
@@ -1,55 +1,69 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import os
+import asyncio
 import random
+import typing as t
+
+from utils.config_service import get_config_service
+from utils.join_guard import get_join_guard
 
 AUTO_ROLE_ID = 1411068140024107031
 WELCOME_CONFIG_FILE = "welcome_channels.json"
+ROLE_QUEUE_DELAY = 1.0  # пауза между выдачами роли из очереди в локдауне (сек)
 
 
 class AutoRole(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.welcome_channels: dict[int, int] = self.load_config()
+        # {guild_id: channel_id} — плоский раздел общего сервиса конфигов
+        self.welcome_channels = get_config_service(bot).section("welcome", WELCOME_CONFIG_FILE)
+        # в локдауне роли выдаются по одной из очереди, а не на каждый вход сразу
+        self._role_queue: asyncio.Queue[tuple[int, int]] = asyncio.Queue()
+        self._role_worker: t.Optional[asyncio.Task] = None
 
-    # ===== Работа с конфигом =====
-    def load_config(self) -> dict[int, int]:
-        if not os.path.exists(WELCOME_CONFIG_FILE):
-            return {}
-        try:
-            with open(WELCOME_CONFIG_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return {int(k): int(v) for k, v in data.items()}
-        except Exception as e:
-            print(f"[AutoRole] Не удалось загрузить {WELCOME_CONFIG_FILE}: {e}")
-            return {}
-
-    def save_config(self):
-        try:
-            with open(WELCOME_CONFIG_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.welcome_channels, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"[AutoRole] Не удалось сохранить {WELCOME_CONFIG_FILE}: {e}")
+    async def cog_unload(self):
+        if self._role_worker:
+            self._role_worker.cancel()
 
     # ===== Выдача роли + приветствие =====
+    async def give_auto_role(self, member: discord.Member):
+        guild = member.guild
+        role = guild.get_role(AUTO_ROLE_ID)
+        if role is None:
+            print(f"[AutoRole] Не нашёл роль с ID {AUTO_ROLE_ID} на сервере {guild.name}")
+            return
+        try:
+            await member.add_roles(role, reason="Авто-выдача роли новому участнику")
+            print(f"[AutoRole] Выдал роль {role.name} пользователю {member} на сервере {guild.name}")
+        except discord.Forbidden:
+            print("[AutoRole] Нет прав на выдачу роли (проверь права бота и позицию роли).")
+        except discord.HTTPException as e:
+            print(f"[AutoRole] Ошибка Discord API при выдаче роли: {e}")
+
+    async def role_queue_worker(self):
+        """Выдаёт роли, отложенные во время локдауна, не чаще раза в ROLE_QUEUE_DELAY сек."""
+        while True:
+            guild_id, member_id = await self._role_queue.get()
+            guild = self.bot.get_guild(guild_id)
+            member = guild.get_member(member_id) if guild else None
+            if member is not None:  # успел выйти — пропускаем
+                await self.give_auto_role(member)
+                await asyncio.sleep(ROLE_QUEUE_DELAY)
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         guild = member.guild
-        role = guild.get_role(AUTO_ROLE_ID)
+
+        # Локдаун (рейд входами): роль — из очереди, приветствий нет
+        if get_join_guard(self.bot).observe(member):
+            self._role_queue.put_nowait((guild.id, member.id))
+            if self._role_worker is None or self._role_worker.done():
+                self._role_worker = asyncio.create_task(self.role_queue_worker())
+            return
 
         # 1) Авто-роль
-        if role is None:
-            print(f"[AutoRole] Не нашёл роль с ID {AUTO_ROLE_ID} на сервере {guild.name}")
-        else:
-            try:
-                await member.add_roles(role, reason="Авто-выдача роли новому участнику")
-                print(f"[AutoRole] Выдал роль {role.name} пользователю {member} на сервере {guild.name}")
-            except discord.Forbidden:
-                print("[AutoRole] Нет прав на выдачу роли (проверь права бота и позицию роли).")
-            except discord.HTTPException as e:
-                print(f"[AutoRole] Ошибка Discord API при выдаче роли: {e}")
+        await self.give_auto_role(member)
 
         # 2) Канал приветствий
         channel_id = self.welcome_channels.get(guild.id)
@@ -90,8 +104,7 @@ class AutoRole(commands.Cog):
     @app_commands.default_permissions(manage_guild=True)
     async def set_welcome_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
         """Установить канал для приветственных сообщений"""
-        self.welcome_channels[interaction.guild.id] = channel.id
-        self.save_config()
+        self.welcome_channels.put(interaction.guild.id, channel.id)
 
         embed = discord.Embed(
             title="✅ Канал приветствий установлен",
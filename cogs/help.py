@@ -128,12 +128,13 @@ class HelpInfo(commands.Cog):
                 "`/kick <участник> [причина]` - Кикнуть",
                 "`/warn <участник> [причина]` - Выдать предупреждение",
                 "`/unwarn <участник>` - Снять предупреждения",
-                "`/warnings <участник>` - Посмотреть предупреждения",
+                "`/warnings <участник>` - История предупреждений",
                 "`/mute <участник> [причина]` - Замутить",
                 "`/unmute <участник> [причина]` - Размутить",
                 "`/tempmute <участник> <время> [причина]` - Временный мут",
                 "`/muted_list` - Список замьюченных",
-                "`/muteinfo <участник>` - Информация о мьюте"
+                "`/muteinfo <участник>` - Информация о мьюте",
+                "`/purge <кол-во> [участник] [текст]` - Массовое удаление сообщений"
             ]
 
             embed.add_field(
@@ -157,7 +158,18 @@ class HelpInfo(commands.Cog):
                 "`/logs_test` - Тест системы логов",
                 "`/adddomain <домен>` - Добавить домен в белый список",
                 "`/blockdomain <домен>` - Добавить домен в черный список",
-                "`/domains` - Списки доменов"
+                "`/domains` - Списки доменов",
+                "`/warn_decay <дни>` - Срок действия предупреждений",
+                "`/punish_list` - Лестница наказаний",
+                "`/punish_set <варны> <наказание> [минуты]` - Наказание за N варнов",
+                "`/punish_remove <варны>` - Убрать шаг лестницы",
+                "`/punish_flood <наказание> [минуты]` - Наказание за флуд",
+                "`/mute_mode <режим>` - Мьют ролью или тайм-аутом Discord",
+                "`/automod_rules` - Правила автомода и статистика",
+                "`/automod_add <тип> [значение]` - Добавить правило автомода",
+                "`/automod_remove <имя>` - Удалить правило автомода",
+                "`/automod_prefixes [префиксы]` - Префиксы, которые автомод не проверяет",
+                "`/automod_reset` - Правила автомода по умолчанию"
             ]
 
             embed.add_field(
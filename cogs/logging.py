@@ -2,307 +2,499 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import datetime
-import json
-import os
 from typing import Optional
 
+from utils.config_service import get_config_service
+from utils.embed_dispatcher import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+from utils.join_guard import get_join_guard
+from utils.log_bus import LogRecord, get_log_bus
+from utils.message_cache import get_message_cache
+
+
+LOGGING_DEFAULTS = {
+    "log_channel": None,
+    "enabled_events": {
+        "message_delete": True,
+        "message_edit": True,
+        "member_join": True,
+        "member_leave": True,
+        "member_ban": True,
+        "member_unban": True,
+        "member_update": True,
+        "role_changes": True,
+        "channel_changes": True,
+        "voice_changes": True
+    }
+}
+
+# при переполнении очереди лог-канала сначала жертвуем частыми и малозначимыми событиями
+EVENT_PRIORITIES = {
+    "message_delete": PRIORITY_HIGH,
+    "member_ban": PRIORITY_HIGH,
+    "member_unban": PRIORITY_HIGH,
+    "member_join": PRIORITY_NORMAL,
+    "member_leave": PRIORITY_NORMAL,
+    "role_changes": PRIORITY_NORMAL,
+    "channel_changes": PRIORITY_NORMAL,
+    "message_edit": PRIORITY_LOW,
+    "member_update": PRIORITY_LOW,
+    "voice_changes": PRIORITY_LOW,
+}
+
+# запасные названия лог-канала, если он не задан явно (по убыванию приоритета)
+FALLBACK_CHANNEL_NAMES = {"логи": 0, "logs": 1, "mod-log": 2}
+
+_MISSING = object()
+
+# бит события в маске сервера (см. Logging.event_mask)
+EVENT_BITS = {event: 1 << i for i, event in enumerate(LOGGING_DEFAULTS["enabled_events"])}
+# события, которым нужен текст сообщения из кэша (utils/message_cache.py)
+MESSAGE_BITS = EVENT_BITS["message_delete"] | EVENT_BITS["message_edit"]
+
+
+# ===== Сборщики эмбедов =====
+# Вызываются только если событие будет доставлено (см. Logging.log_event)
+
+def _avatar_url(user):
+    return user.avatar.url if user.avatar else user.default_avatar.url
+
+
+def _shorten(text, limit):
+    """Не длиннее limit символов вместе с многоточием (лимиты полей эмбеда)"""
+    return text[:limit - 3] + "..." if len(text) > limit else text
+
+
+def _channel_type(channel):
+    return "Голосовой" if isinstance(channel, discord.VoiceChannel) else "Текстовый"
+
+
+def message_delete_embed(message_id, channel_id, author, content, attachments):
+    """author — участник или discord.Object, если его уже нет на сервере"""
+    embed = discord.Embed(
+        title="🗑️ Сообщение удалено",
+        color=discord.Color.red(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Автор", value=f"<@{author.id}>", inline=True)
+    embed.add_field(name="Канал", value=f"<#{channel_id}>", inline=True)
+
+    if content:
+        embed.add_field(name="Содержимое", value=_shorten(content, 1024), inline=False)
+
+    if attachments:
+        embed.add_field(name="Вложения", value=f"{attachments} файлов", inline=True)
+
+    embed.set_footer(text=f"ID: {message_id}")
+    if not isinstance(author, discord.Object):
+        embed.set_thumbnail(url=_avatar_url(author))
+    return embed
+
+
+def message_edit_embed(after, before_content):
+    embed = discord.Embed(
+        title="✏️ Сообщение отредактировано",
+        color=discord.Color.orange(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Автор", value=after.author.mention, inline=True)
+    embed.add_field(name="Канал", value=after.channel.mention, inline=True)
+    embed.add_field(name="Ссылка", value=f"[Перейти]({after.jump_url})", inline=True)
+
+    embed.add_field(name="Было", value=_shorten(before_content, 500) or "*пусто*", inline=False)
+    embed.add_field(name="Стало", value=_shorten(after.content, 500) or "*пусто*", inline=False)
+
+    embed.set_footer(text=f"ID: {after.id}")
+    embed.set_thumbnail(url=_avatar_url(after.author))
+    return embed
+
+
+def member_join_embed(member):
+    embed = discord.Embed(
+        title="✅ Участник присоединился",
+        color=discord.Color.green(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Участник", value=f"{member.mention}\n{member.name}#{member.discriminator}", inline=True)
+    embed.add_field(name="Аккаунт создан", value=f"<t:{int(member.created_at.timestamp())}:R>", inline=True)
+    embed.add_field(name="Участников", value=member.guild.member_count, inline=True)
+
+    embed.set_thumbnail(url=_avatar_url(member))
+    embed.set_footer(text=f"ID: {member.id}")
+    return embed
+
+
+def member_leave_embed(member):
+    embed = discord.Embed(
+        title="🚪 Участник вышел",
+        color=discord.Color.orange(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Участник", value=f"{member.display_name}\n{member.name}#{member.discriminator}",
+                    inline=True)
+    embed.add_field(name="Присоединился", value=f"<t:{int(member.joined_at.timestamp())}:R>", inline=True)
+    embed.add_field(name="Участников", value=member.guild.member_count, inline=True)
+
+    roles = [role.mention for role in member.roles[1:]]  # Исключаем @everyone
+    if roles:
+        roles_text = ", ".join(roles[:5])
+        if len(roles) > 5:
+            roles_text += f" и ещё {len(roles) - 5}"
+        embed.add_field(name="Роли", value=roles_text, inline=False)
+
+    embed.set_thumbnail(url=_avatar_url(member))
+    embed.set_footer(text=f"ID: {member.id}")
+    return embed
+
+
+def member_ban_embed(user, reason):
+    embed = discord.Embed(
+        title="🔨 Участник забанен",
+        color=discord.Color.red(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Участник", value=f"{user.name}#{user.discriminator}", inline=True)
+    embed.add_field(name="ID", value=user.id, inline=True)
+    if reason:
+        embed.add_field(name="Причина", value=reason, inline=False)
+
+    embed.set_thumbnail(url=_avatar_url(user))
+    return embed
+
+
+def member_unban_embed(user):
+    embed = discord.Embed(
+        title="🔓 Участник разбанен",
+        color=discord.Color.green(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Участник", value=f"{user.name}#{user.discriminator}", inline=True)
+    embed.add_field(name="ID", value=user.id, inline=True)
+
+    embed.set_thumbnail(url=_avatar_url(user))
+    return embed
+
+
+def nick_change_embed(before, after):
+    embed = discord.Embed(
+        title="👤 Смена ника",
+        color=discord.Color.blue(),
+        timestamp=datetime.datetime.utcnow()
+    )
+    embed.add_field(name="Участник", value=after.mention, inline=True)
+    embed.add_field(name="Было", value=before.display_name, inline=True)
+    embed.add_field(name="Стало", value=after.display_name, inline=True)
+    embed.set_thumbnail(url=_avatar_url(after))
+    return embed
+
+
+def role_change_embed(member, added_roles, removed_roles):
+    embed = discord.Embed(
+        title="🎭 Изменение ролей",
+        color=discord.Color.purple(),
+        timestamp=datetime.datetime.utcnow()
+    )
+    embed.add_field(name="Участник", value=member.mention, inline=True)
+
+    if added_roles:
+        embed.add_field(name="Добавлены", value=", ".join([role.mention for role in added_roles]), inline=False)
+    if removed_roles:
+        embed.add_field(name="Удалены", value=", ".join([role.mention for role in removed_roles]), inline=False)
+
+    embed.set_thumbnail(url=_avatar_url(member))
+    return embed
+
+
+def channel_embed(channel, created):
+    embed = discord.Embed(
+        title="📁 Канал создан" if created else "🗑️ Канал удалён",
+        color=discord.Color.green() if created else discord.Color.red(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Тип", value=_channel_type(channel), inline=True)
+    embed.add_field(name="Название", value=channel.name, inline=True)
+    embed.add_field(name="Категория", value=channel.category.name if channel.category else "Нет", inline=True)
+    return embed
+
+
+def channel_update_embed(channel, changes):
+    embed = discord.Embed(
+        title="⚙️ Канал изменён",
+        color=discord.Color.blue(),
+        timestamp=datetime.datetime.utcnow()
+    )
+
+    embed.add_field(name="Тип", value=_channel_type(channel), inline=True)
+    embed.add_field(name="Канал", value=channel.mention, inline=True)
+    embed.add_field(name="Изменения", value="\n".join(changes), inline=False)
+    return embed
+
+
+def voice_embed(member, before, after):
+    """None — изменение, которое не логируется"""
+    # Вход в голосовой канал
+    if not before.channel and after.channel:
+        title, color = "🎤 Вход в голосовой канал", discord.Color.green()
+        fields = [("Канал", after.channel.name)]
+    # Выход из голосового канала
+    elif before.channel and not after.channel:
+        title, color = "🚪 Выход из голосового канала", discord.Color.orange()
+        fields = [("Канал", before.channel.name)]
+    # Смена голосового канала
+    elif before.channel and after.channel and before.channel != after.channel:
+        title, color = "🔄 Смена голосового канала", discord.Color.blue()
+        fields = [("Было", before.channel.name), ("Стало", after.channel.name)]
+    # Мьют/дефьют
+    elif before.self_mute != after.self_mute:
+        title = "🔇 Самомьют" if after.self_mute else "🔊 Снятие самомьюта"
+        color = discord.Color.orange()
+        fields = [("Канал", after.channel.name if after.channel else "Неизвестно")]
+    else:
+        return None
+
+    embed = discord.Embed(
+        title=title,
+        color=color,
+        timestamp=datetime.datetime.utcnow()
+    )
+    embed.add_field(name="Участник", value=member.mention, inline=True)
+    for name, value in fields:
+        embed.add_field(name=name, value=value, inline=True)
+    return embed
+
 
 class Logging(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config_file = "logging_config.json"
-        self.load_config()
-
-    def load_config(self):
-        """Загружает конфигурацию логирования"""
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-        else:
-            self.config = {}
-            self.save_config()
-
-    def save_config(self):
-        """Сохраняет конфигурацию"""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=4, ensure_ascii=False)
+        # конфиг — раздел общего сервиса (utils/config_service.py), файл logging_config.json
+        self.config = get_config_service(bot).section(
+            "logging", "logging_config.json", LOGGING_DEFAULTS, indent=4
+        )
+        # записи уходят в общую шину логов: Discord-канал, Telegram, JSONL (utils/log_bus.py)
+        self.bus = get_log_bus(bot)
+        # текст недавних сообщений для raw-событий удаления/правки
+        self.messages = get_message_cache(bot)
+        # {guild_id: канал логов | None}; None — канала нет (негативный кэш)
+        self._log_channels: dict[int, Optional[discord.abc.GuildChannel]] = {}
+        # {guild_id: маска событий, которые будут доставлены}; 0 — логов нет совсем
+        self._event_masks: dict[int, int] = {}
+
+    async def cog_load(self):
+        get_config_service(self.bot).subscribe("logging", self.on_config_change)
+        self.bus.discord.route("logging", self.resolve_log_channel)
+
+    async def cog_unload(self):
+        get_config_service(self.bot).unsubscribe("logging", self.on_config_change)
+        self.bus.discord.unroute("logging")
+
+    def on_config_change(self, key, field):
+        self.invalidate_log_channel(int(key))
 
     def get_guild_config(self, guild_id):
-        """Получает конфигурацию для сервера"""
-        return self.config.get(str(guild_id), {
-            "log_channel": None,
-            "enabled_events": {
-                "message_delete": True,
-                "message_edit": True,
-                "member_join": True,
-                "member_leave": True,
-                "member_ban": True,
-                "member_unban": True,
-                "member_update": True,
-                "role_changes": True,
-                "channel_changes": True,
-                "voice_changes": True
-            }
-        })
+        """Получает конфигурацию для сервера (только чтение)"""
+        return self.config.get(guild_id)
 
     def set_guild_config(self, guild_id, key, value):
         """Устанавливает настройку для сервера"""
-        guild_id = str(guild_id)
-        if guild_id not in self.config:
-            self.config[guild_id] = self.get_guild_config(guild_id)
-        self.config[guild_id][key] = value
-        self.save_config()
+        self.config.set(guild_id, key, value)
 
-    async def get_log_channel(self, guild):
-        """Получает канал для логов"""
-        guild_config = self.get_guild_config(guild.id)
-        channel_id = guild_config.get("log_channel")
+    def resolve_log_channel(self, guild):
+        """Канал для логов из кэша (сбрасывается при изменении каналов и конфига)"""
+        channel = self._log_channels.get(guild.id, _MISSING)
+        if channel is _MISSING:
+            channel = self._log_channels[guild.id] = self._find_log_channel(guild)
+        return channel
 
+    def _find_log_channel(self, guild):
+        channel_id = self.get_guild_config(guild.id)["log_channel"]
         if channel_id:
             channel = guild.get_channel(channel_id)
             if channel:
                 return channel
 
-        # Ищем канал с названием "логи" или "logs"
-        log_channel = discord.utils.get(guild.text_channels, name="логи")
-        if not log_channel:
-            log_channel = discord.utils.get(guild.text_channels, name="logs")
-        if not log_channel:
-            log_channel = discord.utils.get(guild.text_channels, name="mod-log")
+        # Ищем канал "логи", затем "logs", затем "mod-log" — за один проход
+        found = None
+        found_rank = len(FALLBACK_CHANNEL_NAMES)
+        for channel in guild.text_channels:
+            rank = FALLBACK_CHANNEL_NAMES.get(channel.name)
+            if rank is not None and rank < found_rank:
+                found, found_rank = channel, rank
+                if rank == 0:
+                    break
+        return found
+
+    def invalidate_log_channel(self, guild_id):
+        self._log_channels.pop(guild_id, None)
+        self._event_masks.pop(guild_id, None)
 
-        return log_channel
+    async def get_log_channel(self, guild):
+        """Получает канал для логов"""
+        return self.resolve_log_channel(guild)
+
+    def event_mask(self, guild):
+        """Биты включённых событий сервера (0, если логи некуда доставить); считается один раз"""
+        # без канала логов записи всё равно нужны Telegram/JSONL, если они подключены
+        if self.resolve_log_channel(guild) is None and not self.bus.delivers(guild):
+            return 0
+        mask = self._event_masks.get(guild.id)
+        if mask is None:
+            mask = 0
+            enabled = self.get_guild_config(guild.id)["enabled_events"]
+            for event, bit in EVENT_BITS.items():
+                if enabled.get(event, True):
+                    mask |= bit
+            self._event_masks[guild.id] = mask
+        return mask
+
+    def wants(self, guild, event_type):
+        """Будет ли событие доставлено — проверять до любой подготовки эмбеда"""
+        return bool(self.event_mask(guild) & EVENT_BITS[event_type])
+
+    def log_event(self, guild, event_type, build, *args):
+        """Вызывает build(*args) и публикует запись, только если событие будет доставлено"""
+        if not self.event_mask(guild) & EVENT_BITS[event_type]:
+            return False
+        embed = build(*args)
+        if embed is None:
+            return False
+        self.bus.publish(LogRecord(guild, "logging", event_type, embed=embed, priority=EVENT_PRIORITIES[event_type]))
+        return True
 
     async def send_log(self, guild, embed, event_type):
-        """Отправляет лог в канал если событие включено"""
-        guild_config = self.get_guild_config(guild.id)
-
-        # Проверяем включено ли логирование этого события
-        if not guild_config["enabled_events"].get(event_type, True):
-            return
-
-        log_channel = await self.get_log_channel(guild)
-        if log_channel:
-            try:
-                await log_channel.send(embed=embed)
-            except:
-                pass  # Если нет прав для отправки
+        """Отправляет готовый лог в канал если событие включено"""
+        if self.wants(guild, event_type):
+            self.bus.publish(LogRecord(guild, "logging", event_type, embed=embed, priority=EVENT_PRIORITIES[event_type]))
 
     # ===== СООБЩЕНИЯ =====
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        """Логирование удаления сообщений"""
-        if message.author.bot or not message.guild:
-            return
-
-        embed = discord.Embed(
-            title="🗑️ Сообщение удалено",
-            color=discord.Color.red(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Автор", value=message.author.mention, inline=True)
-        embed.add_field(name="Канал", value=message.channel.mention, inline=True)
-
-        if message.content:
-            content = message.content[:1024] + "..." if len(message.content) > 1024 else message.content
-            embed.add_field(name="Содержимое", value=content, inline=False)
-
-        if message.attachments:
-            embed.add_field(name="Вложения", value=f"{len(message.attachments)} файлов", inline=True)
-
-        embed.set_footer(text=f"ID: {message.id}")
-        embed.set_thumbnail(
-            url=message.author.avatar.url if message.author.avatar else message.author.default_avatar.url)
-
-        await self.send_log(message.guild, embed, "message_delete")
+    async def on_message(self, message):
+        """Запоминает текст сообщения: кэш discord.py на активных серверах быстро прокручивается"""
+        if message.guild and not message.author.bot and self.event_mask(message.guild) & MESSAGE_BITS:
+            self.messages.add(message)
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        """Логирование редактирования сообщений"""
-        if before.author.bot or not before.guild or before.content == after.content:
+    async def on_raw_message_delete(self, payload):
+        """Логирование удаления сообщений (в том числе вытесненных из кэша discord.py)"""
+        guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
+        if guild is None or not self.wants(guild, "message_delete"):
+            self.messages.discard(payload.message_id)
             return
 
-        embed = discord.Embed(
-            title="✏️ Сообщение отредактировано",
-            color=discord.Color.orange(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Автор", value=before.author.mention, inline=True)
-        embed.add_field(name="Канал", value=before.channel.mention, inline=True)
-        embed.add_field(name="Ссылка", value=f"[Перейти]({after.jump_url})", inline=True)
+        message = payload.cached_message
+        if message is not None:
+            self.messages.discard(payload.message_id)
+            if not message.author.bot:
+                self.log_event(guild, "message_delete", message_delete_embed, message.id, message.channel.id,
+                               message.author, message.content, len(message.attachments))
+            return
 
-        old_content = before.content[:500] + "..." if len(before.content) > 500 else before.content
-        new_content = after.content[:500] + "..." if len(after.content) > 500 else after.content
+        record = await self.messages.take(payload.message_id)
+        if record is None:
+            return  # сообщение старше кэша — текста нет
+        author = guild.get_member(record.author_id) or discord.Object(record.author_id)
+        self.log_event(guild, "message_delete", message_delete_embed, record.id, record.channel_id,
+                       author, record.content, record.attachments)
 
-        embed.add_field(name="Было", value=old_content or "*пусто*", inline=False)
-        embed.add_field(name="Стало", value=new_content or "*пусто*", inline=False)
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        """Логирование редактирования сообщений (старый текст — из кэша discord.py или своего)"""
+        after = payload.message
+        guild = after.guild
+        if guild is None or after.author.bot:
+            return
+        mask = self.event_mask(guild)
+        if not mask & MESSAGE_BITS:
+            return
 
-        embed.set_footer(text=f"ID: {before.id}")
-        embed.set_thumbnail(url=before.author.avatar.url if before.author.avatar else before.author.default_avatar.url)
+        before_content = None
+        if mask & EVENT_BITS["message_edit"]:
+            if payload.cached_message is not None:
+                before_content = payload.cached_message.content
+            else:
+                record = await self.messages.fetch(payload.message_id)
+                before_content = record.content if record is not None else None
+        # новый текст нужен для следующей правки или удаления
+        self.messages.add(after)
 
-        await self.send_log(before.guild, embed, "message_edit")
+        if before_content is None or before_content == after.content:
+            return
+        self.log_event(guild, "message_edit", message_edit_embed, after, before_content)
 
     # ===== УЧАСТНИКИ =====
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        """Логирование входа участника"""
-        embed = discord.Embed(
-            title="✅ Участник присоединился",
-            color=discord.Color.green(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Участник", value=f"{member.mention}\n{member.name}#{member.discriminator}", inline=True)
-        embed.add_field(name="Аккаунт создан", value=f"<t:{int(member.created_at.timestamp())}:R>", inline=True)
-        embed.add_field(name="Участников", value=member.guild.member_count, inline=True)
-
-        embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-        embed.set_footer(text=f"ID: {member.id}")
-
-        await self.send_log(member.guild, embed, "member_join")
+        """Логирование входа участника (в локдауне — только сводка от модерации)"""
+        if get_join_guard(self.bot).observe(member):
+            return
+        self.log_event(member.guild, "member_join", member_join_embed, member)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         """Логирование выхода участника"""
-        embed = discord.Embed(
-            title="🚪 Участник вышел",
-            color=discord.Color.orange(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Участник", value=f"{member.display_name}\n{member.name}#{member.discriminator}",
-                        inline=True)
-        embed.add_field(name="Присоединился", value=f"<t:{int(member.joined_at.timestamp())}:R>", inline=True)
-        embed.add_field(name="Участников", value=member.guild.member_count, inline=True)
-
-        roles = [role.mention for role in member.roles[1:]]  # Исключаем @everyone
-        if roles:
-            roles_text = ", ".join(roles[:5])
-            if len(roles) > 5:
-                roles_text += f" и ещё {len(roles) - 5}"
-            embed.add_field(name="Роли", value=roles_text, inline=False)
-
-        embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-        embed.set_footer(text=f"ID: {member.id}")
-
-        await self.send_log(member.guild, embed, "member_leave")
+        self.log_event(member.guild, "member_leave", member_leave_embed, member)
 
     @commands.Cog.listener()
     async def on_member_ban(self, guild, user):
         """Логирование бана"""
-        embed = discord.Embed(
-            title="🔨 Участник забанен",
-            color=discord.Color.red(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Участник", value=f"{user.name}#{user.discriminator}", inline=True)
-        embed.add_field(name="ID", value=user.id, inline=True)
+        if not self.wants(guild, "member_ban"):
+            return
 
         # Пытаемся получить информацию о бане
+        reason = None
         try:
             ban = await guild.fetch_ban(user)
-            if ban.reason:
-                embed.add_field(name="Причина", value=ban.reason, inline=False)
+            reason = ban.reason
         except:
             pass
 
-        embed.set_thumbnail(url=user.avatar.url if user.avatar else user.default_avatar.url)
-
-        await self.send_log(guild, embed, "member_ban")
+        self.log_event(guild, "member_ban", member_ban_embed, user, reason)
 
     @commands.Cog.listener()
     async def on_member_unban(self, guild, user):
         """Логирование разбана"""
-        embed = discord.Embed(
-            title="🔓 Участник разбанен",
-            color=discord.Color.green(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        embed.add_field(name="Участник", value=f"{user.name}#{user.discriminator}", inline=True)
-        embed.add_field(name="ID", value=user.id, inline=True)
-
-        embed.set_thumbnail(url=user.avatar.url if user.avatar else user.default_avatar.url)
-
-        await self.send_log(guild, embed, "member_unban")
+        self.log_event(guild, "member_unban", member_unban_embed, user)
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
         """Логирование изменений участника"""
         # Смена ника
         if before.display_name != after.display_name:
-            embed = discord.Embed(
-                title="👤 Смена ника",
-                color=discord.Color.blue(),
-                timestamp=datetime.datetime.utcnow()
-            )
-            embed.add_field(name="Участник", value=after.mention, inline=True)
-            embed.add_field(name="Было", value=before.display_name, inline=True)
-            embed.add_field(name="Стало", value=after.display_name, inline=True)
-            embed.set_thumbnail(url=after.avatar.url if after.avatar else after.default_avatar.url)
-            await self.send_log(after.guild, embed, "member_update")
+            self.log_event(after.guild, "member_update", nick_change_embed, before, after)
 
         # Смена ролей
-        if before.roles != after.roles:
+        if before.roles != after.roles and self.wants(after.guild, "role_changes"):
             added_roles = [role for role in after.roles if role not in before.roles]
             removed_roles = [role for role in before.roles if role not in after.roles]
 
             if added_roles or removed_roles:
-                embed = discord.Embed(
-                    title="🎭 Изменение ролей",
-                    color=discord.Color.purple(),
-                    timestamp=datetime.datetime.utcnow()
-                )
-                embed.add_field(name="Участник", value=after.mention, inline=True)
-
-                if added_roles:
-                    embed.add_field(name="Добавлены", value=", ".join([role.mention for role in added_roles]),
-                                    inline=False)
-                if removed_roles:
-                    embed.add_field(name="Удалены", value=", ".join([role.mention for role in removed_roles]),
-                                    inline=False)
-
-                embed.set_thumbnail(url=after.avatar.url if after.avatar else after.default_avatar.url)
-                await self.send_log(after.guild, embed, "role_changes")
+                self.log_event(after.guild, "role_changes", role_change_embed, after, added_roles, removed_roles)
 
     # ===== КАНАЛЫ =====
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel):
         """Логирование создания канала"""
-        embed = discord.Embed(
-            title="📁 Канал создан",
-            color=discord.Color.green(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        channel_type = "Голосовой" if isinstance(channel, discord.VoiceChannel) else "Текстовый"
-        embed.add_field(name="Тип", value=channel_type, inline=True)
-        embed.add_field(name="Название", value=channel.name, inline=True)
-        embed.add_field(name="Категория", value=channel.category.name if channel.category else "Нет", inline=True)
-
-        await self.send_log(channel.guild, embed, "channel_changes")
+        self.invalidate_log_channel(channel.guild.id)
+        self.log_event(channel.guild, "channel_changes", channel_embed, channel, True)
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel):
         """Логирование удаления канала"""
-        embed = discord.Embed(
-            title="🗑️ Канал удалён",
-            color=discord.Color.red(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        channel_type = "Голосовой" if isinstance(channel, discord.VoiceChannel) else "Текстовый"
-        embed.add_field(name="Тип", value=channel_type, inline=True)
-        embed.add_field(name="Название", value=channel.name, inline=True)
-        embed.add_field(name="Категория", value=channel.category.name if channel.category else "Нет", inline=True)
-
-        await self.send_log(channel.guild, embed, "channel_changes")
+        self.invalidate_log_channel(channel.guild.id)
+        self.log_event(channel.guild, "channel_changes", channel_embed, channel, False)
 
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before, after):
         """Логирование изменений канала"""
+        self.invalidate_log_channel(after.guild.id)
+        if not self.wants(after.guild, "channel_changes"):
+            return
+
         changes = []
 
         if before.name != after.name:
@@ -314,68 +506,13 @@ class Logging(commands.Cog):
             changes.append(f"**Категория:** {before_cat} → {after_cat}")
 
         if changes:
-            embed = discord.Embed(
-                title="⚙️ Канал изменён",
-                color=discord.Color.blue(),
-                timestamp=datetime.datetime.utcnow()
-            )
-
-            channel_type = "Голосовой" if isinstance(after, discord.VoiceChannel) else "Текстовый"
-            embed.add_field(name="Тип", value=channel_type, inline=True)
-            embed.add_field(name="Канал", value=after.mention, inline=True)
-            embed.add_field(name="Изменения", value="\n".join(changes), inline=False)
-
-            await self.send_log(after.guild, embed, "channel_changes")
+            self.log_event(after.guild, "channel_changes", channel_update_embed, after, changes)
 
     # ===== ГОЛОСОВЫЕ КАНАЛЫ =====
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """Логирование изменений голосового статуса"""
-        # Вход в голосовой канал
-        if not before.channel and after.channel:
-            embed = discord.Embed(
-                title="🎤 Вход в голосовой канал",
-                color=discord.Color.green(),
-                timestamp=datetime.datetime.utcnow()
-            )
-            embed.add_field(name="Участник", value=member.mention, inline=True)
-            embed.add_field(name="Канал", value=after.channel.name, inline=True)
-            await self.send_log(member.guild, embed, "voice_changes")
-
-        # Выход из голосового канала
-        elif before.channel and not after.channel:
-            embed = discord.Embed(
-                title="🚪 Выход из голосового канала",
-                color=discord.Color.orange(),
-                timestamp=datetime.datetime.utcnow()
-            )
-            embed.add_field(name="Участник", value=member.mention, inline=True)
-            embed.add_field(name="Канал", value=before.channel.name, inline=True)
-            await self.send_log(member.guild, embed, "voice_changes")
-
-        # Смена голосового канала
-        elif before.channel and after.channel and before.channel != after.channel:
-            embed = discord.Embed(
-                title="🔄 Смена голосового канала",
-                color=discord.Color.blue(),
-                timestamp=datetime.datetime.utcnow()
-            )
-            embed.add_field(name="Участник", value=member.mention, inline=True)
-            embed.add_field(name="Было", value=before.channel.name, inline=True)
-            embed.add_field(name="Стало", value=after.channel.name, inline=True)
-            await self.send_log(member.guild, embed, "voice_changes")
-
-        # Мьют/дефьют
-        elif before.self_mute != after.self_mute:
-            status = "🔇 Самомьют" if after.self_mute else "🔊 Снятие самомьюта"
-            embed = discord.Embed(
-                title=status,
-                color=discord.Color.orange(),
-                timestamp=datetime.datetime.utcnow()
-            )
-            embed.add_field(name="Участник", value=member.mention, inline=True)
-            embed.add_field(name="Канал", value=after.channel.name if after.channel else "Неизвестно", inline=True)
-            await self.send_log(member.guild, embed, "voice_changes")
+        self.log_event(member.guild, "voice_changes", voice_embed, member, before, after)
 
     # ===== СЛЭШ-КОМАНДЫ ДЛЯ НАСТРОЙКИ =====
     @app_commands.command(name="logs_channel", description="Установить канал для логов")
@@ -409,11 +546,9 @@ class Logging(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def logs_enable(self, interaction: discord.Interaction, event_type: app_commands.Choice[str]):
         """Включить логирование определенного события"""
-        guild_config = self.get_guild_config(interaction.guild_id)
-
-        if event_type.value in guild_config["enabled_events"]:
-            guild_config["enabled_events"][event_type.value] = True
-            self.set_guild_config(interaction.guild_id, "enabled_events", guild_config["enabled_events"])
+        if event_type.value in LOGGING_DEFAULTS["enabled_events"]:
+            self.config.edit(interaction.guild_id)["enabled_events"][event_type.value] = True
+            self.config.commit(interaction.guild_id, "enabled_events")
 
             embed = discord.Embed(
                 title="✅ Событие включено",
@@ -445,11 +580,9 @@ class Logging(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def logs_disable(self, interaction: discord.Interaction, event_type: app_commands.Choice[str]):
         """Выключить логирование определенного события"""
-        guild_config = self.get_guild_config(interaction.guild_id)
-
-        if event_type.value in guild_config["enabled_events"]:
-            guild_config["enabled_events"][event_type.value] = False
-            self.set_guild_config(interaction.guild_id, "enabled_events", guild_config["enabled_events"])
+        if event_type.value in LOGGING_DEFAULTS["enabled_events"]:
+            self.config.edit(interaction.guild_id)["enabled_events"][event_type.value] = False
+            self.config.commit(interaction.guild_id, "enabled_events")
 
             embed = discord.Embed(
                 title="✅ Событие выключено",
@@ -506,6 +639,27 @@ class Logging(commands.Cog):
                 inline=True
             )
 
+        stats = self.bus.discord.stats()
+        embed.add_field(
+            name="📬 Очередь логов",
+            value=(
+                f"Поставлено: **{stats['queued']}**, отправлено: **{stats['sent']}**, "
+                f"в сводках: **{stats['summarized']}**, потеряно: **{stats['dropped']}**\n"
+                f"Ожидает: **{stats['backlog']}**, упёрлись в лимит: **{stats['rate_limited']}**"
+            ),
+            inline=False
+        )
+
+        cache = self.messages.stats()
+        embed.add_field(
+            name="🗂️ Кэш сообщений",
+            value=(
+                f"В памяти: **{cache['records']}** ({cache['bytes'] // 1024} КБ), на диске: **{cache['on_disk']}**\n"
+                f"Найдено: **{cache['hits']}**, не найдено: **{cache['misses']}**"
+            ),
+            inline=False
+        )
+
         embed.add_field(
             name="📋 Команды",
             value=(
@@ -1,7 +1,6 @@
 import re
 import json
 import datetime
-from collections import defaultdict, deque
 from urllib.parse import urlparse
 import asyncio
 import typing as t
@@ -10,9 +9,52 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from utils.automod_rules import (
+    DEFAULT_REASONS,
+    DEFAULT_RULES,
+    DUPLICATE_DEFAULTS,
+    RATE_TYPES,
+    RULE_TYPES,
+    AutomodPlan,
+    MessageView,
+    RuleError,
+    attachment_count,
+    compile_plan,
+    duplicate_options,
+    mention_count,
+    rate_limits,
+    rule_name,
+    validate_rule,
+)
+from utils.bulk_delete import DeferredDeleter, delete_messages
+from utils.config_service import get_config_service
+from utils.dm_queue import DMQueue
+from utils.domain_matcher import DomainMatcher
+from utils.expiry_scheduler import ExpiryScheduler
+from utils.fingerprints import DuplicateDetector, fingerprint, hamming, normalize
+from utils.flood_tracker import FloodTracker
+from utils.join_guard import get_join_guard
+from utils.log_bus import LogRecord, get_log_bus
+from utils.moderation_storage import create_storage
+from utils.overwrites import apply_overwrites, overwrite_missing
+from utils.pagination import EmbedPaginator
+from utils.punishments import (
+    ACTION_NAMES,
+    ACTIONS,
+    MAX_TIMEOUT_MINUTES,
+    TIMED_ACTIONS,
+    PunishmentLadder,
+    PunishmentStep,
+    compile_ladder,
+    describe_step,
+    format_minutes,
+)
+from utils.warning_ledger import WarningLedger
+
 WARNINGS_FILE = "warnings.json"
 CONFIG_FILE = "moderation_config.json"
 MUTES_FILE = "mutes.json"  # файл для хранения временных мьютов
+CONFIG_SECTION = "moderation"  # имя раздела в общем сервисе конфигов (для подписчиков)
 
 # Дефолтные списки доменов (для новых серверов)
 DEFAULT_ALLOWED_DOMAINS = {
@@ -31,106 +73,164 @@ DEFAULT_BLOCKED_DOMAINS = {
     "ok.ru",
 }
 
-# Антикапс / антифлуд
-CAPS_MIN_LENGTH = 10
-CAPS_PERCENT = 0.7
+# Пороги капса/флуда/копипасты и префиксы команд — в правилах автомода сервера (/automod_*),
+# по умолчанию — utils/automod_rules.py: DEFAULT_RULES / DEFAULT_IGNORE_PREFIXES
 
-SPAM_WINDOW = 10  # окно для антифлуда (сек)
-SPAM_THRESHOLD = 3  # сколько сообщений за SPAM_WINDOW считается флудом
+# Наказания по количеству варнов и за флуд настраиваются на сервер (/punish_*),
+# по умолчанию — utils/punishments.py: DEFAULT_LADDER / DEFAULT_FLOOD_PUNISHMENT
 
-FLOOD_MUTE_MINUTES = 5  # мут при флуде (в минутах)
+MUTED_LIST_PAGE_SIZE = 10
+PURGE_MAX_SCAN = 10000  # сколько последних сообщений канала /purge просматривает максимум
+PURGE_FINGERPRINT_DISTANCE = 7  # «похожий текст» для /purge — как у поиска копипасты
+WARNINGS_PAGE_SIZE = 8
 
-# Наказания по количеству предупреждений
-# Пример: при 3 варнах → авто-мьют
-PUNISHMENTS = {
-    3: "mute"
-}
-MAX_WARNINGS = max(PUNISHMENTS.keys())
-AUTO_MUTE_MINUTES = 10  # длительность авто-мьюта по варну (из PUNISHMENTS)
+# Рейд входами: сводка раз в RAID_SUMMARY_INTERVAL сек, мьют новых аккаунтов на RAID_MUTE_MINUTES
+RAID_SUMMARY_INTERVAL = 60
+RAID_MUTE_MINUTES = 60
+RAID_MUTE_CONCURRENCY = 5
 
 URL_REGEX = re.compile(r"(https?://[^\s]+)", re.IGNORECASE)
 
+# права роли Muted в каждом канале
+MUTE_OVERWRITE = discord.PermissionOverwrite(
+    send_messages=False,
+    send_messages_in_threads=False,
+    create_public_threads=False,
+    create_private_threads=False,
+    speak=False,
+    add_reactions=False,
+    connect=False,
+)
+
+# mute_mode сервера: "role" — роль Muted (по умолчанию), "timeout" — встроенный тайм-аут Discord
+MUTE_MODES = {"role": "Роль Muted", "timeout": "Тайм-аут Discord"}
+MUTE_MODE_CHOICES = [app_commands.Choice(name=name, value=mode) for mode, name in MUTE_MODES.items()]
+
+PUNISH_CHOICES = [app_commands.Choice(name=ACTION_NAMES[a], value=a) for a in ACTIONS]
+
 
 class Moder(commands.Cog):
     """
     Модерация:
-    - анти-капс / анти-флуд / фильтр ссылок
-    - система предупреждений (с наказаниями по PUNISHMENTS)
+    - анти-капс / анти-флуд / анти-копипаста / фильтр ссылок
+    - система предупреждений (с лестницей наказаний сервера: /punish_*)
     - лог-канал
     - настраиваемые списки доменов
     - ручные мьюты: /mute / /unmute / /tempmute / /muted_list / /muteinfo
+    - защита от рейда входами: /lockdown / /raidguard
     """
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.warnings = self.load_warnings()
-        self.config = self.load_config()
-        self.mutes = self.load_mutes()  # {guild_id(str): {user_id(str): unmute_ts(float)}}
-        # user_messages[guild_id][user_id] = deque[timestamps]
-        self.user_messages: dict[int, dict[int, deque]] = defaultdict(lambda: defaultdict(deque))
-        self.last_flood: dict[int, dict[int, float]] = defaultdict(dict)
+        # JSON-файлы с отложенной записью или SQLite (MODERATION_STORAGE), см. utils/moderation_storage.py
+        self.storage = create_storage(WARNINGS_FILE, CONFIG_FILE, MUTES_FILE)
+        warnings_data, self.config, self.mutes = self.storage.load()
+        # конфиг хранит свой бэкенд (JSON/SQLite), но изменения публикуются
+        # в общем сервисе конфигов — подписчики сбрасывают по ним кэши
+        self.configs = get_config_service(bot)
+        self._config_ready: set[str] = set()  # серверы, чей конфиг уже дополнен дефолтами
+        # журнал варнов с историей; истёкшие по warn_decay_days не считаются (без фоновой чистки)
+        self.warnings = WarningLedger(warnings_data)
+        for gid, cfg in self.config.items():
+            self.warnings.set_decay(int(gid), cfg.get("warn_decay_days"))
+        # self.mutes: {guild_id(str): {user_id(str): unmute_ts(float)}}
+        # кольцевые буферы отметок времени по (guild_id, user_id), с вычисткой неактивных;
+        # один трекер на каждую тройку (тип, окно, порог) из частотных правил
+        self._rate_trackers: dict[tuple[str, float, int], FloodTracker] = {}
+        # скомпилированные планы правил автомода по серверам (сбрасываются при /automod_*)
+        self._automod_plans: dict[int, AutomodPlan] = {}
+        # отпечатки недавних сообщений для поиска копипасты (ограниченный LRU на сервер);
+        # один детектор на каждый набор порогов из правил duplicates
+        self._duplicate_detectors: dict[tuple, DuplicateDetector] = {}
+        # скомпилированные матчеры доменов по серверам (сбрасываются при /adddomain, /blockdomain)
+        self._domain_matchers: dict[int, DomainMatcher] = {}
         self._mute_task: t.Optional[asyncio.Task] = None
+        # куча сроков временных мьютов (восстанавливается из mutes.json)
+        self._mute_scheduler = ExpiryScheduler()
+        for gid, users in self.mutes.items():
+            for uid, ts in users.items():
+                self._mute_scheduler.schedule(int(gid), int(uid), float(ts))
+        self._mute_role_ids: dict[int, int] = {}
+        # лог-эмбеды уходят в общую шину логов (пачками в канал, Telegram, JSONL)
+        self.log_bus = get_log_bus(bot)
+        # ЛС пользователям доставляются в фоне: наказание не ждёт DM
+        self.dm_queue = DMQueue()
+        # удаления автомода копятся по каналам и уходят bulk-запросами
+        self.deleter = DeferredDeleter()
+        # индекс замьюченных: {guild_id: {user_id}}, строится при первом /muted_list
+        # и дальше поддерживается по on_member_update
+        self._muted_members: dict[int, set[int]] = {}
+        # то же для тайм-аутов (mute_mode=timeout); истёкшие отсеиваются при чтении
+        self._timed_out_members: dict[int, set[int]] = {}
+        # фоновые задачи настройки прав роли Muted: {guild_id: task}
+        self._overwrite_tasks: dict[int, asyncio.Task] = {}
+        # детектор рейдов входами, общий с AutoRole и Logging
+        self.join_guard = get_join_guard(bot)
+        # новые аккаунты, ждущие пакетного мьюта в локдауне: {guild_id: [user_id]}
+        self._raid_mute_queue: dict[int, list[int]] = {}
+        # лестницы наказаний, скомпилированные в {число варнов: шаг}
+        self._ladders: dict[int, PunishmentLadder] = {
+            int(gid): compile_ladder(cfg) for gid, cfg in self.config.items()
+        }
+        self._lockdown_task: t.Optional[asyncio.Task] = None
+        # задачи, запущенные из on_lockdown_change (держим ссылки, чтобы их не собрал GC)
+        self._lockdown_jobs: set[asyncio.Task] = set()
 
     async def cog_load(self):
         """Запускаем фонового смотрителя мьютов при загрузке кога."""
         self._mute_task = self.bot.loop.create_task(self.mute_watcher())
+        self.configs.subscribe(CONFIG_SECTION, self.on_config_change)
+        self.log_bus.discord.route("moderation", self.get_log_channel)
+        for gid, cfg in self.config.items():
+            self.configure_join_guard(int(gid), cfg)
+        self.join_guard.add_listener(self.on_lockdown_change)
+        self._lockdown_task = self.bot.loop.create_task(self.lockdown_watcher())
 
     async def cog_unload(self):
         if self._mute_task:
             self._mute_task.cancel()
+        if self._lockdown_task:
+            self._lockdown_task.cancel()
+        self.join_guard.remove_listener(self.on_lockdown_change)
+        for task in self._lockdown_jobs:
+            task.cancel()
+        self.configs.unsubscribe(CONFIG_SECTION, self.on_config_change)
+        for task in self._overwrite_tasks.values():
+            task.cancel()
+        await self.dm_queue.close()
+        await self.deleter.close()
+        self.log_bus.discord.unroute("moderation")
+        await self.storage.close()
 
     # ===== Файлы предупреждений / конфиг / мьюты =====
 
-    def load_warnings(self) -> dict:
-        try:
-            with open(WARNINGS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+    def save_config(self, guild_id: int) -> None:
+        self.storage.config_changed(guild_id, self.config[str(guild_id)])
+        self.configs.notify(CONFIG_SECTION, guild_id)
 
-    def save_warnings(self) -> None:
-        with open(WARNINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.warnings, f, ensure_ascii=False, indent=4)
+    def on_config_change(self, key: str, field: t.Optional[str]) -> None:
+        """Конфиг сервера изменился — сбрасываем всё, что из него скомпилировано."""
+        guild_id = int(key)
+        self._ladders.pop(guild_id, None)
+        self.invalidate_automod_plan(guild_id)
+        self.invalidate_domain_matcher(guild_id)
 
-    def load_config(self) -> dict:
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-                return {}
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def save_config(self) -> None:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=4)
-
-    def load_mutes(self) -> dict:
-        """Загружаем активные ВРЕМЕННЫЕ мьюты из файла."""
-        try:
-            with open(MUTES_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-                return {}
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def save_mutes(self) -> None:
-        with open(MUTES_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.mutes, f, ensure_ascii=False, indent=4)
+    async def flush_storage(self) -> None:
+        """Немедленно записывает все несохранённые изменения на диск."""
+        await self.storage.flush()
 
     def get_guild_config(self, guild: discord.Guild) -> dict:
-        """Конфиг для сервера, с дефолтами если ещё нет."""
+        """Конфиг для сервера, с дефолтами если ещё нет (дополняется один раз)."""
         gid = str(guild.id)
+        if gid in self._config_ready:
+            return self.config[gid]
         if gid not in self.config:
             self.config[gid] = {
                 "log_channel_id": None,
                 "allowed_domains": list(DEFAULT_ALLOWED_DOMAINS),
                 "blocked_domains": list(DEFAULT_BLOCKED_DOMAINS),
             }
-            self.save_config()
+            self.save_config(guild.id)
         else:
             cfg = self.config[gid]
             if "allowed_domains" not in cfg:
@@ -139,56 +239,141 @@ class Moder(commands.Cog):
                 cfg["blocked_domains"] = list(DEFAULT_BLOCKED_DOMAINS)
             if "log_channel_id" not in cfg:
                 cfg["log_channel_id"] = None
+        self._config_ready.add(gid)
         return self.config[gid]
 
     # ===== Предупреждения =====
 
     def get_warn_count(self, guild_id: int, user_id: int) -> int:
-        return self.warnings.get(str(guild_id), {}).get(str(user_id), 0)
+        return self.warnings.count(guild_id, user_id)
 
-    def add_warning(self, guild_id: int, user_id: int) -> int:
-        gid = str(guild_id)
-        uid = str(user_id)
-        if gid not in self.warnings:
-            self.warnings[gid] = {}
-        self.warnings[gid][uid] = self.warnings[gid].get(uid, 0) + 1
-        self.save_warnings()
-        return self.warnings[gid][uid]
+    def add_warning(
+            self,
+            guild_id: int,
+            user_id: int,
+            reason: str,
+            *,
+            moderator: t.Any = None,
+            message: t.Optional[discord.Message] = None,
+    ) -> int:
+        """Записывает варн в журнал и возвращает число активных варнов."""
+        content = None
+        if message is not None and message.content:
+            content = message.content[:200]
+        entry, count = self.warnings.add(
+            guild_id,
+            user_id,
+            reason=reason,
+            moderator=str(moderator) if moderator is not None else None,
+            moderator_id=moderator.id if isinstance(moderator, (discord.User, discord.Member)) else None,
+            message=message.jump_url if message is not None else None,
+            content=content,
+        )
+        self.storage.warning_added(guild_id, user_id, entry)
+        return count
 
     def clear_warnings(self, guild_id: int, user_id: int) -> None:
-        gid = str(guild_id)
-        uid = str(user_id)
-        if gid in self.warnings and uid in self.warnings[gid]:
-            del self.warnings[gid][uid]
-            self.save_warnings()
+        if self.warnings.count(guild_id, user_id) and self.warnings.clear(guild_id, user_id):
+            record = self.warnings.data[str(guild_id)][str(user_id)]
+            self.storage.warnings_cleared(guild_id, user_id, record["cleared_at"])
 
     # ===== Антикапс / антифлуд =====
 
-    def is_caps_abuse(self, content: str) -> bool:
-        letters = [c for c in content if c.isalpha()]
-        if len(letters) < CAPS_MIN_LENGTH:
-            return False
-        upper_count = sum(1 for c in letters if c.isupper())
-        return (upper_count / len(letters)) >= CAPS_PERCENT
-
-    def check_flood(self, message: discord.Message) -> bool:
-        """True, если пользователь флудит (SPAM_THRESHOLD сообщений за SPAM_WINDOW сек)."""
+    def get_rate_tracker(self, rule: dict) -> FloodTracker:
+        """Трекер частотного правила (flood / mention_rate / attachment_rate)."""
+        window, threshold = rate_limits(rule)
+        key = (rule["type"], window, threshold)
+        tracker = self._rate_trackers.get(key)
+        if tracker is None:
+            tracker = self._rate_trackers[key] = FloodTracker(window, threshold)
+        return tracker
+
+    def get_duplicate_detector(self, rule: dict) -> DuplicateDetector:
+        """Детектор копипасты правила duplicates."""
+        options = duplicate_options(rule)
+        key = tuple(options.values())
+        detector = self._duplicate_detectors.get(key)
+        if detector is None:
+            detector = self._duplicate_detectors[key] = DuplicateDetector(**options)
+        return detector
+
+    def check_duplicates(self, message: discord.Message, detector: DuplicateDetector) -> t.Optional[str]:
+        """Причина, если сообщение — копипаста (рейд или многократный повтор), иначе None."""
         now = datetime.datetime.now(datetime.timezone.utc).timestamp()
-        guild_id = message.guild.id
-        user_id = message.author.id
+        verdict = detector.check(message.guild.id, message.author.id, message.content, now)
+        if verdict == "raid":
+            return "массовая рассылка одинакового текста"
+        if verdict == "repeat":
+            return "повтор одного и того же сообщения"
+        return None
+
+    # ===== Правила автомода =====
+
+    def get_automod_plan(self, guild: discord.Guild) -> AutomodPlan:
+        """План проверки сообщений сервера (компилируется один раз, до изменения правил)."""
+        plan = self._automod_plans.get(guild.id)
+        if plan is None:
+            cfg = self.get_guild_config(guild)
+            plan = compile_plan(
+                cfg.get("automod_rules"),
+                cfg.get("automod_ignore_prefixes"),
+                {
+                    "links": self._links_check,
+                    "duplicates": self._duplicates_check,
+                    "flood": lambda rule: self._rate_check(rule, lambda message: 1),
+                    "mention_rate": lambda rule: self._rate_check(rule, mention_count),
+                    "attachment_rate": lambda rule: self._rate_check(rule, attachment_count),
+                },
+            )
+            self._automod_plans[guild.id] = plan
+        return plan
 
-        dq = self.user_messages[guild_id][user_id]
-        dq.append(now)
+    def invalidate_automod_plan(self, guild_id: int) -> None:
+        self._automod_plans.pop(guild_id, None)
 
-        # чистим окно
-        while dq and now - dq[0] > SPAM_WINDOW:
-            dq.popleft()
+    def _links_check(self, rule: dict):
+        reason = rule.get("reason") or DEFAULT_REASONS["links"]
 
-        return len(dq) >= SPAM_THRESHOLD
+        def check(view: MessageView) -> t.Optional[str]:
+            blocked, domains = self.has_blocked_link(view.content, view.message.guild, view.lower)
+            return f"{reason} ({', '.join(domains)})" if blocked else None
+
+        return check
+
+    def _duplicates_check(self, rule: dict):
+        detector = self.get_duplicate_detector(rule)
+        return lambda view: self.check_duplicates(view.message, detector)
+
+    def _rate_check(self, rule: dict, counter):
+        """counter(message) событий за сообщение; срабатывает, если за окно их больше порога."""
+        tracker = self.get_rate_tracker(rule)
+        reason = rule.get("reason") or DEFAULT_REASONS[rule["type"]]
+
+        def check(view: MessageView) -> t.Optional[str]:
+            message = view.message
+            count = counter(message)
+            if not count:
+                return None  # без упоминаний/вложений трекер не трогаем
+            now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+            return reason if tracker.hit(message.guild.id, message.author.id, now, count) else None
+
+        return check
 
     # ===== Домены и ссылки =====
 
-    def extract_domains(self, text: str, blocked_domains: set[str]) -> set[str]:
+    def get_domain_matcher(self, guild: discord.Guild) -> DomainMatcher:
+        """Матчер доменов сервера (строится один раз, до изменения списков)."""
+        matcher = self._domain_matchers.get(guild.id)
+        if matcher is None:
+            cfg = self.get_guild_config(guild)
+            matcher = DomainMatcher(cfg.get("allowed_domains", []), cfg.get("blocked_domains", []))
+            self._domain_matchers[guild.id] = matcher
+        return matcher
+
+    def invalidate_domain_matcher(self, guild_id: int) -> None:
+        self._domain_matchers.pop(guild_id, None)
+
+    def extract_domains(self, text: str, matcher: DomainMatcher, lower: t.Optional[str] = None) -> set[str]:
         """Парсим домены из текста + 'голые' заблокированные."""
         domains: set[str] = set()
 
@@ -205,37 +390,26 @@ class Moder(commands.Cog):
             except ValueError:
                 continue
 
-        # голые домены из блок-листа
-        low = text.lower()
-        for d in blocked_domains:
-            if d in low:
-                domains.add(d)
+        # голые домены из блок-листа (один проход автоматом)
+        domains |= matcher.scan_bare(text.lower() if lower is None else lower)
 
         return domains
 
-    def has_blocked_link(self, text: str, guild: discord.Guild) -> tuple[bool, list[str]]:
+    def has_blocked_link(
+            self,
+            text: str,
+            guild: discord.Guild,
+            lower: t.Optional[str] = None,
+    ) -> tuple[bool, list[str]]:
         """Проверка на запрещённые/неразрешённые домены для этого сервера."""
-        cfg = self.get_guild_config(guild)
-        allowed = set(cfg.get("allowed_domains", []))
-        blocked = set(cfg.get("blocked_domains", []))
+        matcher = self.get_domain_matcher(guild)
 
-        domains = self.extract_domains(text, blocked)
+        domains = self.extract_domains(text, matcher, lower)
         if not domains:
             return False, []
 
-        blocked_domains: set[str] = set()
-        for domain in domains:
-            # 1) явно заблокированный
-            for bad in blocked:
-                if domain == bad or domain.endswith("." + bad):
-                    blocked_domains.add(domain)
-                    break
-            else:
-                # 2) если есть allow-лист и домен не в нём — блочим
-                if allowed and not any(domain == good or domain.endswith("." + good) for good in allowed):
-                    blocked_domains.add(domain)
-
-        return (len(blocked_domains) > 0), sorted(blocked_domains)
+        blocked_domains = matcher.filter(domains)
+        return (len(blocked_domains) > 0), blocked_domains
 
     # ===== Логи =====
 
@@ -260,10 +434,23 @@ class Moder(commands.Cog):
             message: t.Optional[discord.Message] = None,
             extra: t.Optional[str] = None,
     ):
-        channel = self.get_log_channel(guild)
-        if channel is None:
+        """Публикует действие в шину логов (эмбед собирается один раз на все приёмники)."""
+        if self.get_log_channel(guild) is None and not self.log_bus.delivers(guild):
             return
+        self.log_bus.publish(LogRecord(
+            guild, "moderation", action, self.build_action_embed,
+            (action, member, reason, moderator, message, extra),
+        ))
 
+    @staticmethod
+    def build_action_embed(
+            action: str,
+            member: t.Optional[discord.Member],
+            reason: t.Optional[str],
+            moderator: t.Any,
+            message: t.Optional[discord.Message],
+            extra: t.Optional[str],
+    ) -> discord.Embed:
         embed = discord.Embed(
             title=f"Модерация: {action}",
             color=discord.Color.orange(),
@@ -297,14 +484,13 @@ class Moder(commands.Cog):
 
         if extra:
             embed.add_field(name="Дополнительно", value=extra, inline=False)
-
-        await channel.send(embed=embed)
+        return embed
 
     # ===== Роль Muted и система мьютов =====
 
     async def create_mute_role(self, guild: discord.Guild):
-        """Создаёт/находит роль Muted и настраивает права во всех каналах."""
-        mute_role = discord.utils.get(guild.roles, name="Muted")
+        """Создаёт/находит роль Muted; права в каналах настраиваются в фоне."""
+        mute_role = self.get_mute_role(guild)
 
         if not mute_role:
             try:
@@ -313,58 +499,141 @@ class Moder(commands.Cog):
                     color=discord.Color.dark_gray(),
                     reason="Роль для мьюта пользователей"
                 )
-
-                for channel in guild.channels:
-                    try:
-                        await channel.set_permissions(
-                            mute_role,
-                            send_messages=False,
-                            send_messages_in_threads=False,
-                            create_public_threads=False,
-                            create_private_threads=False,
-                            speak=False,
-                            add_reactions=False,
-                            connect=False
-                        )
-                    except Exception:
-                        continue
-
             except discord.Forbidden:
                 return None
 
+            self._mute_role_ids[guild.id] = mute_role.id
+            # на больших серверах это сотни запросов — мьют их не ждёт
+            self.start_mute_overwrites(guild, mute_role)
+
         return mute_role
 
-    async def mute_watcher(self):
-        """Периодически проверяет, у кого истёк мут, и снимает роль Muted (даже после перезапуска)."""
-        await self.bot.wait_until_ready()
-        while not self.bot.is_closed():
-            now = datetime.datetime.now(datetime.timezone.utc).timestamp()
-            changed = False
+    def start_mute_overwrites(
+            self,
+            guild: discord.Guild,
+            mute_role: discord.Role,
+            *,
+            only_missing: bool = False,
+            channel_ids: t.Optional[t.Collection[int]] = None,
+            progress=None,
+    ) -> asyncio.Task:
+        """Запускает (или возвращает уже идущую) настройку прав роли Muted."""
+        task = self._overwrite_tasks.get(guild.id)
+        if task is None or task.done():
+            task = asyncio.create_task(self.sync_mute_overwrites(
+                guild, mute_role, only_missing=only_missing, channel_ids=channel_ids, progress=progress
+            ))
+            self._overwrite_tasks[guild.id] = task
+        return task
+
+    async def sync_mute_overwrites(
+            self,
+            guild: discord.Guild,
+            mute_role: discord.Role,
+            *,
+            only_missing: bool = False,
+            channel_ids: t.Optional[t.Collection[int]] = None,
+            progress=None,
+    ) -> tuple[int, int]:
+        """
+        Выставляет MUTE_OVERWRITE во всех (или только в ненастроенных / в channel_ids) каналах.
+        Пока настройка не завершена, в конфиге сервера стоит mute_setup_pending: True —
+        после перезапуска она продолжится с каналов, где прав ещё нет; после завершения
+        с ошибками — список id неудавшихся каналов, их повторим при следующем запуске.
+        """
+        channels = list(guild.channels)
+        if channel_ids is not None:
+            wanted = set(channel_ids)
+            channels = [c for c in channels if c.id in wanted]
+        if only_missing:
+            channels = [c for c in channels if overwrite_missing(c, mute_role, MUTE_OVERWRITE)]
 
-            for gid, users in list(self.mutes.items()):
-                guild = self.bot.get_guild(int(gid))
-                if not guild:
-                    continue
+        cfg = self.get_guild_config(guild)
+        if not channels:
+            if cfg.pop("mute_setup_pending", None) is not None:
+                self._save_mute_setup(guild.id)
+            return 0, 0
+
+        cfg["mute_setup_pending"] = True
+        self._save_mute_setup(guild.id)
+
+        ok, failed = await apply_overwrites(
+            channels,
+            mute_role,
+            MUTE_OVERWRITE,
+            reason="Настройка прав роли Muted",
+            progress=progress,
+        )
 
-                for uid, ts in list(users.items()):
-                    if ts <= now:
-                        member = guild.get_member(int(uid))
-                        mute_role = discord.utils.get(guild.roles, name="Muted")
-                        if member and mute_role and mute_role in member.roles:
-                            try:
-                                await member.remove_roles(mute_role, reason="Авто-размьют (по времени)")
-                            except Exception:
-                                pass
-                        del users[uid]
-                        changed = True
+        if failed:
+            cfg["mute_setup_pending"] = [channel.id for channel in failed]
+        else:
+            cfg.pop("mute_setup_pending", None)
+        self._save_mute_setup(guild.id)
 
-                if not users:
-                    del self.mutes[gid]
+        await self.log_action(
+            guild,
+            action="Настройка роли Muted",
+            moderator="AutoMod",
+            extra=f"Каналов настроено: {ok}, ошибок: {len(failed)}",
+        )
+        return ok, len(failed)
 
-            if changed:
-                self.save_mutes()
+    def _save_mute_setup(self, guild_id: int) -> None:
+        """Сохраняет прогресс настройки прав без notify: скомпилированные из конфига кэши он не затрагивает."""
+        self.storage.config_changed(guild_id, self.config[str(guild_id)])
 
-            await asyncio.sleep(5)
+    def resume_mute_setups(self) -> None:
+        """Продолжает настройку прав, прерванную перезапуском."""
+        for gid, cfg in list(self.config.items()):
+            pending = cfg.get("mute_setup_pending")
+            if not pending:
+                continue
+            guild = self.bot.get_guild(int(gid))
+            mute_role = self.get_mute_role(guild) if guild else None
+            if mute_role is not None:
+                # список — каналы, где прошлая настройка не удалась; True — прервана целиком
+                channel_ids = pending if isinstance(pending, list) else None
+                self.start_mute_overwrites(guild, mute_role, only_missing=True, channel_ids=channel_ids)
+
+    def get_mute_role(self, guild: discord.Guild) -> t.Optional[discord.Role]:
+        """Роль Muted сервера (id кэшируется, чтобы не искать по имени каждый раз)."""
+        role_id = self._mute_role_ids.get(guild.id)
+        role = guild.get_role(role_id) if role_id else None
+        if role is None:
+            role = discord.utils.get(guild.roles, name="Muted")
+            if role is not None:
+                self._mute_role_ids[guild.id] = role.id
+        return role
+
+    async def mute_watcher(self):
+        """Снимает роль Muted ровно в момент истечения мута (даже после перезапуска)."""
+        await self.bot.wait_until_ready()
+        self.resume_mute_setups()
+        while not self.bot.is_closed():
+            await self._mute_scheduler.wait()
+            now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+            for guild_id, user_id in self._mute_scheduler.pop_due(now):
+                await self.expire_mute(guild_id, user_id)
+
+    async def expire_mute(self, guild_id: int, user_id: int):
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            # сервер пока недоступен — повторим попытку позже, запись не трогаем
+            ts = self.mutes.get(str(guild_id), {}).get(str(user_id))
+            if ts is not None:
+                retry = datetime.datetime.now(datetime.timezone.utc).timestamp() + 60
+                self._mute_scheduler.schedule(guild_id, user_id, retry)
+            return
+
+        member = guild.get_member(user_id)
+        mute_role = self.get_mute_role(guild)
+        if member and mute_role and mute_role in member.roles:
+            try:
+                await member.remove_roles(mute_role, reason="Авто-размьют (по времени)")
+            except Exception:
+                pass
+        self.remove_mute_record(guild_id, user_id)
 
     def register_mute(self, member: discord.Member, unmute_time: datetime.datetime):
         """Записываем ВРЕМЕННЫЙ мьют в self.mutes + сохраняем в файл."""
@@ -373,109 +642,216 @@ class Moder(commands.Cog):
         if gid not in self.mutes:
             self.mutes[gid] = {}
         self.mutes[gid][uid] = float(unmute_time.timestamp())
-        self.save_mutes()
+        self.storage.mute_set(member.guild.id, member.id, self.mutes[gid][uid])
+        self._mute_scheduler.schedule(member.guild.id, member.id, self.mutes[gid][uid])
 
     def remove_mute_record(self, guild_id: int, user_id: int):
+        self._mute_scheduler.cancel(guild_id, user_id)
         gid = str(guild_id)
         uid = str(user_id)
         if gid in self.mutes and uid in self.mutes[gid]:
             del self.mutes[gid][uid]
             if not self.mutes[gid]:
                 del self.mutes[gid]
-            self.save_mutes()
+            self.storage.mute_removed(guild_id, user_id)
 
-    # ===== Наказания по варнам (mute по PUNISHMENTS) =====
+    def uses_timeouts(self, guild: discord.Guild) -> bool:
+        """Мьюты сервера — тайм-ауты Discord (без роли, прав в каналах и mutes.json)."""
+        return self.get_guild_config(guild).get("mute_mode") == "timeout"
 
-    async def apply_punishment(
+    def is_muted(self, member: discord.Member) -> bool:
+        if member.is_timed_out():
+            return True
+        mute_role = self.get_mute_role(member.guild)
+        return mute_role is not None and mute_role in member.roles
+
+    async def mute_member(
             self,
             member: discord.Member,
-            warn_count: int,
-            base_reason: str,
+            reason: str,
+            until: t.Optional[datetime.datetime] = None,
+    ) -> t.Optional[str]:
+        """
+        Мьют в режиме сервера (until=None — бессрочно; для тайм-аута это 28 дней).
+        Возвращает текст ошибки или None.
+        """
+        if self.uses_timeouts(member.guild):
+            if member.is_timed_out():
+                return "❌ Этот пользователь уже в тайм-ауте!"
+            limit = discord.utils.utcnow() + datetime.timedelta(minutes=MAX_TIMEOUT_MINUTES)
+            try:
+                # срок хранит Discord — ни mutes.json, ни mute_watcher не нужны
+                await member.timeout(min(until, limit) if until else limit, reason=reason)
+            except discord.Forbidden:
+                return "❌ У меня нет прав выдавать тайм-аут!"
+            except discord.HTTPException:
+                return "❌ Не удалось выдать тайм-аут по технической причине."
+            return None
+
+        mute_role = await self.create_mute_role(member.guild)
+        if not mute_role:
+            return "❌ Не удалось создать или найти роль для мьюта!"
+        if mute_role in member.roles:
+            return "❌ Этот пользователь уже замьючен!"
+        try:
+            await member.add_roles(mute_role, reason=reason)
+        except discord.Forbidden:
+            return "❌ У меня нет прав для выдачи роли Muted!"
+        except discord.HTTPException:
+            return "❌ Не удалось выдать роль Muted по технической причине."
+        if until is not None:
+            self.register_mute(member, until)
+        return None
+
+    async def unmute_member(self, member: discord.Member, reason: str) -> None:
+        """Снимает и тайм-аут, и роль Muted (мьют мог быть выдан до смены mute_mode)."""
+        if member.is_timed_out():
+            await member.timeout(None, reason=reason)
+        mute_role = self.get_mute_role(member.guild)
+        if mute_role and mute_role in member.roles:
+            await member.remove_roles(mute_role, reason=reason)
+        self.remove_mute_record(member.guild.id, member.id)
+
+    # ===== Наказания по варнам (лестница сервера) =====
+
+    def get_ladder(self, guild: discord.Guild) -> PunishmentLadder:
+        """Скомпилированная лестница наказаний сервера (пересобирается при изменении конфига)."""
+        ladder = self._ladders.get(guild.id)
+        if ladder is None:
+            ladder = self._ladders[guild.id] = compile_ladder(self.get_guild_config(guild))
+        return ladder
+
+    async def execute_punishment(
+            self,
+            member: discord.Member,
+            step: PunishmentStep,
+            reason: str,
             source_channel: discord.abc.Messageable,
+            *,
             auto: bool = True,
-    ):
+            note: t.Optional[str] = None,
+    ) -> bool:
+        """Применяет один шаг лестницы. True — если наказание выдано."""
         guild = member.guild
-        action = PUNISHMENTS.get(warn_count)
-        if not action:
-            return
+        suffix = f" ({note})" if note else ""
+        duration = format_minutes(step.minutes)
 
-        if action == "mute":
-            mute_role = await self.create_mute_role(guild)
-            if not mute_role:
-                await source_channel.send("❌ Не удалось создать или найти роль для мьюта!")
-                return
+        if step.action == "warn":
+            await source_channel.send(f"⚠️ {member.mention}, это последнее предупреждение{suffix}.")
+            return True
 
-            if mute_role in member.roles:
+        if step.action == "timeout":
+            if member.is_timed_out():
+                await source_channel.send(f"ℹ️ {member.mention} уже в тайм-ауте.")
+                return False
+            try:
+                await member.timeout(datetime.timedelta(minutes=step.minutes), reason=reason)
+            except discord.Forbidden:
+                await source_channel.send("❌ У меня нет прав выдавать тайм-аут!")
+                return False
+            except discord.HTTPException:
+                await source_channel.send("❌ Не удалось выдать тайм-аут по технической причине.")
+                return False
+            until = discord.utils.utcnow() + datetime.timedelta(minutes=step.minutes)
+            await source_channel.send(f"🔇 {member.mention} получил(а) тайм-аут на **{duration}**{suffix}.")
+            self._send_mute_dm(member, reason, duration, until)
+
+        elif step.action == "mute":
+            # в режиме mute_mode=timeout это тоже тайм-аут
+            until = None
+            if step.minutes is not None:
+                until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=step.minutes)
+            if self.is_muted(member):
                 await source_channel.send(f"ℹ️ {member.mention} уже замьючен(а).")
-                return
-
-            duration_sec = AUTO_MUTE_MINUTES * 60
-            unmute_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=duration_sec)
-
+                return False
+            error = await self.mute_member(member, reason, until)
+            if error:
+                await source_channel.send(error)
+                return False
+            await source_channel.send(f"🔇 {member.mention} получил(а) мут на **{duration}**{suffix}.")
+            if until is not None:
+                self._send_mute_dm(member, reason, duration, until)
+
+        elif step.action in ("kick", "ban"):
+            # ЛС отправляем до удаления и ждём (недолго): после него общего сервера уже нет
+            verb = "кикнуты" if step.action == "kick" else "забанены"
+            await self.dm_queue.deliver(member, f"⛔ Вы были {verb} на сервере **{guild.name}**. Причина: {reason}")
             try:
-                await member.add_roles(mute_role, reason=base_reason)
+                if step.action == "kick":
+                    await member.kick(reason=reason)
+                else:
+                    await guild.ban(member, reason=reason, delete_message_seconds=0)
             except discord.Forbidden:
-                await source_channel.send("❌ У меня нет прав для выдачи роли Muted!")
-                return
+                await source_channel.send(f"❌ У меня нет прав на {ACTION_NAMES[step.action]}!")
+                return False
             except discord.HTTPException:
-                await source_channel.send("❌ Не удалось выдать роль Muted по технической причине.")
-                return
-
-            await source_channel.send(
-                f"🔇 {member.mention} получил(а) мут на **{AUTO_MUTE_MINUTES} мин.** "
-                f"(варн {warn_count}/{MAX_WARNINGS})."
-            )
+                await source_channel.send("❌ Не удалось применить наказание по технической причине.")
+                return False
+            await source_channel.send(f"⛔ {member.mention}: {ACTION_NAMES[step.action]}{suffix}.")
 
-            await self.log_action(
-                guild,
-                member=member,
-                action="Авто-мут" if auto else "Мут",
-                reason=f"{base_reason} | {AUTO_MUTE_MINUTES} минут",
-                moderator="AutoMod" if auto else None,
-            )
+        prefix = "Авто-" if auto else ""
+        await self.log_action(
+            guild,
+            member=member,
+            action=f"{prefix}{ACTION_NAMES[step.action]}",
+            reason=f"{reason} | {duration}" if step.action in TIMED_ACTIONS else reason,
+            moderator="AutoMod" if auto else None,
+            extra=note,
+        )
+        return True
 
-            # DM пользователю
-            try:
-                unmute_ts = int(unmute_time.timestamp())
-                dm_embed = discord.Embed(
-                    title="⏰ Вы были временно замьючены",
-                    description=f"На сервере **{guild.name}**",
-                    color=discord.Color.orange()
-                )
-                dm_embed.add_field(name="Длительность", value=f"{AUTO_MUTE_MINUTES} мин.", inline=True)
-                dm_embed.add_field(name="Причина", value=base_reason, inline=False)
-                dm_embed.add_field(name="Размут", value=f"<t:{unmute_ts}:R>", inline=True)
-                await member.send(embed=dm_embed)
-            except Exception:
-                pass
+    def _send_mute_dm(self, member: discord.Member, reason: str, duration: str, until: datetime.datetime):
+        unmute_ts = int(until.timestamp())
+        dm_embed = discord.Embed(
+            title="⏰ Вы были временно замьючены",
+            description=f"На сервере **{member.guild.name}**",
+            color=discord.Color.orange()
+        )
+        dm_embed.add_field(name="Длительность", value=duration, inline=True)
+        dm_embed.add_field(name="Причина", value=reason, inline=False)
+        dm_embed.add_field(name="Размут", value=f"<t:{unmute_ts}:R>", inline=True)
+        # мьюты по лестнице могут прилетать пачкой — одно уведомление на окно дедупликации
+        self.dm_queue.send(member, embed=dm_embed, key=f"mute:{member.guild.id}")
 
-            # записываем мьют в файл (временный)
-            self.register_mute(member, unmute_time)
+    async def apply_punishment(
+            self,
+            member: discord.Member,
+            warn_count: int,
+            base_reason: str,
+            source_channel: discord.abc.Messageable,
+            auto: bool = True,
+    ):
+        ladder = self.get_ladder(member.guild)
+        step = ladder.steps.get(warn_count)
+        if step is not None:
+            await self.execute_punishment(
+                member, step, base_reason, source_channel,
+                auto=auto, note=f"варн {warn_count}/{ladder.max_warnings}",
+            )
 
         # после достижения максимума варнов — сбрасываем
-        if warn_count >= MAX_WARNINGS:
-            self.clear_warnings(guild.id, member.id)
+        if warn_count >= ladder.max_warnings:
+            self.clear_warnings(member.guild.id, member.id)
 
     async def auto_warn(self, message: discord.Message, reason: str):
         """
-        Общий авто-варн (капс/ссылки и т.п.) + проверка PUNISHMENTS.
+        Общий авто-варн (капс/ссылки и т.п.) + проверка лестницы наказаний.
         Для флуда отдельная логика, чтобы не спамить варнами.
         """
         member = message.author
         guild = message.guild
         channel = message.channel
 
-        warn_count = self.add_warning(guild.id, member.id)
+        warn_count = self.add_warning(guild.id, member.id, reason, moderator="AutoMod", message=message)
+        max_warnings = self.get_ladder(guild).max_warnings
 
         # предупреждение только в ЛС пользователю
         dm_text = (
             f"⚠️ Ты получил предупреждение на сервере **{guild.name}** "
-            f"за **{reason}** (**{warn_count}/{MAX_WARNINGS}**)."
+            f"за **{reason}** (**{warn_count}/{max_warnings}**)."
         )
-        try:
-            await member.send(dm_text)
-        except discord.Forbidden:
-            pass
+        # серия срабатываний автомода — одно ЛС на окно, а не по сообщению на каждое
+        self.dm_queue.send(member, dm_text, key=f"warn:{guild.id}")
 
         await self.log_action(
             guild,
@@ -484,31 +860,29 @@ class Moder(commands.Cog):
             reason=reason,
             moderator="AutoMod",
             message=message,
-            extra=f"Всего предупреждений: {warn_count}/{MAX_WARNINGS}",
+            extra=f"Всего предупреждений: {warn_count}/{max_warnings}",
         )
 
         await self.apply_punishment(member, warn_count, reason, channel, auto=True)
 
-    # ===== Специальная обработка флуда: 1 варн + мут 5 мин за всплеск =====
+    # ===== Специальная обработка флуда: 1 варн + наказание flood_punishment за всплеск =====
 
     async def handle_flood_violation(self, message: discord.Message):
-        """Даём ОДНО предупреждение за флуд + мьют на FLOOD_MUTE_MINUTES."""
+        """Даём ОДНО предупреждение за флуд + наказание из flood_punishment сервера."""
         member = message.author
         guild = message.guild
         channel = message.channel
+        ladder = self.get_ladder(guild)
 
         reason = "флуд (слишком много сообщений за короткое время)"
-        warn_count = self.add_warning(guild.id, member.id)
+        warn_count = self.add_warning(guild.id, member.id, reason, moderator="AutoMod", message=message)
 
         # ЛС пользователю
         dm_text = (
             f"⚠️ Ты получил предупреждение на сервере **{guild.name}** "
-            f"за **{reason}** (**{warn_count}/{MAX_WARNINGS}**)."
+            f"за **{reason}** (**{warn_count}/{ladder.max_warnings}**)."
         )
-        try:
-            await member.send(dm_text)
-        except discord.Forbidden:
-            pass
+        self.dm_queue.send(member, dm_text, key=f"warn:{guild.id}")
 
         await self.log_action(
             guild,
@@ -517,62 +891,13 @@ class Moder(commands.Cog):
             reason=reason,
             moderator="AutoMod",
             message=message,
-            extra=f"Всего предупреждений: {warn_count}/{MAX_WARNINGS}",
-        )
-
-        # мут на FLOOD_MUTE_MINUTES
-        mute_role = await self.create_mute_role(guild)
-        if not mute_role:
-            await channel.send("❌ Не удалось создать или найти роль для мьюта!")
-            return
-
-        if mute_role in member.roles:
-            return  # уже замьючен, не дублируем
-
-        duration_sec = FLOOD_MUTE_MINUTES * 60
-        unmute_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=duration_sec)
-
-        try:
-            await member.add_roles(mute_role, reason=reason)
-        except discord.Forbidden:
-            await channel.send("❌ У меня нет прав для выдачи роли Muted!")
-            return
-        except discord.HTTPException:
-            await channel.send("❌ Не удалось выдать роль Muted по технической причине.")
-            return
-
-        await channel.send(
-            f"🔇 {member.mention} замьючен на **{FLOOD_MUTE_MINUTES} мин.** за флуд."
-        )
-
-        await self.log_action(
-            guild,
-            member=member,
-            action="Авто-мут (флуд)",
-            reason=f"{reason} | {FLOOD_MUTE_MINUTES} минут",
-            moderator="AutoMod",
+            extra=f"Всего предупреждений: {warn_count}/{ladder.max_warnings}",
         )
 
-        # DM про мьют
-        try:
-            unmute_ts = int(unmute_time.timestamp())
-            dm_embed = discord.Embed(
-                title="⏰ Вы были временно замьючены",
-                description=f"На сервере **{guild.name}**",
-                color=discord.Color.orange()
-            )
-            dm_embed.add_field(name="Длительность", value=f"{FLOOD_MUTE_MINUTES} мин.", inline=True)
-            dm_embed.add_field(name="Причина", value=reason, inline=False)
-            dm_embed.add_field(name="Размут", value=f"<t:{unmute_ts}:R>", inline=True)
-            await member.send(embed=dm_embed)
-        except Exception:
-            pass
-
-        # записываем мьют в файл
-        self.register_mute(member, unmute_time)
+        await self.execute_punishment(member, ladder.flood, reason, channel, auto=True, note="флуд")
 
-        # при достижении MAX_WARNINGS — чистим варны
-        if warn_count >= MAX_WARNINGS:
+        # при достижении максимума — чистим варны
+        if warn_count >= ladder.max_warnings:
             self.clear_warnings(guild.id, member.id)
 
     # ===== Автомод сообщений =====
@@ -587,62 +912,39 @@ class Moder(commands.Cog):
         if message.author.guild_permissions.manage_messages:
             return
 
-        content = message.content
-
-        # игнорируем команды
-        if content.startswith(("!", "/", ".", "?", "-")):
+        # префиксы команд, порядок и пороги проверок — в плане правил сервера
+        verdict = self.get_automod_plan(message.guild).evaluate(message)
+        if verdict is None:
             return
 
-        # 1) ссылки
-        blocked, domains = self.has_blocked_link(content, message.guild)
-        if blocked:
-            try:
-                await message.delete()
-            except discord.Forbidden:
-                pass
-
-            domains_str = ", ".join(domains)
-            reason = f"запрещённые или неразрешённые ссылки ({domains_str})"
-            await self.auto_warn(message, reason)
-            return
-
-        # 2) капс
-        if self.is_caps_abuse(content):
-            try:
-                await message.delete()
-            except discord.Forbidden:
-                pass
-            await self.auto_warn(message, "злоупотребление КАПСОМ")
-            return
-
-        # 3) флуд
-        if self.check_flood(message):
+        if verdict.kind in RATE_TYPES:
+            tracker = self.get_rate_tracker(verdict.rule)
             now = datetime.datetime.now(datetime.timezone.utc).timestamp()
             guild_id = message.guild.id
             user_id = message.author.id
 
-            last = self.last_flood[guild_id].get(user_id, 0.0)
+            last = tracker.last_flood(guild_id, user_id)
 
-            # если уже наказывали за флуд в ближайшие SPAM_WINDOW сек —
+            # если уже наказывали по этому правилу в пределах его окна —
             # просто удаляем сообщение без доп. варнов/мьютов
-            if now - last < SPAM_WINDOW:
-                try:
-                    await message.delete()
-                except discord.Forbidden:
-                    pass
+            self.deleter.submit(message)
+            if now - last < tracker.window:
                 return
 
             # Обновляем время последнего флуда и наказываем 1 раз
-            self.last_flood[guild_id][user_id] = now
+            tracker.mark_flood(guild_id, user_id, now)
 
-            try:
-                await message.delete()
-            except discord.Forbidden:
-                pass
-
-            await self.handle_flood_violation(message)
+            if verdict.kind == "flood":
+                await self.handle_flood_violation(message)
+            else:
+                await self.auto_warn(message, verdict.reason)
             return
 
+        # ссылки / капс / шаблоны / упоминания / вложения / копипаста: удалить + авто-варн
+        # (удаление уходит в очередь — варн его не ждёт)
+        self.deleter.submit(message)
+        await self.auto_warn(message, verdict.reason)
+
     # ===== СЛЭШ-КОМАНДЫ ПРЕДУПРЕЖДЕНИЙ =====
 
     @app_commands.command(name="warn", description="Выдать предупреждение пользователю")
@@ -653,25 +955,23 @@ class Moder(commands.Cog):
     @app_commands.default_permissions(manage_messages=True)
     async def warn_command(self, interaction: discord.Interaction, member: discord.Member,
                            reason: str = "Нарушение правил"):
-        """Выдать варн вручную (и автоматически наказать по PUNISHMENTS)."""
+        """Выдать варн вручную (и автоматически наказать по лестнице сервера)."""
         await interaction.response.defer(ephemeral=True)
 
-        warn_count = self.add_warning(interaction.guild.id, member.id)
+        warn_count = self.add_warning(interaction.guild.id, member.id, reason, moderator=interaction.user)
+        max_warnings = self.get_ladder(interaction.guild).max_warnings
 
         # ЛС пользователю
         dm_text = (
             f"⚠️ Ты получил предупреждение на сервере **{interaction.guild.name}** "
-            f"за **{reason}** (**{warn_count}/{MAX_WARNINGS}**)."
+            f"за **{reason}** (**{warn_count}/{max_warnings}**)."
         )
-        try:
-            await member.send(dm_text)
-        except discord.Forbidden:
-            pass
+        self.dm_queue.send(member, dm_text)
 
         # Краткое подтверждение в канал для модератора
         await interaction.followup.send(
             f"✅ Предупреждение выдано пользователю {member.mention} "
-            f"(**{warn_count}/{MAX_WARNINGS}**)."
+            f"(**{warn_count}/{max_warnings}**)."
         )
 
         await self.log_action(
@@ -680,7 +980,7 @@ class Moder(commands.Cog):
             action="Предупреждение",
             reason=reason,
             moderator=interaction.user,
-            extra=f"Всего предупреждений: {warn_count}/{MAX_WARNINGS}",
+            extra=f"Всего предупреждений: {warn_count}/{max_warnings}",
         )
 
         await self.apply_punishment(member, warn_count, reason, interaction.channel, auto=False)
@@ -703,16 +1003,68 @@ class Moder(commands.Cog):
             moderator=interaction.user,
         )
 
-    @app_commands.command(name="warnings", description="Посмотреть количество предупреждений")
+    @app_commands.command(name="warnings", description="История предупреждений пользователя")
     @app_commands.describe(member="Пользователь для проверки (по умолчанию - вы)")
     @app_commands.default_permissions(manage_messages=True)
     async def warnings_command(self, interaction: discord.Interaction, member: discord.Member = None):
-        """Посмотреть кол-во варнов."""
-        await interaction.response.defer(ephemeral=True)
-
+        """Активные варны и постраничная история."""
         member = member or interaction.user
-        count = self.get_warn_count(interaction.guild.id, member.id)
-        await interaction.followup.send(f"ℹ️ У {member.mention} сейчас **{count}** предупреждений (из {MAX_WARNINGS}).")
+        guild = interaction.guild
+        count = self.get_warn_count(guild.id, member.id)
+        history = self.warnings.history(guild.id, member.id)
+        max_warnings = self.get_ladder(guild).max_warnings
+        decay = self.warnings.decay_days(guild.id)
+        decay_str = f"Варны сгорают через **{decay:g}** дн." if decay else "Варны не сгорают."
+
+        def render(page: int) -> discord.Embed:
+            embed = discord.Embed(
+                title=f"Предупреждения: {member.display_name}",
+                description=(
+                    f"Активных: **{count}** (из {max_warnings}), всего в истории: **{len(history)}**\n"
+                    f"{decay_str}"
+                ),
+                color=discord.Color.orange(),
+            )
+            start = page * WARNINGS_PAGE_SIZE
+            for number, entry in enumerate(history[start:start + WARNINGS_PAGE_SIZE], start=start + 1):
+                status = "🟠" if self.warnings.is_active(guild.id, member.id, entry) else "⚪"
+                lines = [f"Причина: {entry.get('reason') or '—'}"]
+                if entry.get("moderator"):
+                    lines.append(f"Модератор: {entry['moderator']}")
+                if entry.get("message"):
+                    lines.append(f"[Сообщение]({entry['message']})")
+                embed.add_field(
+                    name=f"{status} #{len(history) - number + 1} — <t:{int(entry['ts'])}:f>",
+                    value="\n".join(lines)[:1024],
+                    inline=False,
+                )
+            if not history:
+                embed.add_field(name="История", value="Предупреждений не было.", inline=False)
+            embed.set_footer(text="🟠 активно · ⚪ снято или истекло")
+            return embed
+
+        page_count = EmbedPaginator.pages_for(len(history), WARNINGS_PAGE_SIZE)
+        if page_count == 1:
+            await interaction.response.send_message(embed=render(0), ephemeral=True)
+            return
+        view = EmbedPaginator(interaction.user.id, page_count, render)
+        await interaction.response.send_message(embed=render(0), view=view, ephemeral=True)
+
+    @app_commands.command(name="warn_decay", description="Через сколько дней предупреждения перестают учитываться")
+    @app_commands.describe(days="Срок в днях (0 — не сгорают)")
+    @app_commands.default_permissions(manage_guild=True)
+    async def warn_decay_command(self, interaction: discord.Interaction, days: app_commands.Range[int, 0, 3650]):
+        """Настроить «затухание» варнов."""
+        cfg = self.get_guild_config(interaction.guild)
+        cfg["warn_decay_days"] = days or None
+        self.save_config(interaction.guild.id)
+        self.warnings.set_decay(interaction.guild.id, days)
+        if days:
+            await interaction.response.send_message(
+                f"✅ Предупреждения старше **{days}** дн. больше не учитываются.", ephemeral=True
+            )
+        else:
+            await interaction.response.send_message("✅ Предупреждения больше не сгорают.", ephemeral=True)
 
     # ===== СЛЭШ-КОМАНДЫ МЬЮТОВ =====
 
@@ -734,53 +1086,42 @@ class Moder(commands.Cog):
             await interaction.followup.send("❌ Нельзя замутить администратора!", ephemeral=True)
             return
 
-        mute_role = await self.create_mute_role(interaction.guild)
-        if not mute_role:
-            await interaction.followup.send("❌ Не удалось создать или найти роль для мьюта!", ephemeral=True)
+        error = await self.mute_member(member, reason)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
             return
 
-        if mute_role in member.roles:
-            await interaction.followup.send("❌ Этот пользователь уже замьючен!", ephemeral=True)
-            return
-
-        try:
-            await member.add_roles(mute_role, reason=reason)
-
-            embed = discord.Embed(
-                title="🔇 Пользователь замьючен",
-                color=discord.Color.red()
-            )
-            embed.add_field(name="Пользователь", value=member.mention, inline=True)
-            embed.add_field(name="Модератор", value=interaction.user.mention, inline=True)
-            embed.add_field(name="Причина", value=reason, inline=False)
-            embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-
-            await interaction.followup.send(embed=embed)
+        embed = discord.Embed(
+            title="🔇 Пользователь замьючен",
+            color=discord.Color.red()
+        )
+        embed.add_field(name="Пользователь", value=member.mention, inline=True)
+        embed.add_field(name="Модератор", value=interaction.user.mention, inline=True)
+        embed.add_field(name="Причина", value=reason, inline=False)
+        if self.uses_timeouts(interaction.guild):
+            embed.add_field(name="Тайм-аут", value=f"{format_minutes(MAX_TIMEOUT_MINUTES)} (максимум Discord)", inline=False)
+        embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
 
-            # ЛС пользователю
-            try:
-                dm_embed = discord.Embed(
-                    title="🔇 Вы были замьючены",
-                    description=f"На сервере **{interaction.guild.name}**",
-                    color=discord.Color.red()
-                )
-                dm_embed.add_field(name="Модератор", value=interaction.user.display_name, inline=True)
-                dm_embed.add_field(name="Причина", value=reason, inline=True)
-                await member.send(embed=dm_embed)
-            except Exception:
-                pass
+        await interaction.followup.send(embed=embed)
 
-            # лог
-            await self.log_action(
-                interaction.guild,
-                member=member,
-                action="Мьют (ручной)",
-                reason=reason,
-                moderator=interaction.user,
-            )
+        # ЛС пользователю
+        dm_embed = discord.Embed(
+            title="🔇 Вы были замьючены",
+            description=f"На сервере **{interaction.guild.name}**",
+            color=discord.Color.red()
+        )
+        dm_embed.add_field(name="Модератор", value=interaction.user.display_name, inline=True)
+        dm_embed.add_field(name="Причина", value=reason, inline=True)
+        self.dm_queue.send(member, embed=dm_embed)
 
-        except discord.Forbidden:
-            await interaction.followup.send("❌ У меня нет прав для выдачи ролей!", ephemeral=True)
+        # лог
+        await self.log_action(
+            interaction.guild,
+            member=member,
+            action="Мьют (ручной)",
+            reason=reason,
+            moderator=interaction.user,
+        )
 
     @app_commands.command(name="unmute", description="Размутить пользователя")
     @app_commands.describe(
@@ -792,21 +1133,12 @@ class Moder(commands.Cog):
         """Размутить пользователя."""
         await interaction.response.defer()
 
-        mute_role = discord.utils.get(interaction.guild.roles, name="Muted")
-
-        if not mute_role:
-            await interaction.followup.send("❌ Роль для мьюта не найдена!", ephemeral=True)
-            return
-
-        if mute_role not in member.roles:
+        if not self.is_muted(member):
             await interaction.followup.send("❌ Этот пользователь не замьючен!", ephemeral=True)
             return
 
         try:
-            await member.remove_roles(mute_role, reason=reason)
-
-            # удаляем запись о временном мьюте, если была
-            self.remove_mute_record(interaction.guild.id, member.id)
+            await self.unmute_member(member, reason)
 
             embed = discord.Embed(
                 title="🔊 Пользователь размьючен",
@@ -820,17 +1152,14 @@ class Moder(commands.Cog):
             await interaction.followup.send(embed=embed)
 
             # ЛС пользователю
-            try:
-                dm_embed = discord.Embed(
-                    title="🔊 Вы были размьючены",
-                    description=f"На сервере **{interaction.guild.name}**",
-                    color=discord.Color.green()
-                )
-                dm_embed.add_field(name="Модератор", value=interaction.user.display_name, inline=True)
-                dm_embed.add_field(name="Причина", value=reason, inline=True)
-                await member.send(embed=dm_embed)
-            except Exception:
-                pass
+            dm_embed = discord.Embed(
+                title="🔊 Вы были размьючены",
+                description=f"На сервере **{interaction.guild.name}**",
+                color=discord.Color.green()
+            )
+            dm_embed.add_field(name="Модератор", value=interaction.user.display_name, inline=True)
+            dm_embed.add_field(name="Причина", value=reason, inline=True)
+            self.dm_queue.send(member, embed=dm_embed)
 
             await self.log_action(
                 interaction.guild,
@@ -841,7 +1170,9 @@ class Moder(commands.Cog):
             )
 
         except discord.Forbidden:
-            await interaction.followup.send("❌ У меня нет прав для управления ролями!", ephemeral=True)
+            await interaction.followup.send("❌ У меня нет прав снять мьют!", ephemeral=True)
+        except discord.HTTPException:
+            await interaction.followup.send("❌ Не удалось снять мьют по технической причине.", ephemeral=True)
 
     @app_commands.command(name="tempmute", description="Временно замутить пользователя")
     @app_commands.describe(
@@ -891,67 +1222,106 @@ class Moder(commands.Cog):
             await interaction.followup.send(embed=embed)
             return
 
-        mute_role = await self.create_mute_role(interaction.guild)
-        if not mute_role:
-            await interaction.followup.send("❌ Не удалось создать или найти роль для мьюта!", ephemeral=True)
+        if self.uses_timeouts(interaction.guild) and seconds > MAX_TIMEOUT_MINUTES * 60:
+            await interaction.followup.send("❌ Тайм-аут Discord не может быть дольше 28 дней!", ephemeral=True)
             return
 
-        if mute_role in member.roles:
-            await interaction.followup.send("❌ Этот пользователь уже замьючен!", ephemeral=True)
+        error = await self.mute_member(member, reason, unmute_time)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
             return
 
-        try:
-            await member.add_roles(mute_role, reason=reason)
+        time_formats = {
+            's': f"{amount} секунд",
+            'm': f"{amount} минут",
+            'h': f"{amount} часов",
+            'd': f"{amount} дней"
+        }
 
-            # сохраняем мьют как временный
-            self.register_mute(member, unmute_time)
+        unmute_ts = int(unmute_time.timestamp())
 
-            time_formats = {
-                's': f"{amount} секунд",
-                'm': f"{amount} минут",
-                'h': f"{amount} часов",
-                'd': f"{amount} дней"
-            }
+        embed = discord.Embed(
+            title="⏰ Пользователь временно замьючен",
+            color=discord.Color.orange()
+        )
+        embed.add_field(name="Пользователь", value=member.mention, inline=True)
+        embed.add_field(name="Длительность", value=time_formats[unit], inline=True)
+        embed.add_field(name="Модератор", value=interaction.user.mention, inline=True)
+        embed.add_field(name="Причина", value=reason, inline=False)
+        embed.add_field(name="Размут", value=f"<t:{unmute_ts}:R>", inline=True)
 
-            unmute_ts = int(unmute_time.timestamp())
+        await interaction.followup.send(embed=embed)
 
-            embed = discord.Embed(
-                title="⏰ Пользователь временно замьючен",
-                color=discord.Color.orange()
-            )
-            embed.add_field(name="Пользователь", value=member.mention, inline=True)
-            embed.add_field(name="Длительность", value=time_formats[unit], inline=True)
-            embed.add_field(name="Модератор", value=interaction.user.mention, inline=True)
-            embed.add_field(name="Причина", value=reason, inline=False)
-            embed.add_field(name="Размут", value=f"<t:{unmute_ts}:R>", inline=True)
+        # ЛС пользователю
+        dm_embed = discord.Embed(
+            title="⏰ Вы были временно замьючены",
+            description=f"На сервере **{interaction.guild.name}**",
+            color=discord.Color.orange()
+        )
+        dm_embed.add_field(name="Длительность", value=time_formats[unit], inline=True)
+        dm_embed.add_field(name="Размут", value=f"<t:{unmute_ts}:R>", inline=True)
+        dm_embed.add_field(name="Модератор", value=interaction.user.display_name, inline=False)
+        dm_embed.add_field(name="Причина", value=reason, inline=False)
+        self.dm_queue.send(member, embed=dm_embed)
 
-            await interaction.followup.send(embed=embed)
+        await self.log_action(
+            interaction.guild,
+            member=member,
+            action="Временный мьют (ручной)",
+            reason=f"{reason} | {time_formats[unit]}",
+            moderator=interaction.user,
+        )
 
-            # ЛС пользователю
-            try:
-                dm_embed = discord.Embed(
-                    title="⏰ Вы были временно замьючены",
-                    description=f"На сервере **{interaction.guild.name}**",
-                    color=discord.Color.orange()
-                )
-                dm_embed.add_field(name="Длительность", value=time_formats[unit], inline=True)
-                dm_embed.add_field(name="Размут", value=f"<t:{unmute_ts}:R>", inline=True)
-                dm_embed.add_field(name="Модератор", value=interaction.user.display_name, inline=False)
-                dm_embed.add_field(name="Причина", value=reason, inline=False)
-                await member.send(embed=dm_embed)
-            except Exception:
-                pass
+    def get_muted_member_ids(self, guild: discord.Guild, mute_role: discord.Role) -> set[int]:
+        """Множество id участников с ролью Muted (полный проход по участникам — один раз)."""
+        muted = self._muted_members.get(guild.id)
+        if muted is None:
+            muted = {member.id for member in mute_role.members}
+            self._muted_members[guild.id] = muted
+        return muted
+
+    def get_timed_out_member_ids(self, guild: discord.Guild) -> set[int]:
+        """Множество id участников в тайм-ауте (истёкшие тайм-ауты убираются здесь же)."""
+        timed_out = self._timed_out_members.get(guild.id)
+        if timed_out is None:
+            timed_out = {member.id for member in guild.members if member.is_timed_out()}
+            self._timed_out_members[guild.id] = timed_out
+        for uid in list(timed_out):
+            member = guild.get_member(uid)
+            if member is None or not member.is_timed_out():
+                timed_out.discard(uid)
+        return timed_out
 
-            await self.log_action(
-                interaction.guild,
-                member=member,
-                action="Временный мьют (ручной)",
-                reason=f"{reason} | {time_formats[unit]}",
-                moderator=interaction.user,
-            )
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        timed_out = self._timed_out_members.get(after.guild.id)
+        if timed_out is not None and before.timed_out_until != after.timed_out_until:
+            if after.is_timed_out():
+                timed_out.add(after.id)
+            else:
+                timed_out.discard(after.id)
 
-        except discord.Forbidden:
-            await interaction.followup.send("❌ У меня нет прав для выдачи ролей!", ephemeral=True)
+        muted = self._muted_members.get(after.guild.id)
+        role_id = self._mute_role_ids.get(after.guild.id)
+        if muted is None or role_id is None:
+            return
+        if after.get_role(role_id) is not None:
+            muted.add(after.id)
+        else:
+            muted.discard(after.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        for index in (self._muted_members, self._timed_out_members):
+            muted = index.get(member.guild.id)
+            if muted is not None:
+                muted.discard(member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        if self._mute_role_ids.get(role.guild.id) == role.id:
+            del self._mute_role_ids[role.guild.id]
+            self._muted_members.pop(role.guild.id, None)
 
     @app_commands.command(name="muted_list", description="Показать список замьюченных пользователей")
     @app_commands.default_permissions(manage_roles=True)
@@ -959,44 +1329,56 @@ class Moder(commands.Cog):
         """Показать список замьюченных пользователей."""
         await interaction.response.defer(ephemeral=True)
 
-        mute_role = discord.utils.get(interaction.guild.roles, name="Muted")
-
-        if not mute_role:
+        guild = interaction.guild
+        # показываем оба вида мьютов: роли Muted могли быть выданы до смены mute_mode
+        timeouts = self.uses_timeouts(guild)
+        mute_role = self.get_mute_role(guild)
+        if not mute_role and not timeouts:
             await interaction.followup.send("❌ Роль для мьюта не найдена!")
             return
+        timed_out_ids = self.get_timed_out_member_ids(guild)
+        role_ids = self.get_muted_member_ids(guild, mute_role) if mute_role else set()
+        muted_ids = sorted(timed_out_ids | role_ids)
 
-        muted_members = [member for member in interaction.guild.members if mute_role in member.roles]
-
-        if not muted_members:
+        if not muted_ids:
             await interaction.followup.send("🔊 На сервере нет замьюченных пользователей!")
             return
 
-        embed = discord.Embed(
-            title="📋 Список замьюченных пользователей",
-            color=discord.Color.orange()
-        )
-
-        guild_id = str(interaction.guild.id)
-        guild_mutes = self.mutes.get(guild_id, {})
-
-        for i, member in enumerate(muted_members[:10], 1):
-            uid = str(member.id)
-            if uid in guild_mutes:
-                unmute_ts = guild_mutes[uid]
-                time_info = f"Размут: <t:{int(unmute_ts)}:R>"
-            else:
-                time_info = "⏳ Бессрочно"
+        guild_mutes = self.mutes.get(str(guild.id), {})
+        page_count = EmbedPaginator.pages_for(len(muted_ids), MUTED_LIST_PAGE_SIZE)
 
-            embed.add_field(
-                name=f"{i}. {member.display_name}",
-                value=f"{member.mention}\n{time_info}",
-                inline=False
+        def render(page: int) -> discord.Embed:
+            embed = discord.Embed(
+                title="📋 Список замьюченных пользователей",
+                color=discord.Color.orange()
             )
+            start = page * MUTED_LIST_PAGE_SIZE
+            for i, uid in enumerate(muted_ids[start:start + MUTED_LIST_PAGE_SIZE], start + 1):
+                member = guild.get_member(uid)
+                name = member.display_name if member else str(uid)
+                if uid in role_ids:
+                    unmute_ts = guild_mutes.get(str(uid))
+                else:
+                    unmute_ts = member.timed_out_until.timestamp() if member and member.timed_out_until else None
+                if unmute_ts is not None:
+                    time_info = f"Размут: <t:{int(unmute_ts)}:R>"
+                else:
+                    time_info = "⏳ Бессрочно"
+
+                embed.add_field(
+                    name=f"{i}. {name}",
+                    value=f"<@{uid}>\n{time_info}",
+                    inline=False
+                )
+            embed.set_footer(text=f"Страница {page + 1}/{page_count} • Всего: {len(muted_ids)}")
+            return embed
 
-        if len(muted_members) > 10:
-            embed.set_footer(text=f"И ещё {len(muted_members) - 10} пользователей...")
+        if page_count == 1:
+            await interaction.followup.send(embed=render(0))
+            return
 
-        await interaction.followup.send(embed=embed)
+        view = EmbedPaginator(interaction.user.id, page_count, render)
+        await interaction.followup.send(embed=render(0), view=view)
 
     @app_commands.command(name="muteinfo", description="Информация о мьюте пользователя")
     @app_commands.describe(member="Пользователь для проверки мьюта")
@@ -1005,9 +1387,7 @@ class Moder(commands.Cog):
         """Информация о мьюте пользователя."""
         await interaction.response.defer(ephemeral=True)
 
-        mute_role = discord.utils.get(interaction.guild.roles, name="Muted")
-
-        if not mute_role or mute_role not in member.roles:
+        if not self.is_muted(member):
             await interaction.followup.send("❌ Этот пользователь не замьючен!")
             return
 
@@ -1023,7 +1403,13 @@ class Moder(commands.Cog):
         uid = str(member.id)
         guild_mutes = self.mutes.get(guild_id, {})
 
-        if uid in guild_mutes:
+        if member.is_timed_out():
+            # тайм-аут: срок хранит сам Discord
+            unmute_ts = member.timed_out_until.timestamp()
+            embed.add_field(name="Тип мьюта", value="⏰ Тайм-аут Discord", inline=True)
+            embed.add_field(name="Размут", value=f"<t:{int(unmute_ts)}:f>", inline=True)
+            embed.add_field(name="Осталось", value=f"<t:{int(unmute_ts)}:R>", inline=True)
+        elif uid in guild_mutes:
             unmute_ts = guild_mutes[uid]
             embed.add_field(name="Тип мьюта", value="⏰ Временный", inline=True)
             embed.add_field(name="Размут", value=f"<t:{int(unmute_ts)}:R>", inline=True)
@@ -1035,14 +1421,167 @@ class Moder(commands.Cog):
 
         await interaction.followup.send(embed=embed)
 
+    @app_commands.command(name="mute_repair", description="Проверить и восстановить права роли Muted в каналах")
+    @app_commands.default_permissions(manage_roles=True)
+    async def mute_repair(self, interaction: discord.Interaction):
+        """Доставить права роли Muted только в те каналы, где их нет."""
+        await interaction.response.defer(ephemeral=True)
+
+        mute_role = self.get_mute_role(interaction.guild)
+        if not mute_role:
+            await interaction.followup.send("❌ Роль для мьюта не найдена!")
+            return
+
+        task = self._overwrite_tasks.get(interaction.guild.id)
+        if task is not None and not task.done():
+            await interaction.followup.send("⏳ Настройка прав роли Muted уже выполняется.")
+            return
+
+        missing = [
+            c for c in interaction.guild.channels
+            if overwrite_missing(c, mute_role, MUTE_OVERWRITE)
+        ]
+        if not missing:
+            await interaction.followup.send("✅ Права роли Muted настроены во всех каналах.")
+            return
+
+        await interaction.followup.send(f"⚙️ Исправляю права в **{len(missing)}** каналах...")
+        loop = asyncio.get_running_loop()
+        last_edit = 0.0
+
+        async def progress(done: int, total: int):
+            nonlocal last_edit
+            now = loop.time()
+            if done < total and now - last_edit < 2:
+                return
+            last_edit = now
+            try:
+                await interaction.edit_original_response(content=f"⚙️ Исправлено каналов: **{done}/{total}**")
+            except discord.HTTPException:
+                pass
+
+        ok, failed = await self.start_mute_overwrites(
+            interaction.guild, mute_role, only_missing=True, progress=progress
+        )
+        await interaction.edit_original_response(
+            content=f"✅ Права роли Muted исправлены: **{ok}** каналов, ошибок: **{failed}**."
+        )
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        """Новые каналы сразу получают права роли Muted."""
+        mute_role = self.get_mute_role(channel.guild)
+        if mute_role is None:
+            return
+        try:
+            await channel.set_permissions(mute_role, overwrite=MUTE_OVERWRITE, reason="Настройка прав роли Muted")
+        except discord.HTTPException:
+            pass
+
+    # ===== Рейд входами / локдаун =====
+
+    def configure_join_guard(self, guild_id: int, cfg: dict) -> None:
+        self.join_guard.configure(
+            guild_id,
+            window=cfg.get("raid_join_window"),
+            threshold=cfg.get("raid_join_threshold"),
+        )
+
+    def on_lockdown_change(self, guild_id: int, locked: bool) -> None:
+        """Вызывается JoinGuard при входе в локдаун и выходе из него."""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        if locked:
+            window, threshold = self.join_guard.settings(guild_id)
+            extra = f"Порог: {threshold} входов за {int(window)} сек. Приветствия и логи входов заменены сводкой."
+            self._spawn_lockdown_job(
+                self.log_action(guild, action="🚨 Локдаун включён", moderator="AutoMod", extra=extra)
+            )
+        else:
+            self._spawn_lockdown_job(self.send_join_summary(guild))
+            pending = self._raid_mute_queue.pop(guild_id, None)
+            if pending:
+                self._spawn_lockdown_job(self.mute_raid_accounts(guild, pending))
+            self._spawn_lockdown_job(self.log_action(guild, action="Локдаун снят", moderator="AutoMod"))
+
+    def _spawn_lockdown_job(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._lockdown_jobs.add(task)
+        task.add_done_callback(self._lockdown_jobs.discard)
+
+    async def send_join_summary(self, guild: discord.Guild) -> None:
+        summary = self.join_guard.take_summary(guild.id)
+        if summary is None:
+            return
+        ages = "\n".join(f"• {label}: **{count}**" for label, count in summary.ages.most_common())
+        await self.log_action(
+            guild,
+            action="Локдаун: сводка входов",
+            moderator="AutoMod",
+            extra=(
+                f"Вошло: **{summary.joins}**, новых аккаунтов: **{summary.new_accounts}**\n"
+                f"Возраст аккаунтов:\n{ages}"
+            ),
+        )
+
+    async def mute_raid_accounts(self, guild: discord.Guild, user_ids: list[int]) -> int:
+        """Пакетный временный мьют новых аккаунтов (ограниченная параллельность)."""
+        if not self.uses_timeouts(guild) and await self.create_mute_role(guild) is None:
+            return 0
+
+        unmute_time = discord.utils.utcnow() + datetime.timedelta(minutes=RAID_MUTE_MINUTES)
+        semaphore = asyncio.Semaphore(RAID_MUTE_CONCURRENCY)
+        muted = 0
+
+        async def mute_one(member: discord.Member):
+            nonlocal muted
+            async with semaphore:
+                if await self.mute_member(member, "Локдаун: новый аккаунт во время рейда", unmute_time) is None:
+                    muted += 1
+
+        members = [m for m in map(guild.get_member, user_ids) if m is not None and not self.is_muted(m)]
+        await asyncio.gather(*(mute_one(m) for m in members))
+        if muted:
+            await self.log_action(
+                guild,
+                action="Локдаун: мьют новых аккаунтов",
+                moderator="AutoMod",
+                extra=f"Замьючено: **{muted}** на {RAID_MUTE_MINUTES} мин.",
+            )
+        return muted
+
+    async def lockdown_watcher(self):
+        """Раз в RAID_SUMMARY_INTERVAL сек: сводки входов, пакетный мьют, снятие локдауна."""
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            await asyncio.sleep(RAID_SUMMARY_INTERVAL)
+            for guild_id in self.join_guard.locked_guilds():
+                guild = self.bot.get_guild(guild_id)
+                if guild is None:
+                    continue
+                await self.send_join_summary(guild)
+                pending = self._raid_mute_queue.pop(guild_id, None)
+                if pending:
+                    await self.mute_raid_accounts(guild, pending)
+            self.join_guard.release_calm()
+
     # ===== Восстановление мьюта при заходе =====
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        """Восстанавливает ВРЕМЕННЫЙ мьют, если пользователь вышел и вернулся до окончания срока."""
+        """
+        Восстанавливает ВРЕМЕННЫЙ мьют, если пользователь вышел и вернулся до окончания срока.
+        В локдауне новые аккаунты ставятся в очередь на пакетный мьют (если включено).
+        """
         guild_id = str(member.guild.id)
         uid = str(member.id)
 
+        if self.join_guard.observe(member):
+            cfg = self.config.get(guild_id, {})
+            if cfg.get("raid_mute_new_accounts") and self.join_guard.is_new_account(member):
+                self._raid_mute_queue.setdefault(member.guild.id, []).append(member.id)
+
         if guild_id in self.mutes and uid in self.mutes[guild_id]:
             unmute_ts = self.mutes[guild_id][uid]
             now_ts = datetime.datetime.now(datetime.timezone.utc).timestamp()
@@ -1060,6 +1599,113 @@ class Moder(commands.Cog):
                 except Exception:
                     pass
 
+    # ===== Очистка сообщений =====
+
+    @app_commands.command(name="purge", description="Массово удалить сообщения в канале")
+    @app_commands.describe(
+        amount="Сколько последних сообщений просмотреть",
+        user="Только сообщения этого пользователя",
+        text="Только сообщения с таким же или похожим текстом",
+        after_minutes="Только сообщения не старше N минут",
+        before_minutes="Только сообщения старше N минут",
+    )
+    @app_commands.default_permissions(manage_messages=True)
+    async def purge(
+            self,
+            interaction: discord.Interaction,
+            amount: app_commands.Range[int, 1, PURGE_MAX_SCAN],
+            user: discord.User = None,
+            text: str = None,
+            after_minutes: app_commands.Range[int, 1, 525600] = None,
+            before_minutes: app_commands.Range[int, 1, 525600] = None,
+    ):
+        """Bulk-удаление (по 100) для сообщений младше 14 дней, остальные — по одному с паузой."""
+        await interaction.response.defer(ephemeral=True)
+        channel = interaction.channel
+
+        now = discord.utils.utcnow()
+        after = now - datetime.timedelta(minutes=after_minutes) if after_minutes else None
+        before = now - datetime.timedelta(minutes=before_minutes) if before_minutes else None
+        if after and before and after >= before:
+            await interaction.followup.send("❌ after_minutes должно быть больше before_minutes.")
+            return
+
+        text_norm = normalize(text) if text else None
+        text_fp = fingerprint(text) if text else None
+
+        def matches(message: discord.Message) -> bool:
+            if message.pinned:
+                return False
+            if user is not None and message.author.id != user.id:
+                return False
+            if text_norm is not None:
+                norm = normalize(message.content)
+                if norm != text_norm:
+                    fp = fingerprint(message.content) if norm else None
+                    if fp is None or text_fp is None or hamming(fp, text_fp) > PURGE_FINGERPRINT_DISTANCE:
+                        return False
+            return True
+
+        targets: list[discord.Message] = []
+        try:
+            # своё /purge-сообщение эфемерное — в истории канала его нет
+            async for message in channel.history(limit=amount, after=after, before=before, oldest_first=False):
+                if matches(message):
+                    targets.append(message)
+        except discord.Forbidden:
+            await interaction.followup.send("❌ У меня нет доступа к истории этого канала!")
+            return
+
+        if not targets:
+            await interaction.followup.send("ℹ️ Подходящих сообщений не найдено.")
+            return
+
+        await interaction.followup.send(f"🧹 Удаляю **{len(targets)}** сообщений...")
+        loop = asyncio.get_running_loop()
+        last_edit = 0.0
+
+        async def progress(done: int, total: int):
+            nonlocal last_edit
+            now_ts = loop.time()
+            if done < total and now_ts - last_edit < 2:
+                return
+            last_edit = now_ts
+            try:
+                await interaction.edit_original_response(content=f"🧹 Удалено: **{done}/{total}**")
+            except discord.HTTPException:
+                pass
+
+        started = loop.time()
+        reason = f"/purge от {interaction.user}"
+        deleted, failed = await delete_messages(channel, targets, reason=reason, progress=progress)
+        elapsed = loop.time() - started
+
+        filters = []
+        if user is not None:
+            filters.append(f"пользователь: {user.mention}")
+        if text:
+            filters.append(f"текст: {text[:100]}")
+        if after_minutes or before_minutes:
+            filters.append(f"время: {after_minutes or '∞'}…{before_minutes or 0} мин. назад")
+        await self.log_action(
+            interaction.guild,
+            action="Очистка сообщений",
+            moderator=interaction.user,
+            extra=(
+                f"Канал: {channel.mention}\nУдалено: {deleted}, ошибок: {failed}\n"
+                + ("\n".join(filters) or "без фильтров")
+            ),
+        )
+
+        # лог пишем раньше: токен взаимодействия живёт 15 минут, долгая очистка его переживает
+        try:
+            await interaction.edit_original_response(
+                content=f"✅ Удалено **{deleted}** сообщений за {elapsed:.0f} сек."
+                        + (f" Не удалось: **{failed}**." if failed else "")
+            )
+        except discord.HTTPException:
+            pass
+
     # ===== СЛЭШ-КОМАНДЫ НАСТРОЙКИ =====
 
     @app_commands.command(name="setlog", description="Установить лог-канал для модерации")
@@ -1071,7 +1717,7 @@ class Moder(commands.Cog):
 
         cfg = self.get_guild_config(interaction.guild)
         cfg["log_channel_id"] = channel.id
-        self.save_config()
+        self.save_config(interaction.guild.id)
         await interaction.followup.send(f"✅ Лог-канал для модерации установлен: {channel.mention}")
 
     @app_commands.command(name="adddomain", description="Добавить домен в белый список")
@@ -1101,7 +1747,7 @@ class Moder(commands.Cog):
         allowed.add(domain)
         cfg["allowed_domains"] = sorted(allowed)
         cfg["blocked_domains"] = sorted(blocked)
-        self.save_config()
+        self.save_config(interaction.guild.id)
 
         await interaction.followup.send(f"✅ Домен `{domain}` добавлен в **разрешённые**.")
 
@@ -1132,7 +1778,7 @@ class Moder(commands.Cog):
         blocked.add(domain)
         cfg["allowed_domains"] = sorted(allowed)
         cfg["blocked_domains"] = sorted(blocked)
-        self.save_config()
+        self.save_config(interaction.guild.id)
 
         await interaction.followup.send(f"✅ Домен `{domain}` добавлен в **запрещённые**.")
 
@@ -1162,6 +1808,325 @@ class Moder(commands.Cog):
 
         await interaction.followup.send(embed=embed)
 
+    @app_commands.command(name="lockdown", description="Включить или снять локдаун (режим рейда входами)")
+    @app_commands.describe(enabled="True — включить, False — снять")
+    @app_commands.default_permissions(manage_guild=True)
+    async def lockdown_command(self, interaction: discord.Interaction, enabled: bool):
+        """Ручной локдаун: сводка вместо приветствий, авто-роли из очереди."""
+        self.join_guard.set_lockdown(interaction.guild.id, enabled)
+        if enabled:
+            await interaction.response.send_message("🚨 Локдаун включён. Снять: `/lockdown enabled:False`.", ephemeral=True)
+        else:
+            await interaction.response.send_message("✅ Локдаун снят.", ephemeral=True)
+
+    @app_commands.command(name="raidguard", description="Настроить защиту от рейда входами")
+    @app_commands.describe(
+        threshold="Сколько входов за окно включает локдаун",
+        window="Окно в секундах",
+        mute_new_accounts="Мьютить аккаунты моложе 7 дней во время локдауна",
+    )
+    @app_commands.default_permissions(manage_guild=True)
+    async def raidguard_command(
+            self,
+            interaction: discord.Interaction,
+            threshold: app_commands.Range[int, 3, 1000] = None,
+            window: app_commands.Range[int, 5, 3600] = None,
+            mute_new_accounts: bool = None,
+    ):
+        """Порог и окно детектора рейдов, авто-мьют новых аккаунтов."""
+        cfg = self.get_guild_config(interaction.guild)
+        if threshold is not None:
+            cfg["raid_join_threshold"] = threshold
+        if window is not None:
+            cfg["raid_join_window"] = window
+        if mute_new_accounts is not None:
+            cfg["raid_mute_new_accounts"] = mute_new_accounts
+        self.save_config(interaction.guild.id)
+        self.configure_join_guard(interaction.guild.id, cfg)
+
+        cur_window, cur_threshold = self.join_guard.settings(interaction.guild.id)
+        state = "включён" if self.join_guard.is_locked(interaction.guild.id) else "выключен"
+        mute_state = "да" if cfg.get("raid_mute_new_accounts") else "нет"
+        await interaction.response.send_message(
+            f"🛡️ Локдаун при **{cur_threshold}** входах за **{int(cur_window)}** сек.\n"
+            f"Мьют новых аккаунтов: **{mute_state}**. Сейчас локдаун {state}.",
+            ephemeral=True,
+        )
+
+    @app_commands.command(name="mute_mode", description="Способ мьюта: роль Muted или тайм-аут Discord")
+    @app_commands.describe(mode="role — роль Muted, timeout — встроенный тайм-аут Discord (до 28 дней)")
+    @app_commands.choices(mode=MUTE_MODE_CHOICES)
+    @app_commands.default_permissions(manage_guild=True)
+    async def mute_mode_command(self, interaction: discord.Interaction, mode: app_commands.Choice[str]):
+        """Переключить режим мьютов сервера."""
+        if mode.value not in MUTE_MODES:
+            await interaction.response.send_message("❌ Неизвестный режим мьюта.", ephemeral=True)
+            return
+        cfg = self.get_guild_config(interaction.guild)
+        cfg["mute_mode"] = mode.value
+        self.save_config(interaction.guild.id)
+        if mode.value == "timeout":
+            text = (
+                "✅ Мьюты теперь выдаются тайм-аутом Discord: без роли Muted и прав в каналах, "
+                "снимаются самим Discord. Уже выданные роли Muted снимаются как раньше."
+            )
+        else:
+            text = "✅ Мьюты теперь выдаются ролью Muted."
+        await interaction.response.send_message(text, ephemeral=True)
+
+    # ===== Лестница наказаний =====
+
+    def _update_ladder(self, guild: discord.Guild) -> PunishmentLadder:
+        """Сохраняет изменённую лестницу и возвращает её пересобранной."""
+        self.save_config(guild.id)
+        return self.get_ladder(guild)
+
+    @staticmethod
+    def _ladder_text(ladder: PunishmentLadder) -> str:
+        lines = [f"• **{warns}** варн(а) → {describe_step(step)}" for warns, step in sorted(ladder.steps.items())]
+        lines.append(f"• флуд → {describe_step(ladder.flood)}")
+        return "\n".join(lines)
+
+    @app_commands.command(name="punish_set", description="Задать наказание за N предупреждений")
+    @app_commands.describe(
+        warns="Количество варнов",
+        action="Наказание",
+        minutes="Длительность в минутах (для тайм-аута и мьюта; пусто у мьюта — бессрочно)",
+    )
+    @app_commands.choices(action=PUNISH_CHOICES)
+    @app_commands.default_permissions(manage_guild=True)
+    async def punish_set(
+            self,
+            interaction: discord.Interaction,
+            warns: app_commands.Range[int, 1, 50],
+            action: app_commands.Choice[str],
+            minutes: app_commands.Range[int, 1, 40320] = None,
+    ):
+        """Добавить/заменить шаг лестницы наказаний."""
+        cfg = self.get_guild_config(interaction.guild)
+        steps = [raw for raw in cfg.get("punishment_ladder") or [] if raw.get("warns") != warns]
+        if not cfg.get("punishment_ladder"):
+            # первая настройка: начинаем с текущих (дефолтных) шагов
+            steps = [
+                {"warns": w, "action": step.action, "minutes": step.minutes}
+                for w, step in self.get_ladder(interaction.guild).steps.items() if w != warns
+            ]
+        steps.append({"warns": warns, "action": action.value, "minutes": minutes})
+        cfg["punishment_ladder"] = sorted(steps, key=lambda raw: raw["warns"])
+        ladder = self._update_ladder(interaction.guild)
+        await interaction.response.send_message(
+            f"✅ Лестница наказаний обновлена:\n{self._ladder_text(ladder)}", ephemeral=True
+        )
+
+    @app_commands.command(name="punish_remove", description="Убрать наказание за N предупреждений")
+    @app_commands.describe(warns="Количество варнов")
+    @app_commands.default_permissions(manage_guild=True)
+    async def punish_remove(self, interaction: discord.Interaction, warns: app_commands.Range[int, 1, 50]):
+        """Удалить шаг лестницы (последний шаг удалить нельзя)."""
+        ladder = self.get_ladder(interaction.guild)
+        if warns not in ladder.steps:
+            await interaction.response.send_message(f"❌ Шага для **{warns}** варнов нет.", ephemeral=True)
+            return
+        if len(ladder.steps) == 1:
+            await interaction.response.send_message("❌ Нельзя удалить последний шаг лестницы.", ephemeral=True)
+            return
+        cfg = self.get_guild_config(interaction.guild)
+        cfg["punishment_ladder"] = [
+            {"warns": w, "action": step.action, "minutes": step.minutes}
+            for w, step in sorted(ladder.steps.items()) if w != warns
+        ]
+        ladder = self._update_ladder(interaction.guild)
+        await interaction.response.send_message(
+            f"✅ Шаг удалён. Лестница наказаний:\n{self._ladder_text(ladder)}", ephemeral=True
+        )
+
+    @app_commands.command(name="punish_flood", description="Наказание за флуд")
+    @app_commands.describe(action="Наказание", minutes="Длительность в минутах (для тайм-аута и мьюта)")
+    @app_commands.choices(action=PUNISH_CHOICES)
+    @app_commands.default_permissions(manage_guild=True)
+    async def punish_flood(
+            self,
+            interaction: discord.Interaction,
+            action: app_commands.Choice[str],
+            minutes: app_commands.Range[int, 1, 40320] = None,
+    ):
+        """Настроить наказание за флуд."""
+        cfg = self.get_guild_config(interaction.guild)
+        cfg["flood_punishment"] = {"action": action.value, "minutes": minutes}
+        ladder = self._update_ladder(interaction.guild)
+        await interaction.response.send_message(
+            f"✅ За флуд: {describe_step(ladder.flood)}", ephemeral=True
+        )
+
+    @app_commands.command(name="punish_list", description="Показать лестницу наказаний")
+    @app_commands.default_permissions(manage_messages=True)
+    async def punish_list(self, interaction: discord.Interaction):
+        """Показать текущие наказания сервера."""
+        ladder = self.get_ladder(interaction.guild)
+        embed = discord.Embed(
+            title="Лестница наказаний",
+            description=self._ladder_text(ladder),
+            color=discord.Color.blue(),
+        )
+        embed.set_footer(text=f"После {ladder.max_warnings} варнов счётчик сбрасывается")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    # ===== Правила автомода =====
+
+    def _guild_rules(self, guild: discord.Guild) -> list[dict]:
+        """Изменяемый список правил сервера (при первой правке — копия правил по умолчанию)."""
+        cfg = self.get_guild_config(guild)
+        if cfg.get("automod_rules") is None:
+            cfg["automod_rules"] = [dict(rule) for rule in DEFAULT_RULES]
+        return cfg["automod_rules"]
+
+    @staticmethod
+    def _describe_rule(rule: dict) -> str:
+        kind = rule["type"]
+        if kind == "regex":
+            return f"`{rule['pattern']}`"
+        if kind == "words":
+            return ", ".join(rule["words"][:10]) + (" …" if len(rule["words"]) > 10 else "")
+        if kind in ("mentions", "attachments"):
+            return f"больше {rule['max']} в сообщении"
+        if kind in ("mention_rate", "attachment_rate"):
+            return f"больше {rule['max']} за {rule.get('window', 60)} сек"
+        if kind == "caps":
+            return f"от {rule.get('min_length', 10)} букв, ≥ {int(rule.get('percent', 0.7) * 100)}%"
+        if kind == "flood":
+            return f"{rule.get('threshold', 3)} сообщений за {rule.get('window', 10)} сек"
+        if kind == "duplicates":
+            o = duplicate_options(rule)
+            return (f"от {o['min_users']} людей за {o['window']} сек или {o['repeat_count']} повторов "
+                    f"за {o['repeat_window']} сек, от {o['min_length']} символов")
+        return "по настройкам сервера"
+
+    @app_commands.command(name="automod_rules", description="Правила автомода и их статистика")
+    @app_commands.default_permissions(manage_guild=True)
+    async def automod_rules(self, interaction: discord.Interaction):
+        """Список правил, порядок проверки и счётчики срабатываний."""
+        cfg = self.get_guild_config(interaction.guild)
+        rules = cfg.get("automod_rules")
+        rules = DEFAULT_RULES if rules is None else rules
+        prefixes = cfg.get("automod_ignore_prefixes")
+        plan = self.get_automod_plan(interaction.guild)
+
+        embed = discord.Embed(title="Правила автомода", color=discord.Color.blue())
+        rule_lines = [f"• **{rule_name(r)}** ({r['type']}): {self._describe_rule(r)}" for r in rules]
+        embed.add_field(name="Правила", value="\n".join(rule_lines)[:1024] or "—", inline=False)
+        stat_lines = [
+            f"{i}. **{st['name']}** — проверок {st['evaluations']}, срабатываний {st['hits']}, "
+            f"≈{st['avg_us']:.1f} мкс"
+            for i, st in enumerate(plan.stats(), 1)
+        ]
+        embed.add_field(name="Порядок проверки и статистика", value="\n".join(stat_lines)[:1024] or "—", inline=False)
+        shown = " ".join(f"`{p}`" for p in plan.ignore_prefixes) or "нет"
+        if prefixes is None:
+            shown += " (по умолчанию)"
+        embed.add_field(name="Префиксы команд (не проверяются)", value=shown, inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="automod_add", description="Добавить правило автомода")
+    @app_commands.describe(
+        rule_type="Тип правила",
+        value=(
+            "regex: шаблон; words: слова через запятую; mentions/attachments: максимум; "
+            "caps: «мин_букв процент»; flood: «сообщений секунд»; "
+            "mention_rate/attachment_rate: «максимум секунд»; "
+            "duplicates: «людей секунд [повторов секунд [мин_длина]]»"
+        ),
+        name="Имя правила (для удаления); по умолчанию — тип",
+        reason="Причина в варне",
+    )
+    @app_commands.choices(rule_type=[app_commands.Choice(name=kind, value=kind) for kind in RULE_TYPES])
+    @app_commands.default_permissions(manage_guild=True)
+    async def automod_add(
+            self,
+            interaction: discord.Interaction,
+            rule_type: app_commands.Choice[str],
+            value: str = "",
+            name: str = None,
+            reason: str = None,
+    ):
+        """Добавить (или заменить по имени) правило автомода."""
+        kind = rule_type.value
+        rule: dict = {"type": kind}
+        try:
+            if kind == "regex":
+                rule["pattern"] = value
+            elif kind == "words":
+                rule["words"] = [w.strip() for w in value.split(",") if w.strip()]
+            elif kind in ("mentions", "attachments"):
+                rule["max"] = int(value)
+            elif kind == "caps" and value:
+                min_length, percent = value.split()
+                percent = float(percent.rstrip("%"))
+                rule["min_length"] = int(min_length)
+                rule["percent"] = percent / 100 if percent > 1 else percent
+            elif kind == "flood" and value:
+                threshold, window = value.split()
+                rule["threshold"] = int(threshold)
+                rule["window"] = int(window)
+            elif kind == "duplicates" and value:
+                for key, number in zip(DUPLICATE_DEFAULTS, value.split()):
+                    rule[key] = int(number)
+            elif kind in ("mention_rate", "attachment_rate"):
+                limit, *window = value.split()
+                rule["max"] = int(limit)
+                if window:
+                    rule["window"] = int(window[0])
+            if name:
+                rule["name"] = name
+            if reason:
+                rule["reason"] = reason
+            validate_rule(rule)
+        except (RuleError, ValueError) as e:
+            await interaction.response.send_message(f"❌ Неверное правило: {e}", ephemeral=True)
+            return
+
+        rules = self._guild_rules(interaction.guild)
+        rules[:] = [r for r in rules if rule_name(r) != rule_name(rule)]
+        rules.append(rule)
+        self.save_config(interaction.guild.id)
+        await interaction.response.send_message(
+            f"✅ Правило **{rule_name(rule)}** добавлено: {self._describe_rule(rule)}", ephemeral=True
+        )
+
+    @app_commands.command(name="automod_remove", description="Удалить правило автомода")
+    @app_commands.describe(name="Имя правила (см. /automod_rules)")
+    @app_commands.default_permissions(manage_guild=True)
+    async def automod_remove(self, interaction: discord.Interaction, name: str):
+        """Удалить правило по имени."""
+        rules = self._guild_rules(interaction.guild)
+        kept = [r for r in rules if rule_name(r) != name]
+        if len(kept) == len(rules):
+            await interaction.response.send_message(f"❌ Правила **{name}** нет.", ephemeral=True)
+            return
+        rules[:] = kept
+        self.save_config(interaction.guild.id)
+        await interaction.response.send_message(f"✅ Правило **{name}** удалено.", ephemeral=True)
+
+    @app_commands.command(name="automod_prefixes", description="Префиксы команд, которые автомод не проверяет")
+    @app_commands.describe(prefixes="Префиксы через пробел (пусто — проверять все сообщения)")
+    @app_commands.default_permissions(manage_guild=True)
+    async def automod_prefixes(self, interaction: discord.Interaction, prefixes: str = ""):
+        """Задать игнорируемые префиксы."""
+        cfg = self.get_guild_config(interaction.guild)
+        cfg["automod_ignore_prefixes"] = prefixes.split()
+        self.save_config(interaction.guild.id)
+        shown = " ".join(f"`{p}`" for p in cfg["automod_ignore_prefixes"]) or "нет"
+        await interaction.response.send_message(f"✅ Игнорируемые префиксы: {shown}", ephemeral=True)
+
+    @app_commands.command(name="automod_reset", description="Вернуть правила автомода по умолчанию")
+    @app_commands.default_permissions(manage_guild=True)
+    async def automod_reset(self, interaction: discord.Interaction):
+        """Сбросить правила и префиксы к значениям по умолчанию."""
+        cfg = self.get_guild_config(interaction.guild)
+        cfg.pop("automod_rules", None)
+        cfg.pop("automod_ignore_prefixes", None)
+        self.save_config(interaction.guild.id)
+        await interaction.response.send_message("✅ Правила автомода сброшены к стандартным.", ephemeral=True)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Moder(bot))
\ No newline at end of file
@@ -7,6 +7,8 @@ import sys
 import psutil
 from dotenv import load_dotenv
 
+from utils.lifecycle import flush_state
+
 # Загружаем переменные из .env файла
 load_dotenv()
 
@@ -121,6 +123,8 @@ class Shutdown(commands.Cog):
 
         print(f"🔄 Бот перезагружен создателем {interaction.user} (ID: {interaction.user.id})")
         await asyncio.sleep(2)
+        # execv не вызывает cog_unload — сбрасываем отложенные записи вручную
+        await flush_state(self.bot)
         os.execv(sys.executable, ['python'] + sys.argv)
 
     @app_commands.command(name="status", description="Показать статус бота (только для администраторов)")
@@ -6,6 +6,8 @@ import os
 import sys
 from dotenv import load_dotenv
 
+from utils.lifecycle import flush_state
+
 # Загружаем переменные из .env файла
 load_dotenv()
 
@@ -157,6 +159,8 @@ class ShutdownConfirm(commands.Cog):
 
             print(f"🔄 Бот перезагружен создателем {interaction.user} (ID: {interaction.user.id})")
             await asyncio.sleep(2)
+            # execv не вызывает cog_unload — сбрасываем отложенные записи вручную
+            await flush_state(self.bot)
             os.execv(sys.executable, ['python'] + sys.argv)
 
         elif view.value is False:
@@ -1,43 +1,37 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
 from datetime import datetime, timedelta
 from typing import Optional
 
+from utils.config_service import get_config_service
+
+STREAM_DEFAULTS = {
+    "enabled": False,
+    "announce_channel": None,
+    "ping_role": None,
+    "active_streams": {}
+}
+
 class StreamNotifications(commands.Cog):
     """Система уведомлений о начале стримов на Twitch/YouTube"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.config_file = "stream_config.json"
-        self.config = self._load_config()
+        self.config = get_config_service(bot).section("stream", "stream_config.json", STREAM_DEFAULTS)
         self.cooldown_minutes = 10  # Не спамить уведомлениями
-        
-    def _load_config(self) -> dict:
-        """Загрузка конфигурации из JSON"""
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    
-    def _save_config(self):
-        """Сохранение конфигурации"""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
     
     def _get_guild_config(self, guild_id: str) -> dict:
-        """Получить конфигурацию сервера"""
-        if guild_id not in self.config:
-            self.config[guild_id] = {
-                "enabled": False,
-                "announce_channel": None,
-                "ping_role": None,
-                "active_streams": {}
-            }
-            self._save_config()
-        return self.config[guild_id]
+        """Получить конфигурацию сервера (только чтение)"""
+        return self.config.get(guild_id)
+    
+    def _edit_guild_config(self, guild_id: str) -> dict:
+        """Конфигурация сервера для изменения (после правок — _save_config)"""
+        return self.config.edit(guild_id)
+    
+    def _save_config(self, guild_id: str, field: Optional[str] = None):
+        """Сохранение конфигурации"""
+        self.config.commit(guild_id, field)
     
     def _is_streaming_activity(self, activity: discord.Activity) -> bool:
         """Проверка является ли активность стримом на Twitch/YouTube"""
@@ -70,22 +64,19 @@ class StreamNotifications(commands.Cog):
     
     def _mark_notified(self, guild_id: str, user_id: str):
         """Отметить что уведомление отправлено"""
-        guild_config = self._get_guild_config(guild_id)
-        if "active_streams" not in guild_config:
-            guild_config["active_streams"] = {}
-        
+        guild_config = self._edit_guild_config(guild_id)
         guild_config["active_streams"][user_id] = {
             "started_at": datetime.now().isoformat(),
             "notified": True
         }
-        self._save_config()
+        self._save_config(guild_id, "active_streams")
     
     def _clear_stream(self, guild_id: str, user_id: str):
         """Очистить статус стрима"""
         guild_config = self._get_guild_config(guild_id)
-        if "active_streams" in guild_config and user_id in guild_config["active_streams"]:
-            del guild_config["active_streams"][user_id]
-            self._save_config()
+        if user_id in guild_config["active_streams"]:
+            del self._edit_guild_config(guild_id)["active_streams"][user_id]
+            self._save_config(guild_id, "active_streams")
     
     @commands.Cog.listener()
     async def on_presence_update(self, before: discord.Member, after: discord.Member):
@@ -174,11 +165,11 @@ class StreamNotifications(commands.Cog):
     async def stream_setup(self, interaction: discord.Interaction, channel: discord.TextChannel):
         """Настройка канала для анонсов"""
         guild_id = str(interaction.guild.id)
-        guild_config = self._get_guild_config(guild_id)
+        guild_config = self._edit_guild_config(guild_id)
         
         guild_config["announce_channel"] = str(channel.id)
         guild_config["enabled"] = True
-        self._save_config()
+        self._save_config(guild_id, "announce_channel")
         
         embed = discord.Embed(
             title="✅ Канал настроен",
@@ -194,10 +185,10 @@ class StreamNotifications(commands.Cog):
     async def stream_role(self, interaction: discord.Interaction, role: discord.Role):
         """Настройка роли для пинга"""
         guild_id = str(interaction.guild.id)
-        guild_config = self._get_guild_config(guild_id)
+        guild_config = self._edit_guild_config(guild_id)
         
         guild_config["ping_role"] = str(role.id)
-        self._save_config()
+        self._save_config(guild_id, "ping_role")
         
         embed = discord.Embed(
             title="✅ Роль настроена",
@@ -212,11 +203,11 @@ class StreamNotifications(commands.Cog):
     async def stream_toggle(self, interaction: discord.Interaction):
         """Переключение уведомлений"""
         guild_id = str(interaction.guild.id)
-        guild_config = self._get_guild_config(guild_id)
+        guild_config = self._edit_guild_config(guild_id)
         
         current = guild_config.get("enabled", False)
         guild_config["enabled"] = not current
-        self._save_config()
+        self._save_config(guild_id, "enabled")
         
         status = "включены ✅" if guild_config["enabled"] else "выключены ❌"
         
@@ -1,14 +1,16 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiohttp
 import asyncio
 import json
 import os
-from typing import Dict, List, Optional
-import datetime
+from typing import Dict, Optional, Set
 
 from cogs.shutdown import is_admin_or_owner
+from utils.log_bus import TelegramSink, get_log_bus
+
+# Фильтры старого моста (пересылка сообщений из канала логов) — у шины логов их нет
+OBSOLETE_KEYS = ("include_bot_messages", "include_system_messages")
 
 
 def is_bot_owner():
@@ -25,8 +27,10 @@ class TelegramBridge(commands.Cog):
         self.bot = bot
         self.config_file = 'telegram_bridge_config.json'
         self.config = self.load_config()
-        self.session = None
-        self.last_processed_message = None  # Чтобы избежать дублирования
+        self.bus = get_log_bus(bot)
+        self.sink: Optional[TelegramSink] = None
+        # закрытие заменённых приёмников (держим ссылки, чтобы их не собрал GC)
+        self._closing: Set[asyncio.Task] = set()
 
     def load_config(self) -> Dict:
         """Загрузка конфигурации из файла"""
@@ -36,8 +40,6 @@ class TelegramBridge(commands.Cog):
             "discord_log_channel_id": "",  # Специально для канала логов
             "enabled": False,
             "forward_discord_to_telegram": True,
-            "include_bot_messages": True,  # Включать сообщения от ботов
-            "include_system_messages": True,  # Включать системные сообщения
             "message_format": "detailed"  # detailed или simple
         }
 
@@ -50,6 +52,9 @@ class TelegramBridge(commands.Cog):
                 for key, value in default_config.items():
                     if key not in loaded_config:
                         loaded_config[key] = value
+                # Убираем настройки старого моста, которые больше ни на что не влияют
+                for key in OBSOLETE_KEYS:
+                    loaded_config.pop(key, None)
 
                 # Сохраняем обновленный конфиг
                 with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -70,199 +75,48 @@ class TelegramBridge(commands.Cog):
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=4, ensure_ascii=False)
-            return True
         except Exception as e:
             print(f"❌ Ошибка сохранения конфигурации: {e}")
             return False
-
-    async def send_telegram_message(self, text: str, parse_mode: str = "HTML") -> bool:
-        """Отправка сообщения в Telegram"""
-        if not self.config["telegram_bot_token"] or not self.config["telegram_chat_id"]:
-            return False
-
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
-
-        url = f"https://api.telegram.org/bot{self.config['telegram_bot_token']}/sendMessage"
-
-        # Разбиваем длинные сообщения на части (Telegram имеет лимит 4096 символов)
-        if len(text) > 4000:
-            parts = [text[i:i + 4000] for i in range(0, len(text), 4000)]
-            success = True
-            for part in parts:
-                payload = {
-                    "chat_id": self.config["telegram_chat_id"],
-                    "text": part,
-                    "parse_mode": parse_mode
-                }
-                try:
-                    async with self.session.post(url, json=payload) as response:
-                        if response.status != 200:
-                            success = False
-                except Exception:
-                    success = False
-            return success
-        else:
-            payload = {
-                "chat_id": self.config["telegram_chat_id"],
-                "text": text,
-                "parse_mode": parse_mode
-            }
-
-            try:
-                async with self.session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        error_text = await response.text()
-                        print(f"❌ Ошибка отправки в Telegram: {error_text}")
-                        return False
-            except Exception as e:
-                print(f"❌ Ошибка соединения с Telegram: {e}")
-                return False
-
-    def format_discord_message(self, message) -> str:
-        """Форматирование сообщения Discord для Telegram"""
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # Используем get с значением по умолчанию на случай отсутствия ключа
-        message_format = self.config.get("message_format", "detailed")
-
-        if message_format == "simple":
-            # Простой формат
-            if message.author.bot:
-                author = f"🤖 {message.author.display_name}"
-            else:
-                author = f"👤 {message.author.display_name}"
-
-            text = f"{author}: {message.content}"
-
-        else:
-            # Детальный формат
-            if message.author.bot:
-                author = f"<b>🤖 БОТ: {message.author.display_name}</b>"
-            else:
-                author = f"<b>👤 {message.author.display_name}</b>"
-
-            channel = f"<i>#{message.channel.name}</i>"
-            time = f"<code>{timestamp}</code>"
-
-            text = f"{author} в {channel}\n"
-            text += f"Время: {time}\n"
-
-            if message.content:
-                text += f"\n💬 {message.content}"
-
-        # Добавляем информацию о вложениях
-        if message.attachments:
-            attachments_info = []
-            for attachment in message.attachments:
-                file_type = "📎 Файл"
-                if any(attachment.filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif']):
-                    file_type = "🖼️ Изображение"
-                elif any(attachment.filename.lower().endswith(ext) for ext in ['.mp4', '.avi', '.mov']):
-                    file_type = "🎥 Видео"
-                elif any(attachment.filename.lower().endswith(ext) for ext in ['.mp3', '.wav', '.ogg']):
-                    file_type = "🔊 Аудио"
-
-                attachments_info.append(f"{file_type}: {attachment.filename} ({attachment.size} bytes)")
-
-            text += f"\n\n📁 Вложения ({len(message.attachments)}):\n" + "\n".join(attachments_info)
-
-        # Добавляем информацию об эмбедах
-        if message.embeds:
-            text += f"\n\n🔗 Эмбеды: {len(message.embeds)}"
-            for embed in message.embeds:
-                if embed.title:
-                    text += f"\n- Заголовок: {embed.title}"
-                if embed.description:
-                    desc = embed.description[:100] + "..." if len(embed.description) > 100 else embed.description
-                    text += f"\n- Описание: {desc}"
-
-        # Добавляем информацию о стикерах
-        if message.stickers:
-            text += f"\n\n🎨 Стикеры: {len(message.stickers)}"
-            for sticker in message.stickers:
-                text += f"\n- {sticker.name}"
-
-        return text
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Обработка сообщений из Discord для отправки в Telegram"""
-        # Используем get с значениями по умолчанию для всех ключей
-        if not self.config.get("enabled", False) or not self.config.get("forward_discord_to_telegram", True):
-            return
-
-        # Проверяем, что сообщение из нужного канала логов
-        discord_log_channel_id = self.config.get("discord_log_channel_id", "")
-        if not discord_log_channel_id:
-            return
-
-        if str(message.channel.id) != str(discord_log_channel_id):
-            return
-
-        # Проверяем, не обрабатывали ли мы уже это сообщение (анти-дублирование)
-        if self.last_processed_message == message.id:
-            return
-
-        self.last_processed_message = message.id
-
-        # Форматируем и отправляем сообщение
-        telegram_text = self.format_discord_message(message)
-
-        # Отправляем в Telegram
-        success = await self.send_telegram_message(telegram_text)
-
-        if not success:
-            print(f"❌ Не удалось отправить сообщение {message.id} в Telegram")
-
-    @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        """Обработка редактированных сообщений"""
-        if not self.config.get("enabled", False) or not self.config.get("forward_discord_to_telegram", True):
+        self._attach_sink()
+        return True
+
+    def _attach_sink(self):
+        """Пересоздаёт приёмник Telegram в шине логов по текущему конфигу"""
+        old_sink = self.sink
+        if old_sink is not None:
+            self.bus.remove_sink(old_sink)
+            task = asyncio.create_task(old_sink.close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        self.sink = None
+
+        if not self.config.get("telegram_bot_token") or not self.config.get("telegram_chat_id"):
             return
 
-        discord_log_channel_id = self.config.get("discord_log_channel_id", "")
-        if not discord_log_channel_id:
-            return
-
-        if str(after.channel.id) != str(discord_log_channel_id):
-            return
-
-        # Отправляем уведомление о редактировании
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        telegram_text = f"✏️ <b>СООБЩЕНИЕ ОТРЕДАКТИРОВАНО</b>\n"
-        telegram_text += f"👤 <b>{after.author.display_name}</b>\n"
-        telegram_text += f"📅 <code>{timestamp}</code>\n\n"
-        telegram_text += f"<b>Было:</b>\n<code>{before.content if before.content else '[без текста]'}</code>\n\n"
-        telegram_text += f"<b>Стало:</b>\n<code>{after.content if after.content else '[без текста]'}</code>"
-
-        await self.send_telegram_message(telegram_text)
-
-    @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        """Обработка удаленных сообщений"""
-        if not self.config.get("enabled", False) or not self.config.get("forward_discord_to_telegram", True):
-            return
-
-        discord_log_channel_id = self.config.get("discord_log_channel_id", "")
-        if not discord_log_channel_id:
-            return
-
-        if str(message.channel.id) != str(discord_log_channel_id):
-            return
-
-        # Отправляем уведомление об удалении
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.sink = TelegramSink(
+            self.config["telegram_bot_token"],
+            self.config["telegram_chat_id"],
+            guild_ids=self._bridge_guild_ids(),
+            simple=self.config.get("message_format", "detailed") == "simple",
+        )
+        if self.config.get("enabled", False) and self.config.get("forward_discord_to_telegram", True):
+            self.bus.add_sink(self.sink)
 
-        telegram_text = f"🗑️ <b>СООБЩЕНИЕ УДАЛЕНО</b>\n"
-        telegram_text += f"👤 <b>{message.author.display_name}</b>\n"
-        telegram_text += f"📅 <code>{timestamp}</code>\n\n"
-        telegram_text += f"<b>Содержимое:</b>\n<code>{message.content if message.content else '[без текста]'}</code>"
+    def _bridge_guild_ids(self) -> set:
+        """Сервер канала логов моста. Пока канал не найден — пустое множество: чужие логи не пересылаем"""
+        discord_log_channel_id = self.config.get("discord_log_channel_id")
+        if discord_log_channel_id:
+            channel = self.bot.get_channel(int(discord_log_channel_id))
+            if channel:
+                return {channel.guild.id}
+        return set()
 
-        await self.send_telegram_message(telegram_text)
+    async def send_telegram_message(self, text: str) -> bool:
+        """Отправка сообщения в Telegram в обход очереди логов"""
+        if self.sink is None:
+            return False
+        return await self.sink.send_text(text)
 
     @app_commands.command(name="setup_logs_bridge",
                           description="Настроить мост для логов между Discord и Telegram (только для владельца)")
@@ -280,13 +134,11 @@ class TelegramBridge(commands.Cog):
             self.config["telegram_chat_id"] = chat_id
             self.config["discord_log_channel_id"] = str(log_channel.id)
             self.config["enabled"] = True
-            self.config["include_bot_messages"] = True
-            self.config["include_system_messages"] = True
             self.config["message_format"] = "detailed"  # Убедимся, что ключ существует
 
             if self.save_config():
                 # Тестируем соединение с Telegram
-                test_message = "🔗 <b>Мост для логов Discord-Telegram активирован!</b>\n\nТестовое сообщение. Все сообщения из канала логов будут пересылаться сюда."
+                test_message = "🔗 <b>Мост для логов Discord-Telegram активирован!</b>\n\nТестовое сообщение. Все логи сервера будут пересылаться сюда."
                 success = await self.send_telegram_message(test_message)
 
                 embed = discord.Embed(
@@ -296,7 +148,6 @@ class TelegramBridge(commands.Cog):
                 embed.add_field(name="Telegram Chat ID", value=chat_id, inline=True)
                 embed.add_field(name="Discord Log Channel", value=log_channel.mention, inline=True)
                 embed.add_field(name="Статус Telegram", value="✅ Подключен" if success else "❌ Ошибка", inline=True)
-                embed.add_field(name="Пересылка ботов", value="✅ Включена", inline=True)
                 embed.add_field(name="Формат", value="Детальный", inline=True)
 
                 if not success:
@@ -336,9 +187,6 @@ class TelegramBridge(commands.Cog):
         embed.add_field(name="🔄 Статус", value="✅ Включен" if self.config.get("enabled", False) else "❌ Выключен",
                         inline=True)
         embed.add_field(name="Discord → Telegram", value="✅ Включено", inline=True)
-        embed.add_field(name="🤖 Сообщения ботов",
-                        value="✅ Включены" if self.config.get("include_bot_messages", True) else "❌ Выключены",
-                        inline=True)
 
         if self.config.get("telegram_bot_token"):
             embed.add_field(name="🤖 Telegram Bot", value="✅ Настроен", inline=True)
@@ -363,6 +211,18 @@ class TelegramBridge(commands.Cog):
         message_format = self.config.get("message_format", "detailed")
         embed.add_field(name="📝 Формат", value="Детальный" if message_format == "detailed" else "Простой", inline=True)
 
+        if self.sink is not None:
+            stats = self.sink.stats()
+            embed.add_field(
+                name="📬 Очередь логов",
+                value=(
+                    f"Поставлено: **{stats['queued']}**, отправлено: **{stats['sent']}**, "
+                    f"потеряно: **{stats['dropped']}**\n"
+                    f"Ожидает: **{stats['backlog']}**, упёрлись в лимит: **{stats['rate_limited']}**"
+                ),
+                inline=False
+            )
+
         # Тестируем соединение с Telegram
         if self.config.get("enabled", False) and self.config.get("telegram_bot_token"):
             test_success = await self.send_telegram_message("🔍 <b>Проверка связи моста логов...</b>")
@@ -494,8 +354,8 @@ class TelegramBridge(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self):
         """Инициализация при готовности бота"""
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
+        # Сервер канала логов известен только после загрузки кэша
+        self._attach_sink()
 
         log_channel_info = "не настроен"
         discord_log_channel_id = self.config.get("discord_log_channel_id")
@@ -508,10 +368,29 @@ class TelegramBridge(commands.Cog):
             f"🌉 Telegram Bridge для логов готов! Статус: {'✅ Включен' if self.config.get('enabled', False) else '❌ Выключен'}")
         print(f"📋 Канал логов: {log_channel_info}")
 
-    def cog_unload(self):
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        """Сервер канала логов мог появиться в кэше позже cog_load"""
+        if self.sink is not None and not self.sink.guild_ids:
+            self.sink.guild_ids = self._bridge_guild_ids()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Канал логов удалён — перестаём пересылать, пока не зададут новый"""
+        if self.sink is not None and str(channel.id) == str(self.config.get("discord_log_channel_id")):
+            self.sink.guild_ids = set()
+
+    async def cog_load(self):
+        self._attach_sink()
+
+    async def cog_unload(self):
         """Очистка при выгрузке кога"""
-        if self.session:
-            asyncio.create_task(self.session.close())
+        if self.sink is not None:
+            self.bus.remove_sink(self.sink)
+            await self.sink.close()
+            self.sink = None
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
 
     # Обработчик ошибок для команд
     @setup_logs_bridge.error
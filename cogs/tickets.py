@@ -1,8 +1,7 @@
 # cogs/tickets.py
 import asyncio
 import datetime
-import json
-import os
+import typing as t
 from io import StringIO
 
 import discord
@@ -10,6 +9,8 @@ from discord.ext import commands
 from discord import app_commands
 from discord.ui import View, Button, Select, Modal, TextInput
 
+from utils.config_service import ConfigSection, get_config_service
+
 # ==== НАСТРОЙКИ, КОТОРЫЕ ПОКА ОСТАВИМ КОНСТАНТАМИ ====
 LOG_CHANNEL_ID = 1437390123741352057  # канал для логов тикетов (укажи свой)
 
@@ -21,37 +22,34 @@ CATEGORY_TITLES = {
 
 CONFIG_FILE = "ticket_config.json"
 
-DEFAULT_CONFIG = {
-    "bug": {"support_role_id": None, "category_id": None},
-    "idea": {"support_role_id": None, "category_id": None},
-    "complaint": {"support_role_id": None, "category_id": None},
-}
+TICKET_TYPE_DEFAULTS = {"support_role_id": None, "category_id": None}
+
+# данные раздела "tickets" общего сервиса конфигов ({тип: настройки}), см. bind_config()
+CONFIG: dict = {}
+_section: t.Optional[ConfigSection] = None
+_support_role_ids: t.Optional[set] = None  # кэш; сбрасывается по подписке на изменения
 
 
-def load_config():
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # подстрахуемся, что все ключи есть
-            for k, v in DEFAULT_CONFIG.items():
-                if k not in data:
-                    data[k] = v
-                else:
-                    data[k].setdefault("support_role_id", None)
-                    data[k].setdefault("category_id", None)
-            return data
-        except Exception:
-            return DEFAULT_CONFIG.copy()
-    else:
-        return DEFAULT_CONFIG.copy()
+def _on_config_change(key: str, field: t.Optional[str]):
+    global _support_role_ids
+    _support_role_ids = None
 
 
-CONFIG = load_config()
+def bind_config(bot: commands.Bot):
+    """Подключает модуль к разделу конфига бота (все типы тикетов — на месте)."""
+    global CONFIG, _section
+    configs = get_config_service(bot)
+    section = configs.section("tickets", CONFIG_FILE, TICKET_TYPE_DEFAULTS)
+    for ticket_type in CATEGORY_TITLES:
+        section.edit(ticket_type)
+    configs.unsubscribe("tickets", _on_config_change)
+    configs.subscribe("tickets", _on_config_change)
+    _section = section
+    CONFIG = section.data
 
-def save_config():
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(CONFIG, f, ensure_ascii=False, indent=2)
+
+def save_config(ticket_type: str, field: t.Optional[str] = None):
+    _section.commit(ticket_type, field)
 
 
 def get_support_role_id_for_type(ticket_type: str):
@@ -69,12 +67,10 @@ def get_category_id_for_type(ticket_type: str):
 
 
 def get_all_support_role_ids():
-    ids = set()
-    for cfg in CONFIG.values():
-        rid = cfg.get("support_role_id")
-        if rid:
-            ids.add(rid)
-    return ids
+    global _support_role_ids
+    if _support_role_ids is None:
+        _support_role_ids = {cfg["support_role_id"] for cfg in CONFIG.values() if cfg.get("support_role_id")}
+    return _support_role_ids
 
 
 def member_is_support(member: discord.Member) -> bool:
@@ -343,7 +339,7 @@ class TicketPanelView(View):
 
         # Хоть одна категория должна быть настроена, иначе смысла нет
         has_any_category = any(
-            get_category_id_for_type(t) for t in CONFIG.keys()
+            get_category_id_for_type(tt) for tt in CONFIG.keys()
         )
         if not has_any_category:
             return await interaction.response.send_message(
@@ -365,6 +361,10 @@ class Tickets(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        bind_config(bot)
+
+    async def cog_unload(self):
+        get_config_service(self.bot).unsubscribe("tickets", _on_config_change)
 
     # === Панель тикетов ===
 
@@ -421,7 +421,7 @@ class Tickets(commands.Cog):
             )
 
         CONFIG[tt]["support_role_id"] = role.id
-        save_config()
+        save_config(tt, "support_role_id")
         await ctx.send(
             f"Для типа `{tt}` установлена роль поддержки {role.mention}"
         )
@@ -447,7 +447,7 @@ class Tickets(commands.Cog):
             )
 
         CONFIG[tt]["category_id"] = category.id
-        save_config()
+        save_config(tt, "category_id")
         await ctx.send(
             f"Для типа `{tt}` установлена категория каналов: **{category.name}**"
         )
@@ -3,6 +3,8 @@ from discord.ext import commands
 import os
 from dotenv import load_dotenv  # <— добавили
 
+from utils.lifecycle import flush_state
+
 class MyBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
@@ -22,6 +24,11 @@ class MyBot(commands.Bot):
                     except Exception as e:
                         print(f'❌ Ошибка загрузки {filename}: {e}')
 
+    async def close(self):
+        # отложенные записи и логи (utils/lifecycle.py) — до закрытия соединения
+        await flush_state(self)
+        await super().close()
+
 
 bot = MyBot()
 
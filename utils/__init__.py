@@ -0,0 +1 @@
+"""Вспомогательные модули, общие для когов (не загружаются как расширения)."""
@@ -0,0 +1,378 @@
+"""
+Правила автомода сервера и их скомпилированный план проверки.
+
+Конфиг сервера (moderation_config.json):
+
+    "automod_rules": [
+        {"type": "links"},
+        {"type": "caps", "min_length": 10, "percent": 0.7},
+        {"type": "regex", "name": "invites", "pattern": "discord\\.gg/\\w+", "reason": "инвайты"},
+        {"type": "words", "words": ["плохое", "слово"]},
+        {"type": "mentions", "max": 5},
+        {"type": "attachments", "max": 4},
+        {"type": "mention_rate", "max": 15, "window": 60},
+        {"type": "attachment_rate", "max": 10, "window": 30},
+        {"type": "duplicates", "min_users": 4, "window": 60, "repeat_count": 4, "repeat_window": 600,
+         "min_length": 32},
+        {"type": "flood", "window": 10, "threshold": 3},
+    ],
+    "automod_ignore_prefixes": ["!", "/", ".", "?", "-"]
+
+compile_plan() собирает правила один раз (до изменения конфига):
+- все regex/words правила — в одну общую регулярку с именованными группами;
+  шаблоны, которые в общей регулярке ведут себя иначе (ссылки на группы,
+  именованные группы, глобальные флаги вроде (?i) в начале), проверяются
+  отдельными регулярками
+- производные от текста (lower) считаются один раз на сообщение
+- проверки без состояния упорядочиваются по измеренной стоимости и частоте
+  срабатываний; duplicates и частотные правила (flood, mention_rate,
+  attachment_rate) всегда идут последними в заданном порядке, т.к.
+  запоминают сообщение и не должны видеть уже наказанные
+- упоминания и вложения считаются по уже разобранным полям сообщения
+  (mentions, role_mentions, attachments, stickers) — без запросов к API;
+  эмбеды не считаются: их создаёт сам Discord для превью ссылок
+- у каждой проверки счётчики вызовов, срабатываний и времени (stats())
+"""
+
+import re
+import time
+import typing as t
+
+RULE_TYPES = (
+    "regex", "words", "mentions", "attachments", "caps", "links",
+    "duplicates", "flood", "mention_rate", "attachment_rate",
+)
+# правила с окном времени (считаются трекерами utils/flood_tracker.py)
+RATE_TYPES = ("flood", "mention_rate", "attachment_rate")
+STATEFUL_TYPES = ("duplicates",) + RATE_TYPES
+
+# копипаста: один текст от min_users разных людей за window сек или от одного
+# человека repeat_count раз за repeat_window сек; тексты короче min_length не смотрим
+DUPLICATE_DEFAULTS = {"min_users": 4, "window": 60, "repeat_count": 4, "repeat_window": 600, "min_length": 32}
+
+EVERYONE_MENTION_WEIGHT = 10  # @everyone/@here стоит как 10 упоминаний
+
+DEFAULT_IGNORE_PREFIXES = ["!", "/", ".", "?", "-"]
+DEFAULT_RULES = [
+    {"type": "links"},
+    {"type": "caps", "min_length": 10, "percent": 0.7},
+    {"type": "mentions", "max": 5},
+    {"type": "mention_rate", "max": 15, "window": 60},
+    {"type": "attachment_rate", "max": 10, "window": 30},
+    {"type": "duplicates"},
+    {"type": "flood", "window": 10, "threshold": 3},
+]
+
+DEFAULT_REASONS = {
+    "regex": "запрещённый шаблон",
+    "words": "запрещённые слова",
+    "mentions": "массовые упоминания",
+    "attachments": "слишком много вложений",
+    "caps": "злоупотребление КАПСОМ",
+    "links": "запрещённые или неразрешённые ссылки",
+    "duplicates": "копипаста",
+    "flood": "флуд (слишком много сообщений за короткое время)",
+    "mention_rate": "массовые упоминания (частота)",
+    "attachment_rate": "спам вложениями",
+}
+
+REORDER_EVERY = 512  # пересортировка проверок раз в N сообщений
+EWMA_ALPHA = 0.05
+
+
+class RuleError(ValueError):
+    """Некорректное правило (неизвестный тип, битый regex, пустые параметры)."""
+
+
+class MessageView:
+    """Сообщение + лениво вычисляемые производные, общие для всех проверок."""
+
+    __slots__ = ("message", "content", "_lower")
+
+    def __init__(self, message):
+        self.message = message
+        self.content: str = message.content
+        self._lower: t.Optional[str] = None
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.content.lower()
+        return self._lower
+
+
+class Verdict(t.NamedTuple):
+    rule: dict
+    kind: str
+    reason: str
+
+
+CheckFn = t.Callable[[MessageView], t.Optional[str]]
+# фабрики проверок, которым нужно состояние кога (домены, трекеры): rule -> fn(view) -> причина | None
+Hooks = dict[str, t.Callable[[dict], CheckFn]]
+
+
+class _Check:
+    __slots__ = ("name", "kind", "rule", "fn", "stateful", "evaluations", "hits", "total_ns", "ewma_ns")
+
+    def __init__(self, name: str, kind: str, rule: dict, fn: CheckFn):
+        self.name = name
+        self.kind = kind
+        self.rule = rule
+        self.fn = fn
+        self.stateful = kind in STATEFUL_TYPES
+        self.evaluations = 0
+        self.hits = 0
+        self.total_ns = 0
+        self.ewma_ns = 0.0
+
+    def rank(self) -> float:
+        """Ожидаемая цена на одно срабатывание: дешёвые и частые проверки — раньше."""
+        hit_rate = self.hits / self.evaluations if self.evaluations else 0.0
+        return self.ewma_ns / (hit_rate + 0.01)
+
+
+def rule_name(rule: dict) -> str:
+    return rule.get("name") or rule["type"]
+
+
+def mention_count(message) -> int:
+    count = len(getattr(message, "mentions", ()) or ()) + len(getattr(message, "role_mentions", ()) or ())
+    if getattr(message, "mention_everyone", False):
+        count += EVERYONE_MENTION_WEIGHT
+    return count
+
+
+def attachment_count(message) -> int:
+    """Файлы и стикеры сообщения (превью ссылок не в счёт)."""
+    return len(getattr(message, "attachments", ()) or ()) + len(getattr(message, "stickers", ()) or ())
+
+
+def rate_limits(rule: dict) -> tuple[float, int]:
+    """(окно, порог срабатывания) частотного правила."""
+    if rule["type"] == "flood":
+        return float(rule.get("window", 10)), int(rule.get("threshold", 3))
+    # max — сколько ещё можно, срабатывает на max + 1
+    return float(rule.get("window", 60)), int(rule["max"]) + 1
+
+
+# \1..\9 (не экранированный обратный слэш) или (?P=имя): номера групп в общей регулярке сдвигаются
+_BACKREF = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?P=")
+
+
+def _pattern_body(rule: dict) -> str:
+    """Шаблон regex/words-правила для общей регулярки."""
+    if rule["type"] == "regex":
+        body = rule["pattern"]
+        return f"(?i:{body})" if rule.get("ignore_case", True) else body
+    words = sorted({w.strip() for w in rule["words"] if w.strip()}, key=len, reverse=True)
+    return r"(?i:\b(?:" + "|".join(map(re.escape, words)) + r")\b)"
+
+
+def compile_pattern(rule: dict) -> re.Pattern:
+    """Отдельная регулярка regex-правила (так её и проверяет validate_rule)."""
+    return re.compile(rule["pattern"], re.IGNORECASE if rule.get("ignore_case", True) else 0)
+
+
+def _combinable(rule: dict) -> bool:
+    """Можно ли проверять правило в общей регулярке без изменения смысла."""
+    if rule["type"] != "regex":
+        return True
+    if _BACKREF.search(rule["pattern"]) or compile_pattern(rule).groupindex:
+        return False
+    try:
+        re.compile(f"(?P<r0>{_pattern_body(rule)})")
+    except re.error:
+        return False
+    return True
+
+
+def duplicate_options(rule: dict) -> dict:
+    """Пороги правила duplicates (с дефолтами)."""
+    return {key: type(default)(rule.get(key, default)) for key, default in DUPLICATE_DEFAULTS.items()}
+
+
+def validate_rule(rule: dict) -> None:
+    kind = rule.get("type")
+    if kind not in RULE_TYPES:
+        raise RuleError(f"неизвестный тип правила: {kind}")
+    if kind == "regex":
+        if not rule.get("pattern"):
+            raise RuleError("пустой шаблон")
+        try:
+            compile_pattern(rule)
+        except re.error as e:
+            raise RuleError(f"ошибка в регулярном выражении: {e}") from e
+    elif kind == "words" and not rule.get("words"):
+        raise RuleError("пустой список слов")
+    elif kind in ("mentions", "attachments", "mention_rate", "attachment_rate") and int(rule.get("max", 0)) < 1:
+        raise RuleError("max должен быть ≥ 1")
+    if kind in RATE_TYPES and float(rule.get("window", 10)) <= 0:
+        raise RuleError("окно должно быть больше 0")
+    if kind == "duplicates" and min(duplicate_options(rule).values()) < 1:
+        raise RuleError("пороги копипасты должны быть ≥ 1")
+
+
+def _caps_check(rule: dict) -> CheckFn:
+    min_length = int(rule.get("min_length", 10))
+    percent = float(rule.get("percent", 0.7))
+    reason = rule.get("reason") or DEFAULT_REASONS["caps"]
+
+    def check(view: MessageView) -> t.Optional[str]:
+        content = view.content
+        if len(content) < min_length:
+            return None
+        letters = upper = 0
+        for c in content:
+            if c.isalpha():
+                letters += 1
+                if c.isupper():
+                    upper += 1
+        if letters < min_length:
+            return None
+        return reason if upper / letters >= percent else None
+
+    return check
+
+
+def _count_check(rule: dict, counter: t.Callable[[t.Any], int]) -> CheckFn:
+    limit = int(rule["max"])
+    reason = rule.get("reason") or DEFAULT_REASONS[rule["type"]]
+
+    def check(view: MessageView) -> t.Optional[str]:
+        count = counter(view.message)
+        return f"{reason} ({count})" if count > limit else None
+
+    return check
+
+
+def _pattern_check(rules: list[dict]) -> CheckFn:
+    """
+    Одна регулярка на все совместимые regex/words правила (lastgroup говорит,
+    какое сработало) + отдельные регулярки для остальных.
+    """
+    parts = []
+    reasons = {}
+    separate: list[tuple[re.Pattern, str]] = []
+    for i, rule in enumerate(rules):
+        reason = rule.get("reason") or DEFAULT_REASONS[rule["type"]]
+        try:
+            if _combinable(rule):
+                group = f"r{i}"
+                parts.append(f"(?P<{group}>{_pattern_body(rule)})")
+                reasons[group] = reason
+            else:
+                separate.append((compile_pattern(rule), reason))
+        except re.error as e:
+            print(f"⚠️ Правило автомода {rule_name(rule)} пропущено: {e}")
+    combined = re.compile("|".join(parts)) if parts else None
+
+    def check(view: MessageView) -> t.Optional[str]:
+        if combined is not None:
+            match = combined.search(view.content)
+            if match:
+                return reasons[match.lastgroup]
+        for pattern, reason in separate:
+            if pattern.search(view.content):
+                return reason
+        return None
+
+    return check
+
+
+class AutomodPlan:
+    def __init__(self, checks: list[_Check], ignore_prefixes: t.Iterable[str]):
+        self.ignore_prefixes = tuple(p for p in ignore_prefixes if p)
+        self.checks = checks
+        self._evaluations = 0
+
+    def evaluate(self, message) -> t.Optional[Verdict]:
+        """Первое сработавшее правило или None."""
+        content = message.content
+        if self.ignore_prefixes and content.startswith(self.ignore_prefixes):
+            return None
+
+        self._evaluations += 1
+        if self._evaluations % REORDER_EVERY == 0:
+            self._reorder()
+
+        view = MessageView(message)
+        clock = time.perf_counter_ns
+        for check in self.checks:
+            start = clock()
+            reason = check.fn(view)
+            elapsed = clock() - start
+            check.evaluations += 1
+            check.total_ns += elapsed
+            check.ewma_ns += (elapsed - check.ewma_ns) * EWMA_ALPHA
+            if reason:
+                check.hits += 1
+                return Verdict(check.rule, check.kind, reason)
+        return None
+
+    def _reorder(self) -> None:
+        stateless = sorted((c for c in self.checks if not c.stateful), key=_Check.rank)
+        self.checks = stateless + [c for c in self.checks if c.stateful]
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "name": c.name,
+                "type": c.kind,
+                "evaluations": c.evaluations,
+                "hits": c.hits,
+                "avg_us": c.total_ns / c.evaluations / 1000 if c.evaluations else 0.0,
+            }
+            for c in self.checks
+        ]
+
+
+def compile_plan(
+        rules: t.Optional[list[dict]],
+        ignore_prefixes: t.Optional[t.Iterable[str]] = None,
+        hooks: t.Optional[Hooks] = None,
+) -> AutomodPlan:
+    """Правила сервера -> план проверки. Правила без нужного hook'а пропускаются."""
+    rules = DEFAULT_RULES if rules is None else rules
+    hooks = hooks or {}
+    checks: list[_Check] = []
+    pattern_rules: list[dict] = []
+
+    for rule in rules:
+        kind = rule.get("type")
+        try:
+            validate_rule(rule)
+        except (RuleError, TypeError, ValueError, re.error) as e:
+            print(f"⚠️ Правило автомода {rule_name(rule) if kind else rule} пропущено: {e}")
+            continue
+
+        if kind in ("regex", "words"):
+            pattern_rules.append(rule)
+            continue
+        if kind == "caps":
+            fn = _caps_check(rule)
+        elif kind == "mentions":
+            fn = _count_check(rule, mention_count)
+        elif kind == "attachments":
+            fn = _count_check(rule, attachment_count)
+        elif kind in hooks:
+            fn = hooks[kind](rule)
+        else:
+            continue
+        checks.append(_Check(rule_name(rule), kind, rule, fn))
+
+    if pattern_rules:
+        try:
+            fn = _pattern_check(pattern_rules)
+        except re.error as e:
+            # не должно случаться после проверок выше — но остальной автомод сервера важнее
+            print(f"⚠️ Шаблонные правила автомода пропущены: {e}")
+        else:
+            names = ", ".join(rule_name(r) for r in pattern_rules)
+            combined = {"type": "regex", "name": names}
+            checks.insert(0, _Check(names, "regex", combined, fn))
+
+    stateless = [c for c in checks if not c.stateful]
+    stateful = [c for c in checks if c.stateful]
+    prefixes = DEFAULT_IGNORE_PREFIXES if ignore_prefixes is None else ignore_prefixes
+    return AutomodPlan(stateless + stateful, prefixes)
@@ -0,0 +1,156 @@
+"""
+Массовое удаление сообщений с учётом лимитов Discord.
+
+- сообщения младше 14 дней удаляются bulk-запросом (до 100 за вызов)
+- более старые bulk-удаление не принимает — они удаляются по одному
+  с паузой, чтобы не забивать bucket DELETE канала
+- 429 и ожидание bucket'ов по-прежнему обрабатывает HTTP-клиент discord.py
+
+DeferredDeleter — очередь удалений автомода: submit() не ждёт сеть,
+сообщения копятся по каналам и раз в `window` секунд уходят одним
+bulk-запросом вместо DELETE на каждое.
+"""
+
+import asyncio
+import datetime
+import typing as t
+
+import discord
+
+ProgressCallback = t.Callable[[int, int], t.Awaitable[None]]
+
+BULK_DELETE_LIMIT = 100
+# bulk-удаление принимает сообщения младше 14 дней; минута запаса на рассинхрон часов
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=1)
+SINGLE_DELETE_DELAY = 0.5
+
+
+def bulk_deletable(message: discord.abc.Snowflake, now: t.Optional[datetime.datetime] = None) -> bool:
+    now = now or discord.utils.utcnow()
+    return now - discord.utils.snowflake_time(message.id) < BULK_DELETE_MAX_AGE
+
+
+async def delete_messages(
+        channel: discord.abc.Messageable,
+        messages: t.Sequence[discord.Message],
+        *,
+        reason: t.Optional[str] = None,
+        single_delay: float = SINGLE_DELETE_DELAY,
+        progress: t.Optional[ProgressCallback] = None,
+) -> tuple[int, int]:
+    """Удаляет сообщения одного канала. Возвращает (удалено, с ошибкой)."""
+    now = discord.utils.utcnow()
+    recent = [m for m in messages if bulk_deletable(m, now)]
+    old = [m for m in messages if not bulk_deletable(m, now)]
+    total = len(messages)
+    deleted = 0
+    failed = 0
+
+    async def report():
+        if progress is not None:
+            await progress(deleted + failed, total)
+
+    async def delete_one(message: discord.Message) -> None:
+        nonlocal deleted, failed
+        try:
+            await message.delete()
+            deleted += 1
+        except discord.NotFound:
+            deleted += 1  # уже удалено — цель достигнута
+        except discord.HTTPException:
+            failed += 1
+
+    for start in range(0, len(recent), BULK_DELETE_LIMIT):
+        chunk = recent[start:start + BULK_DELETE_LIMIT]
+        try:
+            # для одного сообщения discord.py сам сделает обычный DELETE
+            await channel.delete_messages(chunk, reason=reason)
+            deleted += len(chunk)
+        except discord.HTTPException:
+            # например, часть сообщений уже удалена — добиваем по одному
+            for message in chunk:
+                await delete_one(message)
+                await asyncio.sleep(single_delay)
+        await report()
+
+    for message in old:
+        await delete_one(message)
+        await report()
+        await asyncio.sleep(single_delay)
+
+    return deleted, failed
+
+
+class _ChannelBatch:
+    __slots__ = ("channel", "messages", "task")
+
+    def __init__(self, channel: discord.abc.Messageable):
+        self.channel = channel
+        self.messages: dict[int, discord.Message] = {}  # id -> сообщение (без дублей)
+        self.task: t.Optional[asyncio.Task] = None
+
+
+class DeferredDeleter:
+    def __init__(self, *, window: float = 0.3, max_pending: int = 1000):
+        self.window = window
+        self.max_pending = max_pending
+        self._batches: dict[int, _ChannelBatch] = {}
+        self.queued = 0
+        self.deleted = 0
+        self.failed = 0
+        self.dropped = 0
+        self.requests = 0  # сколько раз уходили в delete_messages
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "requests": self.requests,
+            "pending": sum(len(b.messages) for b in self._batches.values()),
+        }
+
+    def submit(self, message: discord.Message) -> None:
+        """Ставит сообщение в очередь удаления его канала (без ожидания)."""
+        channel = message.channel
+        batch = self._batches.get(channel.id)
+        if batch is None:
+            batch = self._batches[channel.id] = _ChannelBatch(channel)
+
+        if message.id not in batch.messages:
+            if len(batch.messages) >= self.max_pending:
+                self.dropped += 1
+                return
+            batch.messages[message.id] = message
+            self.queued += 1
+
+        if batch.task is None or batch.task.done():
+            batch.task = asyncio.create_task(self._drain(batch))
+
+    async def _drain(self, batch: _ChannelBatch) -> None:
+        while batch.messages:
+            await asyncio.sleep(self.window)
+            await self._flush(batch)
+
+    async def _flush(self, batch: _ChannelBatch) -> None:
+        if not batch.messages:
+            return
+        messages = list(batch.messages.values())
+        batch.messages.clear()
+        self.requests += 1
+        try:
+            deleted, failed = await delete_messages(batch.channel, messages, reason="AutoMod")
+        except Exception as e:
+            deleted, failed = 0, len(messages)
+            print(f"❌ Ошибка удаления сообщений в канале {getattr(batch.channel, 'id', '?')}: {e}")
+        self.deleted += deleted
+        self.failed += failed
+
+    async def close(self) -> None:
+        """Удаляет всё накопленное и останавливает фоновые задачи."""
+        for batch in self._batches.values():
+            if batch.task is not None:
+                batch.task.cancel()
+            await self._flush(batch)
+        self._batches.clear()
@@ -0,0 +1,164 @@
+"""
+Общий кэш конфигов серверов для всех когов.
+
+Каждый ког регистрирует свой раздел — JSON-файл с дефолтами записи:
+
+    configs = get_config_service(bot)
+    section = configs.section("logging", "logging_config.json", LOGGING_DEFAULTS)
+    cfg = section.get(guild.id)                       # без копий и сборки дефолтов
+    section.set(guild.id, "log_channel", channel.id)  # запись + уведомление
+
+- файл читается один раз; недостающие ключи дополняются при загрузке,
+  поэтому get() — один поиск в dict
+- для сервера без записи get() отдаёт общий read-only словарь дефолтов;
+  изменять — через edit() + commit() или set()
+- раздел без дефолтов хранит «плоские» значения ({guild_id: channel_id})
+- запись отложенная (JsonStore); ConfigService.flush() пишет все файлы разом
+- subscribe(раздел, cb) — cb(key, field) после каждого изменения, в том числе
+  для разделов, которые хранит сам ког (notify(), например moderation)
+"""
+
+import copy
+import types
+import typing as t
+
+from utils.json_store import JsonStore
+
+Listener = t.Callable[[str, t.Optional[str]], None]
+
+
+def _frozen(value: t.Any) -> t.Any:
+    if isinstance(value, dict):
+        return types.MappingProxyType({k: _frozen(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+
+def _fill(entry: dict, defaults: dict) -> bool:
+    """Дописывает в запись недостающие ключи (рекурсивно). True — если что-то добавлено."""
+    changed = False
+    for key, value in defaults.items():
+        if key not in entry:
+            entry[key] = copy.deepcopy(value)
+            changed = True
+        elif isinstance(value, dict) and isinstance(entry[key], dict):
+            changed |= _fill(entry[key], value)
+    return changed
+
+
+class ConfigSection:
+    """Один JSON-файл {key: запись}; key — обычно id сервера (хранится строкой)."""
+
+    def __init__(self, service: "ConfigService", name: str, path: str, defaults: t.Optional[dict], *, indent: int):
+        self.service = service
+        self.name = name
+        self.defaults = defaults
+        self._store = JsonStore(path, {}, indent=indent)
+        self._default_view = _frozen(defaults) if defaults is not None else None
+
+        if defaults is not None:
+            changed = False
+            for key, entry in list(self.data.items()):
+                if not isinstance(entry, dict):
+                    self.data[key] = entry = {}
+                changed |= _fill(entry, defaults)
+            if changed:
+                self._store.mark_dirty()
+
+    @property
+    def data(self) -> dict:
+        """Весь документ раздела (тот же объект, что пишется на диск)."""
+        return self._store.data
+
+    def __contains__(self, key: t.Any) -> bool:
+        return str(key) in self.data
+
+    def keys(self) -> list[str]:
+        return list(self.data)
+
+    def get(self, key: t.Any) -> t.Any:
+        """Запись для чтения: сама запись, общие дефолты или None (плоский раздел)."""
+        entry = self.data.get(str(key))
+        if entry is None:
+            return self._default_view
+        return entry
+
+    def edit(self, key: t.Any) -> dict:
+        """Запись для изменения (создаётся из дефолтов). После правок — commit()."""
+        if self.defaults is None:
+            raise TypeError(f"раздел {self.name} хранит плоские значения — используйте put()")
+        skey = str(key)
+        entry = self.data.get(skey)
+        if entry is None:
+            entry = self.data[skey] = copy.deepcopy(self.defaults)
+            self._store.mark_dirty()
+        return entry
+
+    def set(self, key: t.Any, field: str, value: t.Any) -> None:
+        self.edit(key)[field] = value
+        self.commit(key, field)
+
+    def put(self, key: t.Any, value: t.Any) -> None:
+        """Значение целиком (для плоских разделов)."""
+        self.data[str(key)] = value
+        self.commit(key)
+
+    def remove(self, key: t.Any) -> bool:
+        if self.data.pop(str(key), None) is None:
+            return False
+        self.commit(key)
+        return True
+
+    def commit(self, key: t.Any, field: t.Optional[str] = None) -> None:
+        """Запланировать запись и оповестить подписчиков."""
+        self._store.mark_dirty()
+        self.service.notify(self.name, key, field)
+
+    async def flush(self) -> None:
+        await self._store.flush()
+
+
+class ConfigService:
+    def __init__(self):
+        self._sections: dict[str, ConfigSection] = {}
+        self._listeners: dict[str, list[Listener]] = {}
+
+    def section(self, name: str, path: str, defaults: t.Optional[dict] = None, *, indent: int = 2) -> ConfigSection:
+        """Раздел по имени; файл загружается при первой регистрации."""
+        section = self._sections.get(name)
+        if section is None:
+            section = self._sections[name] = ConfigSection(self, name, path, defaults, indent=indent)
+        return section
+
+    def subscribe(self, name: str, callback: Listener) -> None:
+        self._listeners.setdefault(name, []).append(callback)
+
+    def unsubscribe(self, name: str, callback: Listener) -> None:
+        listeners = self._listeners.get(name, [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    def notify(self, name: str, key: t.Any, field: t.Optional[str] = None) -> None:
+        for callback in list(self._listeners.get(name, ())):
+            try:
+                callback(str(key), field)
+            except Exception as e:
+                print(f"❌ Ошибка подписчика конфига {name}: {e}")
+
+    async def flush(self) -> None:
+        """Записывает все изменённые разделы."""
+        for section in self._sections.values():
+            await section.flush()
+
+    async def close(self) -> None:
+        await self.flush()
+
+
+def get_config_service(bot) -> ConfigService:
+    """Общий сервис конфигов бота (создаётся при первом обращении)."""
+    service = getattr(bot, "config_service", None)
+    if service is None:
+        service = ConfigService()
+        bot.config_service = service
+    return service
@@ -0,0 +1,158 @@
+"""
+Фоновая доставка личных сообщений (уведомления о варнах/мьютах).
+
+- send() только ставит DM в очередь — наказание не ждёт сеть;
+  deliver() — сразу и с таймаутом (перед киком/баном)
+- ограниченное число воркеров (не забиваем rate limit на DM)
+- дедупликация по явному key: уведомление с тем же key одному пользователю
+  не чаще раза в окно (без key — не дедуплицируем: одинаковый заголовок
+  ещё не значит одинаковое уведомление). Автомод и лестница наказаний передают key
+  "warn:<guild_id>" / "mute:<guild_id>"; ручные /warn, /mute и т.п. — без key
+- негативный кэш: пользователям с закрытыми ЛС не пишем до истечения TTL
+"""
+
+import asyncio
+import time
+import typing as t
+
+import discord
+
+
+class DMQueue:
+    def __init__(
+            self,
+            *,
+            workers: int = 3,
+            max_pending: int = 500,
+            dedup_window: float = 30.0,
+            closed_ttl: float = 6 * 3600,
+    ):
+        self.worker_count = workers
+        self.dedup_window = dedup_window
+        self.closed_ttl = closed_ttl
+        self._queue: t.Optional[asyncio.Queue] = None
+        self._max_pending = max_pending
+        self._workers: list[asyncio.Task] = []
+        self._recent: dict[tuple[int, str], float] = {}
+        self._closed: dict[int, float] = {}  # user_id -> до какого момента не пытаться
+        self.sent = 0
+        self.failed = 0
+        self.deduplicated = 0
+        self.skipped_closed = 0
+        self.dropped = 0
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "deduplicated": self.deduplicated,
+            "skipped_closed": self.skipped_closed,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "closed_dms": len(self._closed),
+        }
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def _prune(self, now: float) -> None:
+        if len(self._recent) > 1000:
+            self._recent = {k: ts for k, ts in self._recent.items() if now - ts < self.dedup_window}
+        if len(self._closed) > 1000:
+            self._closed = {uid: until for uid, until in self._closed.items() if until > now}
+
+    def send(
+            self,
+            user: discord.abc.User,
+            content: t.Optional[str] = None,
+            *,
+            embed: t.Optional[discord.Embed] = None,
+            key: t.Optional[str] = None,
+    ) -> bool:
+        """Ставит DM в очередь. False — если пропущено (дубль, закрытые ЛС, переполнение)."""
+        now = time.monotonic()
+        self._prune(now)
+
+        if self._closed.get(user.id, 0.0) > now:
+            self.skipped_closed += 1
+            return False
+
+        dedup_key = (user.id, key) if key is not None else None
+        if dedup_key is not None:
+            last = self._recent.get(dedup_key)
+            if last is not None and now - last < self.dedup_window:
+                self.deduplicated += 1
+                return False
+
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((user, content, embed))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        if dedup_key is not None:
+            self._recent[dedup_key] = now
+        return True
+
+    async def _deliver(
+            self,
+            user: discord.abc.User,
+            content: t.Optional[str],
+            embed: t.Optional[discord.Embed],
+    ) -> bool:
+        try:
+            await user.send(content=content, embed=embed)
+            self.sent += 1
+            return True
+        except discord.Forbidden:
+            # ЛС закрыты / бот заблокирован — не пытаемся какое-то время
+            self._closed[user.id] = time.monotonic() + self.closed_ttl
+        except discord.HTTPException:
+            pass
+        except Exception as e:
+            print(f"❌ Ошибка отправки ЛС пользователю {user.id}: {e}")
+        self.failed += 1
+        return False
+
+    async def deliver(
+            self,
+            user: discord.abc.User,
+            content: t.Optional[str] = None,
+            *,
+            embed: t.Optional[discord.Embed] = None,
+            timeout: float = 3.0,
+    ) -> bool:
+        """
+        Отправляет DM сразу, не дольше timeout секунд (в обход очереди).
+        Для уведомлений, которые должны дойти до кика/бана — после него общего сервера уже нет.
+        """
+        if self._closed.get(user.id, 0.0) > time.monotonic():
+            self.skipped_closed += 1
+            return False
+        try:
+            return await asyncio.wait_for(self._deliver(user, content, embed), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.failed += 1
+            return False
+
+    async def _worker(self) -> None:
+        while True:
+            user, content, embed = await self._queue.get()
+            try:
+                await self._deliver(user, content, embed)
+            finally:
+                self._queue.task_done()
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Даёт очереди дослать сообщения (не дольше timeout) и останавливает воркеров."""
+        if self._queue is not None and self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
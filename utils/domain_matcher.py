@@ -0,0 +1,111 @@
+"""
+Скомпилированный матчер доменов для фильтра ссылок.
+
+- проверка хоста: хэш-сеты суффиксов (`a.b.c` → `a.b.c`, `b.c`, `c`),
+  вместо перебора всех доменов с `endswith`
+- поиск «голых» доменов: один автомат Ахо-Корасик на весь блок-лист,
+  вместо `d in text` для каждого домена
+"""
+
+import typing as t
+
+
+class _AhoCorasick:
+    """Минимальный автомат Ахо-Корасик: находит все вхождения шаблонов за один проход."""
+
+    __slots__ = ("_goto", "_fail", "_out")
+
+    def __init__(self, patterns: t.Iterable[str]):
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[str, ...]] = [()]
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                node = nxt
+            out[node] = out[node] + (pattern,)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                cand = goto[f].get(ch, 0)
+                fail[nxt] = cand if cand != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def findall(self, text: str) -> set[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: set[str] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class DomainMatcher:
+    """Неизменяемый матчер для одного сервера; пересобирается при изменении списков."""
+
+    __slots__ = ("allowed", "blocked", "_scanner", "_dotted")
+
+    def __init__(self, allowed: t.Iterable[str], blocked: t.Iterable[str]):
+        self.allowed = frozenset(allowed)
+        self.blocked = frozenset(blocked)
+        self._scanner = _AhoCorasick(self.blocked) if self.blocked else None
+        # если у всех доменов есть точка — текст без точки можно не сканировать
+        self._dotted = all("." in d for d in self.blocked)
+
+    @staticmethod
+    def _suffixes(domain: str) -> t.Iterator[str]:
+        yield domain
+        idx = domain.find(".")
+        while idx != -1:
+            yield domain[idx + 1:]
+            idx = domain.find(".", idx + 1)
+
+    def _matches(self, domain: str, suffixes: frozenset[str]) -> bool:
+        return any(s in suffixes for s in self._suffixes(domain))
+
+    def is_blocked(self, domain: str) -> bool:
+        return self._matches(domain, self.blocked)
+
+    def is_allowed(self, domain: str) -> bool:
+        return self._matches(domain, self.allowed)
+
+    def scan_bare(self, low_text: str) -> set[str]:
+        """Заблокированные домены, встречающиеся в тексте (текст уже в нижнем регистре)."""
+        if self._scanner is None or (self._dotted and "." not in low_text):
+            return set()
+        return self._scanner.findall(low_text)
+
+    def filter(self, domains: t.Iterable[str]) -> list[str]:
+        """Отсортированный список запрещённых/неразрешённых доменов."""
+        bad: set[str] = set()
+        for domain in domains:
+            if self.is_blocked(domain):
+                bad.add(domain)
+            elif self.allowed and not self.is_allowed(domain):
+                bad.add(domain)
+        return sorted(bad)
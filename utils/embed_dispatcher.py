@@ -0,0 +1,203 @@
+"""
+Пакетная отправка эмбедов в лог-каналы.
+
+Вместо channel.send на каждое событие эмбеды копятся в очереди канала
+и раз в `window` секунд уходят пачками (до 10 эмбедов / 6000 символов
+на сообщение — лимиты Discord). submit() никогда не ждёт сеть,
+поэтому логирование не тормозит сами действия модерации.
+
+У каждого эмбеда есть приоритет (PRIORITY_LOW / NORMAL / HIGH):
+- очередь канала ограничена max_backlog; при переполнении выбрасывается
+  самый старый эмбед с наименьшим приоритетом (или новый, если он ниже всех)
+- если очередь разрослась больше summary_threshold, эмбеды ниже HIGH
+  сворачиваются в одну сводку, HIGH уходят подробно
+- 429 после ретраев discord.py не теряет пачку: она возвращается в начало
+  очереди, канал ждёт retry_after
+- 400 на пачку (один эмбед нарушает лимиты) — эмбеды пачки уходят по одному,
+  теряется только сломанный
+"""
+
+import asyncio
+import collections
+import datetime
+import typing as t
+
+import discord
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+MAX_SEND_RETRIES = 3  # попыток на пачку при 429 во время close()
+
+
+class _ChannelQueue:
+    __slots__ = ("channel", "items", "task", "retry_after")
+
+    def __init__(self, channel: discord.abc.Messageable):
+        self.channel = channel
+        self.items: collections.deque[tuple[int, discord.Embed]] = collections.deque()
+        self.task: t.Optional[asyncio.Task] = None
+        self.retry_after = 0.0  # пауза перед следующей отправкой (429)
+
+
+class EmbedDispatcher:
+    def __init__(
+            self,
+            *,
+            window: float = 1.5,
+            max_backlog: int = 200,
+            summary_threshold: int = 30,
+    ):
+        self.window = window
+        self.max_backlog = max_backlog
+        self.summary_threshold = summary_threshold
+        self._queues: dict[int, _ChannelQueue] = {}
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.summarized = 0
+        self.rate_limited = 0
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "summarized": self.summarized,
+            "rate_limited": self.rate_limited,
+            "backlog": sum(len(q.items) for q in self._queues.values()),
+        }
+
+    def submit(self, channel: discord.abc.Messageable, embed: discord.Embed, priority: int = PRIORITY_NORMAL) -> None:
+        """Ставит эмбед в очередь канала (без ожидания)."""
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = _ChannelQueue(channel)
+        queue.channel = channel
+
+        if len(queue.items) >= self.max_backlog and not self._evict(queue, priority):
+            self.dropped += 1
+            return
+        queue.items.append((priority, embed))
+        self.queued += 1
+
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._drain(queue))
+
+    def _evict(self, queue: _ChannelQueue, priority: int) -> bool:
+        """Освобождает место под эмбед с приоритетом priority. False — если он сам ниже всех."""
+        items = queue.items
+        lowest = min(p for p, _ in items)
+        if lowest > priority:
+            return False
+        for i, (p, _) in enumerate(items):
+            if p == lowest:
+                del items[i]
+                self.dropped += 1
+                return True
+        return False
+
+    async def _drain(self, queue: _ChannelQueue) -> None:
+        while queue.items:
+            await asyncio.sleep(max(self.window, queue.retry_after))
+            queue.retry_after = 0.0
+            await self._flush(queue)
+
+    async def _flush(self, queue: _ChannelQueue, *, final: bool = False) -> None:
+        items = queue.items
+        if len(items) > self.summary_threshold:
+            detailed = [(p, e) for p, e in items if p >= PRIORITY_HIGH]
+            folded = [e for p, e in items if p < PRIORITY_HIGH]
+            items.clear()
+            items.extend(detailed)
+            if folded:
+                items.appendleft((PRIORITY_HIGH, self._summary(folded)))
+                self.summarized += len(folded)
+
+        attempts = 0
+        while items:
+            # пачку снимаем с очереди до отправки: _evict() из submit() не должен
+            # выбросить эмбед, который уже в полёте
+            taken: list[tuple[int, discord.Embed]] = []
+            size = 0
+            while items and len(taken) < MAX_EMBEDS_PER_MESSAGE:
+                embed_size = len(items[0][1])
+                if taken and size + embed_size > MAX_EMBED_CHARS_PER_MESSAGE:
+                    break
+                taken.append(items.popleft())
+                size += embed_size
+            batch = [embed for _, embed in taken]
+
+            try:
+                result = await self._send(queue.channel, batch)
+            except asyncio.CancelledError:
+                # close() отменил фоновую отправку — пачку дошлёт его _flush
+                items.extendleft(reversed(taken))
+                raise
+            attempts += 1
+            if result is not None and final and attempts >= MAX_SEND_RETRIES:
+                self.dropped += len(batch)
+                result = None
+            if result is None:
+                attempts = 0
+                continue
+            # rate limit: пачка возвращается в начало очереди
+            items.extendleft(reversed(taken))
+            queue.retry_after = result
+            if not final:
+                return
+            await asyncio.sleep(result)
+
+    async def _send(self, channel: discord.abc.Messageable, embeds: list[discord.Embed]) -> t.Optional[float]:
+        """None — пачка обработана (отправлена или потеряна); число — подождать столько секунд."""
+        try:
+            # 429 и ожидание bucket'а обрабатывает HTTP-клиент discord.py
+            await channel.send(embeds=embeds)
+            self.sent += len(embeds)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.rate_limited += 1
+                return float(getattr(e, "retry_after", None) or self.window * 2)
+            if e.status == 400 and len(embeds) > 1:
+                # Discord отклонил пачку из-за одного эмбеда — остальные шлём по одному
+                await self._send_each(channel, embeds)
+                return None
+            self.dropped += len(embeds)
+            print(f"❌ Не удалось отправить логи в канал {getattr(channel, 'id', '?')}: {e}")
+        return None
+
+    async def _send_each(self, channel: discord.abc.Messageable, embeds: list[discord.Embed]) -> None:
+        for embed in embeds:
+            retry_after = await self._send(channel, [embed])
+            if retry_after is not None:
+                await asyncio.sleep(retry_after)
+                if await self._send(channel, [embed]) is not None:
+                    self.dropped += 1
+
+    @staticmethod
+    def _summary(batch: list[discord.Embed]) -> discord.Embed:
+        counts = collections.Counter(embed.title or "Без названия" for embed in batch)
+        lines = [f"• {title} — **{count}**" for title, count in counts.most_common(20)]
+        if len(counts) > 20:
+            lines.append(f"• … и ещё {len(counts) - 20} типов")
+        return discord.Embed(
+            title=f"📦 Сводка логов: {len(batch)} событий",
+            description="\n".join(lines),
+            color=discord.Color.dark_orange(),
+            timestamp=datetime.datetime.now(datetime.timezone.utc),
+        )
+
+    async def close(self) -> None:
+        """Отправляет всё накопленное и останавливает фоновые задачи."""
+        for queue in self._queues.values():
+            if queue.task is not None and not queue.task.done():
+                queue.task.cancel()
+                # ждём отмену: прерванная пачка должна вернуться в очередь
+                await asyncio.gather(queue.task, return_exceptions=True)
+            if queue.items:
+                await self._flush(queue, final=True)
+        self._queues.clear()
@@ -0,0 +1,81 @@
+"""
+Планировщик истечения сроков (мин-куча по времени).
+
+Используется для временных мьютов: вместо опроса всех записей раз в N секунд
+смотритель спит ровно до ближайшего срока и просыпается раньше,
+если появился более ранний.
+"""
+
+import asyncio
+import heapq
+import time
+import typing as t
+
+Key = t.Tuple[int, int]  # (guild_id, user_id)
+
+
+class ExpiryScheduler:
+    """Куча (ts, guild_id, user_id) с ленивым удалением отменённых/перезаписанных записей."""
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, int]] = []
+        self._entries: dict[Key, float] = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._entries
+
+    def get(self, key: Key) -> t.Optional[float]:
+        return self._entries.get(key)
+
+    def schedule(self, guild_id: int, user_id: int, ts: float) -> None:
+        """Добавляет/переносит срок; будит ожидающего, если срок стал ближайшим."""
+        key = (guild_id, user_id)
+        current_next = self.next_due()
+        self._entries[key] = ts
+        heapq.heappush(self._heap, (ts, guild_id, user_id))
+        if current_next is None or ts < current_next:
+            self._wakeup.set()
+
+    def cancel(self, guild_id: int, user_id: int) -> None:
+        # запись в куче останется и будет отброшена при извлечении
+        self._entries.pop((guild_id, user_id), None)
+
+    def next_due(self) -> t.Optional[float]:
+        heap = self._heap
+        while heap:
+            ts, gid, uid = heap[0]
+            if self._entries.get((gid, uid)) == ts:
+                return ts
+            heapq.heappop(heap)
+        return None
+
+    def pop_due(self, now: float) -> list[Key]:
+        """Извлекает все записи со сроком <= now."""
+        due: list[Key] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            ts, gid, uid = heapq.heappop(heap)
+            key = (gid, uid)
+            if self._entries.get(key) == ts:
+                del self._entries[key]
+                due.append(key)
+        return due
+
+    async def wait(self) -> None:
+        """Спит до ближайшего срока (или до появления более раннего)."""
+        self._wakeup.clear()
+        next_ts = self.next_due()
+        if next_ts is None:
+            await self._wakeup.wait()
+            return
+        delay = next_ts - time.time()
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,235 @@
+"""
+Отпечатки сообщений для поиска копипасты.
+
+- normalize(): регистр, пунктуация, повторяющиеся пробелы не важны
+- simhash(): 64-битный SimHash по символьным 4-граммам — похожие тексты
+  отличаются в нескольких битах (только в пределах процесса)
+- DuplicateDetector: индекс отпечатков на сервер (точный словарь +
+  LSH по 8 полосам, поиск за O(1)) с ограниченным LRU. Срабатывает, если один
+  и тот же текст за короткое время прислали N разных пользователей, или
+  один пользователь повторяет его много раз за длинное окно. Пока на сервере
+  мало пишущих и автор пишет мало, SimHash для новых текстов не считается.
+"""
+
+import collections
+import re
+import typing as t
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+BANDS = 8  # 8 полос по 8 бит: тексты с расстоянием <= 7 гарантированно делят полосу
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+SHINGLE = 4
+MAX_CHARS = 256  # дальше текст для отпечатка не смотрим
+MASK64 = (1 << 64) - 1
+MAX_CANDIDATES = 32  # сколько кандидатов из LSH-полос проверять на одно сообщение
+HITS_PER_CLUSTER = 64  # хватает для порогов и ограничивает стоимость проверки
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def simhash(normalized: str) -> int:
+    """
+    SimHash нормализованного текста.
+
+    Хэши признаков — встроенный hash() (рандомизирован между запусками,
+    поэтому отпечатки живут только в памяти процесса). Голоса по 64 битам
+    считаются «вертикальным» двоичным счётчиком: несколько операций над
+    int на признак вместо 64 итераций Python.
+    """
+    normalized = normalized[:MAX_CHARS]
+    if len(normalized) <= SHINGLE:
+        features = {normalized}
+    else:
+        features = {normalized[i:i + SHINGLE] for i in range(len(normalized) - SHINGLE + 1)}
+
+    planes: list[int] = []  # planes[k] — k-й разряд счётчика единиц для каждого из 64 бит
+    for feature in features:
+        carry = hash(feature) & MASK64
+        for k, plane in enumerate(planes):
+            planes[k] = plane ^ carry
+            carry &= plane
+            if not carry:
+                break
+        else:
+            if carry:
+                planes.append(carry)
+
+    # бит результата = 1, если единиц больше половины: счётчик > len(features) // 2
+    half = len(features) // 2
+    greater = 0
+    equal = MASK64
+    for k in range(max(len(planes), half.bit_length()) - 1, -1, -1):
+        plane = planes[k] if k < len(planes) else 0
+        if half >> k & 1:
+            equal &= plane
+        else:
+            greater |= equal & plane
+            equal &= ~plane & MASK64
+    return greater
+
+
+def fingerprint(text: str) -> t.Optional[int]:
+    """SimHash сообщения или None, если после нормализации текста нет."""
+    normalized = normalize(text)
+    return simhash(normalized) if normalized else None
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class _Cluster:
+    __slots__ = ("cid", "fp", "hits")
+
+    def __init__(self, cid: int, fp: t.Optional[int]):
+        self.cid = cid
+        self.fp = fp  # None — отпечаток не считали (см. DuplicateDetector.check)
+        self.hits: collections.deque[tuple[float, int]] = collections.deque(maxlen=HITS_PER_CLUSTER)
+
+
+class _GuildIndex:
+    __slots__ = ("clusters", "bands", "exact", "next_cid", "recent", "recent_users", "own", "own_counts")
+
+    def __init__(self):
+        self.clusters: collections.OrderedDict[int, _Cluster] = collections.OrderedDict()
+        self.bands: dict[tuple[int, int], set[int]] = {}
+        self.exact: dict[str, int] = {}
+        self.next_cid = 0
+        # кто писал длинные сообщения: за window (разные авторы) и за repeat_window (по автору)
+        self.recent: collections.deque[tuple[float, int]] = collections.deque()
+        self.recent_users: collections.Counter[int] = collections.Counter()
+        self.own: collections.deque[tuple[float, int]] = collections.deque()
+        self.own_counts: collections.Counter[int] = collections.Counter()
+
+
+def _track(events: collections.deque, counts: collections.Counter, user_id: int, now: float, window: float) -> None:
+    events.append((now, user_id))
+    counts[user_id] += 1
+    horizon = now - window
+    while events[0][0] < horizon:
+        _, uid = events.popleft()
+        counts[uid] -= 1
+        if not counts[uid]:
+            del counts[uid]
+
+
+class DuplicateDetector:
+    def __init__(
+            self,
+            *,
+            min_users: int = 4,
+            window: float = 60.0,
+            repeat_count: int = 4,
+            repeat_window: float = 600.0,
+            max_distance: int = 7,
+            max_clusters: int = 2000,
+            min_length: int = 32,
+    ):
+        self.min_users = min_users
+        self.window = window
+        self.repeat_count = repeat_count
+        self.repeat_window = repeat_window
+        self.max_distance = max_distance
+        self.max_clusters = max_clusters
+        self.min_length = min_length
+        self._guilds: dict[int, _GuildIndex] = {}
+        self.hashed = 0
+        self.skipped = 0  # новые тексты, для которых SimHash не понадобился
+
+    @staticmethod
+    def _band_keys(fp: int) -> t.Iterator[tuple[int, int]]:
+        for band in range(BANDS):
+            yield band, fp >> (band * BAND_BITS) & BAND_MASK
+
+    def _find_near(self, index: _GuildIndex, fp: int) -> t.Optional[_Cluster]:
+        checked = 0
+        for key in self._band_keys(fp):
+            for cid in index.bands.get(key, ()):
+                cluster = index.clusters.get(cid)
+                if cluster is not None and hamming(cluster.fp, fp) <= self.max_distance:
+                    return cluster
+                checked += 1
+                if checked >= MAX_CANDIDATES:
+                    return None
+        return None
+
+    def _add(self, index: _GuildIndex, normalized: str, fp: t.Optional[int]) -> _Cluster:
+        cid = index.next_cid
+        index.next_cid += 1
+        cluster = index.clusters[cid] = _Cluster(cid, fp)
+        if fp is not None:
+            for key in self._band_keys(fp):
+                index.bands.setdefault(key, set()).add(cid)
+        index.exact[normalized] = cid
+
+        while len(index.clusters) > self.max_clusters:
+            _, old = index.clusters.popitem(last=False)
+            if old.fp is None:
+                continue
+            for key in self._band_keys(old.fp):
+                bucket = index.bands.get(key)
+                if bucket is not None:
+                    bucket.discard(old.cid)
+                    if not bucket:
+                        del index.bands[key]
+        if len(index.exact) > self.max_clusters * 2:
+            index.exact = {n: cid for n, cid in index.exact.items() if cid in index.clusters}
+        return cluster
+
+    def check(self, guild_id: int, user_id: int, text: str, now: float) -> t.Optional[str]:
+        """
+        Учитывает сообщение и возвращает:
+        "raid"   — тот же текст от min_users разных пользователей за window сек
+        "repeat" — тот же текст от этого пользователя repeat_count раз за repeat_window сек
+        None     — всё в порядке
+        """
+        # нормализация только укорачивает текст (кроме редких casefold) — отсекаем сразу
+        if len(text) < self.min_length:
+            return None
+        normalized = normalize(text)
+        if len(normalized) < self.min_length:
+            return None
+
+        index = self._guilds.get(guild_id)
+        if index is None:
+            index = self._guilds[guild_id] = _GuildIndex()
+        _track(index.recent, index.recent_users, user_id, now, self.window)
+        _track(index.own, index.own_counts, user_id, now, self.repeat_window)
+
+        # точный повтор — один поиск в словаре, SimHash не считаем
+        cid = index.exact.get(normalized)
+        cluster = index.clusters.get(cid) if cid is not None else None
+        if cluster is None:
+            if len(index.recent_users) < self.min_users and index.own_counts[user_id] < self.repeat_count:
+                # ни рейда, ни повтора сейчас быть не может: мало авторов и этот пишет мало —
+                # запоминаем только точный текст, без поиска похожих
+                self.skipped += 1
+                cluster = self._add(index, normalized, None)
+            else:
+                self.hashed += 1
+                fp = simhash(normalized)
+                cluster = self._find_near(index, fp)
+                if cluster is None:
+                    cluster = self._add(index, normalized, fp)
+                else:
+                    index.exact[normalized] = cluster.cid
+        index.clusters.move_to_end(cluster.cid)
+
+        hits = cluster.hits
+        hits.append((now, user_id))
+        horizon = now - max(self.window, self.repeat_window)
+        while hits and hits[0][0] < horizon:
+            hits.popleft()
+
+        recent_users = {uid for ts, uid in hits if now - ts <= self.window}
+        if len(recent_users) >= self.min_users:
+            return "raid"
+
+        own = sum(1 for ts, uid in hits if uid == user_id and now - ts <= self.repeat_window)
+        if own >= self.repeat_count:
+            return "repeat"
+        return None
@@ -0,0 +1,86 @@
+"""
+Компактный трекер флуда.
+
+Для каждого (guild_id, user_id) хранится кольцевой буфер из `threshold`
+последних отметок времени — больше для проверки «threshold сообщений за window
+секунд» не нужно. Пользователи, молчащие дольше окна, периодически вычищаются,
+поэтому память не растёт с числом когда-либо писавших участников.
+"""
+
+import typing as t
+
+Key = t.Tuple[int, int]  # (guild_id, user_id)
+
+
+class _Slot:
+    __slots__ = ("stamps", "pos", "last_seen", "last_flood")
+
+    def __init__(self, size: int):
+        self.stamps = [float("-inf")] * size
+        self.pos = 0
+        self.last_seen = 0.0
+        self.last_flood = float("-inf")
+
+
+class FloodTracker:
+    def __init__(self, window: float, threshold: int, sweep_interval: t.Optional[float] = None):
+        self.window = window
+        self.threshold = max(1, threshold)
+        self.sweep_interval = sweep_interval if sweep_interval is not None else window * 6
+        self._slots: dict[Key, _Slot] = {}
+        self._last_sweep = 0.0
+        self.evictions = 0
+        self.sweeps = 0
+
+    @property
+    def tracked(self) -> int:
+        return len(self._slots)
+
+    def stats(self) -> dict:
+        return {"tracked": self.tracked, "evictions": self.evictions, "sweeps": self.sweeps}
+
+    def hit(self, guild_id: int, user_id: int, now: float, count: int = 1) -> bool:
+        """
+        Регистрирует count событий (сообщений, упоминаний, вложений);
+        True, если за окно набралось threshold событий.
+        """
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+        key = (guild_id, user_id)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _Slot(self.threshold)
+
+        stamps = slot.stamps
+        size = len(stamps)
+        # больше size отметок записывать бессмысленно — буфер всё равно заполнится
+        for _ in range(min(count, size)):
+            stamps[slot.pos] = now
+            slot.pos = (slot.pos + 1) % size
+        slot.last_seen = now
+        # после записи stamps[pos] — самая старая из threshold последних отметок
+        return now - stamps[slot.pos] <= self.window
+
+    def last_flood(self, guild_id: int, user_id: int) -> float:
+        slot = self._slots.get((guild_id, user_id))
+        return slot.last_flood if slot is not None else float("-inf")
+
+    def mark_flood(self, guild_id: int, user_id: int, now: float) -> None:
+        slot = self._slots.get((guild_id, user_id))
+        if slot is not None:
+            slot.last_flood = now
+
+    def sweep(self, now: float) -> int:
+        """Удаляет пользователей, неактивных дольше окна. Возвращает число удалённых."""
+        self._last_sweep = now
+        self.sweeps += 1
+        cutoff = now - self.window
+        stale = [
+            key for key, slot in self._slots.items()
+            if slot.last_seen < cutoff and slot.last_flood < cutoff
+        ]
+        for key in stale:
+            del self._slots[key]
+        self.evictions += len(stale)
+        return len(stale)
@@ -0,0 +1,197 @@
+"""
+Детектор рейдов по входам участников и режим локдауна.
+
+Один объект на бота (get_join_guard(bot)), общий для когов, которые
+обрабатывают on_member_join (Moder, AutoRole, Logging). Каждый ког вызывает
+observe(member) — повторные вызовы для того же входа не считаются дважды,
+поэтому порядок слушателей не важен (перезаход — новый вход: другой joined_at).
+
+Если за `window` секунд зашло `threshold` участников, сервер переходит
+в локдаун: приветствия и лог-эмбеды заменяются периодической сводкой,
+авто-роли выдаются из очереди. Локдаун снимается сам, если `calm_period`
+секунд вход не превышал порог (ручной локдаун снимается только вручную).
+"""
+
+import collections
+import time
+import typing as t
+
+import discord
+
+DEFAULT_WINDOW = 60
+DEFAULT_THRESHOLD = 30
+DEFAULT_CALM_PERIOD = 300
+
+# границы гистограммы возраста аккаунтов (в днях)
+AGE_BUCKETS = ((1, "< 1 дня"), (7, "< 7 дней"), (30, "< 30 дней"), (365, "< 1 года"))
+AGE_BUCKET_OLD = "≥ 1 года"
+
+
+def age_bucket(days: float) -> str:
+    for limit, label in AGE_BUCKETS:
+        if days < limit:
+            return label
+    return AGE_BUCKET_OLD
+
+
+class JoinSummary(t.NamedTuple):
+    joins: int
+    ages: collections.Counter
+    new_accounts: int
+
+
+class _GuildJoins:
+    __slots__ = (
+        "window", "threshold", "joins", "locked_at", "manual",
+        "last_trip", "summary_joins", "summary_ages", "summary_new",
+    )
+
+    def __init__(self, window: float, threshold: int):
+        self.window = window
+        self.threshold = threshold
+        self.joins: collections.deque[float] = collections.deque()
+        self.locked_at: t.Optional[float] = None
+        self.manual = False
+        self.last_trip = 0.0
+        self.summary_joins = 0
+        self.summary_ages: collections.Counter = collections.Counter()
+        self.summary_new = 0
+
+
+class JoinGuard:
+    def __init__(self, *, calm_period: float = DEFAULT_CALM_PERIOD, new_account_days: int = 7):
+        self.calm_period = calm_period
+        self.new_account_days = new_account_days
+        self._guilds: dict[int, _GuildJoins] = {}
+        # (guild_id, member_id, joined_at) -> решение; joined_at отличает повторный вход того же участника
+        self._observed: collections.OrderedDict[tuple, bool] = collections.OrderedDict()
+        self._listeners: list[t.Callable[[int, bool], None]] = []
+
+    # ----- настройка -----
+
+    def _state(self, guild_id: int) -> _GuildJoins:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildJoins(DEFAULT_WINDOW, DEFAULT_THRESHOLD)
+        return state
+
+    def configure(self, guild_id: int, *, window: t.Optional[float] = None, threshold: t.Optional[int] = None):
+        state = self._state(guild_id)
+        if window is not None:
+            state.window = window
+        if threshold is not None:
+            state.threshold = threshold
+
+    def settings(self, guild_id: int) -> tuple[float, int]:
+        state = self._state(guild_id)
+        return state.window, state.threshold
+
+    def add_listener(self, callback: t.Callable[[int, bool], None]) -> None:
+        """callback(guild_id, locked) вызывается при входе в локдаун и выходе из него."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: t.Callable[[int, bool], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, guild_id: int, locked: bool) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(guild_id, locked)
+            except Exception as e:
+                print(f"❌ Ошибка обработчика локдауна: {e}")
+
+    # ----- учёт входов -----
+
+    def observe(self, member: discord.Member) -> bool:
+        """Учитывает вход (один раз на вход) и возвращает, включён ли локдаун."""
+        key = (member.guild.id, member.id, member.joined_at)
+        cached = self._observed.get(key)
+        if cached is not None:
+            return cached
+
+        now = time.time()
+        state = self._state(member.guild.id)
+        joins = state.joins
+        joins.append(now)
+        while joins and now - joins[0] > state.window:
+            joins.popleft()
+
+        if len(joins) >= state.threshold:
+            state.last_trip = now
+            if state.locked_at is None:
+                state.locked_at = now
+                self._notify(member.guild.id, True)
+
+        locked = state.locked_at is not None
+        if locked:
+            days = (discord.utils.utcnow() - member.created_at).total_seconds() / 86400
+            state.summary_joins += 1
+            state.summary_ages[age_bucket(days)] += 1
+            if days < self.new_account_days:
+                state.summary_new += 1
+
+        self._observed[key] = locked
+        if len(self._observed) > 5000:
+            self._observed.popitem(last=False)
+        return locked
+
+    def is_locked(self, guild_id: int) -> bool:
+        state = self._guilds.get(guild_id)
+        return state is not None and state.locked_at is not None
+
+    def locked_guilds(self) -> list[int]:
+        return [gid for gid, state in self._guilds.items() if state.locked_at is not None]
+
+    def is_new_account(self, member: discord.Member) -> bool:
+        days = (discord.utils.utcnow() - member.created_at).total_seconds() / 86400
+        return days < self.new_account_days
+
+    def set_lockdown(self, guild_id: int, locked: bool) -> None:
+        """Ручное включение/выключение локдауна."""
+        state = self._state(guild_id)
+        was_locked = state.locked_at is not None
+        if locked:
+            state.manual = True
+            if not was_locked:
+                state.locked_at = time.time()
+                self._notify(guild_id, True)
+        else:
+            state.manual = False
+            if was_locked:
+                state.locked_at = None
+                state.joins.clear()
+                self._notify(guild_id, False)
+
+    def release_calm(self, now: t.Optional[float] = None) -> list[int]:
+        """Снимает автоматический локдаун там, где вход давно ниже порога."""
+        now = time.time() if now is None else now
+        released = []
+        for gid, state in self._guilds.items():
+            if state.locked_at is None or state.manual:
+                continue
+            if now - state.last_trip >= self.calm_period:
+                state.locked_at = None
+                released.append(gid)
+                self._notify(gid, False)
+        return released
+
+    def take_summary(self, guild_id: int) -> t.Optional[JoinSummary]:
+        """Сводка входов с прошлого вызова (None, если входов не было)."""
+        state = self._guilds.get(guild_id)
+        if state is None or not state.summary_joins:
+            return None
+        summary = JoinSummary(state.summary_joins, state.summary_ages, state.summary_new)
+        state.summary_joins = 0
+        state.summary_ages = collections.Counter()
+        state.summary_new = 0
+        return summary
+
+
+def get_join_guard(bot) -> JoinGuard:
+    """Общий JoinGuard бота (создаётся при первом обращении)."""
+    guard = getattr(bot, "join_guard", None)
+    if guard is None:
+        guard = JoinGuard()
+        bot.join_guard = guard
+    return guard
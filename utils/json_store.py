@@ -0,0 +1,118 @@
+"""
+Отложенная (write-behind) запись JSON-файлов.
+
+Изменения только помечают данные «грязными»; запись выполняется
+через FLUSH_DELAY секунд в отдельном потоке, атомарно (tmp-файл + rename).
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import typing as t
+
+FLUSH_DELAY = 2.0  # сек. между изменением и записью на диск
+
+
+def load_json(path: str, default: t.Any = None) -> t.Any:
+    """Читает JSON-файл; при отсутствии/порче возвращает default."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def atomic_write(path: str, text: str) -> None:
+    """Пишет во временный файл рядом с целевым и подменяет его через os.replace."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _pretty(snapshot: str, indent: int) -> str:
+    # переформатирование делаем в потоке, в цикле событий — только быстрый C-dump
+    return json.dumps(json.loads(snapshot), ensure_ascii=False, indent=indent)
+
+
+class JsonStore:
+    """
+    JSON-документ в памяти с отложенной записью.
+
+    store.data      — сам документ (изменяется на месте)
+    store.mark_dirty() — запланировать запись
+    await store.flush() — записать немедленно (например, в cog_unload)
+    """
+
+    def __init__(self, path: str, default: t.Any = None, *, indent: int = 4, delay: float = FLUSH_DELAY):
+        self.path = path
+        self.indent = indent
+        self.delay = delay
+        data = load_json(path, None)
+        if default is not None and not isinstance(data, type(default)):
+            data = default
+        self.data = data
+        self._dirty = False
+        self._flush_handle: t.Optional[asyncio.TimerHandle] = None
+        self._flush_task: t.Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self) -> None:
+        """Помечает документ изменённым и (один раз) планирует запись."""
+        self._dirty = True
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # нет цикла событий (скрипты/миграции) — пишем сразу
+            self.flush_sync()
+            return
+        self._flush_handle = loop.call_later(self.delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> None:
+        """Асинхронно записывает документ, если он изменён."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        async with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self.data, ensure_ascii=False)
+            self._dirty = False
+            try:
+                text = await asyncio.to_thread(_pretty, snapshot, self.indent)
+                await asyncio.to_thread(atomic_write, self.path, text)
+            except Exception as e:
+                print(f"❌ Не удалось сохранить {self.path}: {e}")
+                # повторная попытка через delay, даже если новых изменений не будет
+                self.mark_dirty()
+
+    def flush_sync(self) -> None:
+        """Синхронная запись (когда цикла событий уже/ещё нет)."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        atomic_write(self.path, json.dumps(self.data, ensure_ascii=False, indent=self.indent))
+        self._dirty = False
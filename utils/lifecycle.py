@@ -0,0 +1,26 @@
+"""
+Сброс отложенного состояния бота перед выходом или перезапуском.
+
+Конфиги когов, хранилище модерации, шина логов и кэш сообщений пишут
+с задержкой. MyBot.close() и /restart (os.execv не вызывает cog_unload)
+сбрасывают их одной функцией:
+
+    await flush_state(bot)
+"""
+
+from utils.config_service import get_config_service
+from utils.log_bus import get_log_bus
+from utils.message_cache import get_message_cache
+
+
+async def flush_state(bot) -> None:
+    """Дописывает на диск и в каналы всё, что ещё лежит в очередях."""
+    moder = bot.get_cog("Moder")
+    if moder is not None:
+        await moder.flush_storage()
+    # накопленные логи (utils/log_bus.py) уходят до закрытия соединения
+    await get_log_bus(bot).close()
+    # файл выгрузки кэша сообщений после перезапуска не нужен
+    await get_message_cache(bot).close()
+    # несохранённые конфиги когов (utils/config_service.py) пишутся на диск одним проходом
+    await get_config_service(bot).close()
@@ -0,0 +1,453 @@
+"""
+Общая шина логов: Logging, AdvancedLogging и Moder -> Discord / Telegram / JSONL.
+
+Производители публикуют LogRecord (bus.publish), шина раздаёт его всем
+подходящим приёмникам. Эмбед записи собирается один раз — при первом
+обращении к record.embed — и общий для всех приёмников; текст для Telegram
+выводится из него и тоже кэшируется в записи.
+
+Приёмники (у каждого своя пачечная отправка и ограниченная очередь):
+- DiscordSink  — канал выбирается маршрутом источника (route(source, resolver)),
+                 эмбеды уходят через EmbedDispatcher (пачки по 10, приоритеты, 429)
+- TelegramSink — склеивает записи в сообщения до 4000 символов раз в `window`
+                 секунд; при переполнении выбрасывает старые записи с наименьшим
+                 приоритетом; 429 — ждёт retry_after из ответа
+- JsonlSink    — дописывает записи строками JSON в файл, пачками, в потоке;
+                 подключается переменной окружения LOG_JSONL_PATH
+"""
+
+import asyncio
+import collections
+import datetime
+import html
+import io
+import json
+import os
+import time
+import typing as t
+
+import aiohttp
+import discord
+
+from utils.embed_dispatcher import PRIORITY_NORMAL, EmbedDispatcher
+
+TELEGRAM_MESSAGE_LIMIT = 4000  # у Telegram 4096, оставляем запас на разметку
+TELEGRAM_CLOSE_TIMEOUT = 15.0  # сколько close() ждёт 429, досылая очередь
+
+
+class LogRecord:
+    """Одно событие лога. Эмбед собирается лениво и один раз на все приёмники."""
+
+    __slots__ = ("guild", "source", "event", "priority", "ts", "attachment", "_build", "_args", "_embed", "_text")
+
+    def __init__(
+            self,
+            guild: discord.Guild,
+            source: str,
+            event: str,
+            build: t.Optional[t.Callable[..., discord.Embed]] = None,
+            args: tuple = (),
+            *,
+            embed: t.Optional[discord.Embed] = None,
+            priority: int = PRIORITY_NORMAL,
+            attachment: t.Optional[tuple[str, bytes]] = None,
+    ):
+        """build(*args) собирает эмбед при первом обращении; готовый можно передать в embed."""
+        self.guild = guild
+        self.source = source
+        self.event = event
+        self.priority = priority
+        self.ts = time.time()
+        self.attachment = attachment  # (имя файла, содержимое) — например, выгрузка bulk delete
+        self._build = build
+        self._args = args
+        self._embed = embed
+        self._text: dict[bool, str] = {}
+
+    @property
+    def embed(self) -> discord.Embed:
+        if self._embed is None:
+            self._embed = self._build(*self._args)
+        return self._embed
+
+    def text(self, simple: bool = False) -> str:
+        """HTML для Telegram: заголовок + поля эмбеда (simple — только заголовок и первое поле)."""
+        text = self._text.get(simple)
+        if text is None:
+            text = self._text[simple] = _embed_text(self.embed, self.attachment, simple)
+        return text
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": self.ts,
+            "guild_id": self.guild.id,
+            "source": self.source,
+            "event": self.event,
+            "priority": self.priority,
+            "embed": self.embed.to_dict(),
+            "attachment": self.attachment[0] if self.attachment else None,
+        }
+
+
+def _escape_clipped(value: str, budget: int) -> str:
+    """html.escape(value) не длиннее budget: режем исходный текст, а не готовую разметку."""
+    escaped = html.escape(value)
+    cut = len(value)
+    while len(escaped) > budget:
+        # сущности удлиняют текст — уменьшаем пропорционально
+        cut = min(cut - 1, cut * (budget - 1) // len(escaped))
+        if cut <= 0:
+            return ""
+        escaped = html.escape(value[:cut]) + "…"
+    return escaped
+
+
+def _embed_text(embed: discord.Embed, attachment: t.Optional[tuple[str, bytes]], simple: bool) -> str:
+    """Текст записи не длиннее TELEGRAM_MESSAGE_LIMIT: обрезаются значения, теги и сущности целы."""
+    lines: list[str] = []
+    tail = ""
+    if not simple:
+        stamp = embed.timestamp or datetime.datetime.now(datetime.timezone.utc)
+        tail = f"<code>{stamp.strftime('%Y-%m-%d %H:%M:%S')}</code>"
+    remaining = TELEGRAM_MESSAGE_LIMIT - len(tail)
+
+    def add(prefix: str, value: str, suffix: str = "") -> None:
+        nonlocal remaining
+        room = remaining - len(prefix) - len(suffix) - 1  # 1 — перевод строки
+        if room <= 0:
+            return
+        clipped = _escape_clipped(value, room)
+        if value and not clipped:
+            return
+        line = prefix + clipped + suffix
+        lines.append(line)
+        remaining -= len(line) + 1
+
+    add("<b>", embed.title or "Лог", "</b>")
+    if embed.description and not simple:
+        add("", embed.description)
+    for field in embed.fields[:1] if simple else embed.fields:
+        add(f"<b>{html.escape(str(field.name)[:256])}:</b> ", str(field.value))
+    if attachment and not simple:
+        add("📎 ", attachment[0])
+    if tail:
+        lines.append(tail)
+    return "\n".join(lines)
+
+
+class Sink(t.Protocol):
+    name: str
+
+    def covers(self, guild: discord.Guild) -> bool: ...
+
+    def accepts(self, record: LogRecord) -> bool: ...
+
+    def emit(self, record: LogRecord) -> None: ...
+
+    def stats(self) -> dict: ...
+
+    async def close(self) -> None: ...
+
+
+class DiscordSink:
+    name = "discord"
+
+    def __init__(self, dispatcher: t.Optional[EmbedDispatcher] = None):
+        self.dispatcher = dispatcher or EmbedDispatcher()
+        self._routes: dict[str, t.Callable[[discord.Guild], t.Optional[discord.abc.Messageable]]] = {}
+        self._file_tasks: set[asyncio.Task] = set()
+
+    def route(self, source: str, resolver: t.Callable[[discord.Guild], t.Optional[discord.abc.Messageable]]) -> None:
+        """resolver(guild) -> канал для записей источника (или None — не отправлять)."""
+        self._routes[source] = resolver
+
+    def unroute(self, source: str) -> None:
+        self._routes.pop(source, None)
+
+    def covers(self, guild: discord.Guild) -> bool:
+        return any(resolve(guild) is not None for resolve in self._routes.values())
+
+    def accepts(self, record: LogRecord) -> bool:
+        # маршрут может вернуть None — такие записи emit() пропускает
+        return record.source in self._routes
+
+    def emit(self, record: LogRecord) -> None:
+        channel = self._routes[record.source](record.guild)
+        if channel is None:
+            return
+        if record.attachment is None:
+            self.dispatcher.submit(channel, record.embed, record.priority)
+            return
+        # файл в пачку эмбедов не положить — отдельное сообщение
+        task = asyncio.create_task(self._send_file(channel, record))
+        self._file_tasks.add(task)
+        task.add_done_callback(self._file_tasks.discard)
+
+    async def _send_file(self, channel: discord.abc.Messageable, record: LogRecord) -> None:
+        filename, data = record.attachment
+        try:
+            await channel.send(embed=record.embed, file=discord.File(io.BytesIO(data), filename=filename))
+            self.dispatcher.sent += 1
+        except discord.HTTPException as e:
+            self.dispatcher.dropped += 1
+            print(f"❌ Не удалось отправить лог с файлом в канал {getattr(channel, 'id', '?')}: {e}")
+
+    def stats(self) -> dict:
+        return self.dispatcher.stats()
+
+    async def close(self) -> None:
+        if self._file_tasks:
+            await asyncio.gather(*self._file_tasks, return_exceptions=True)
+        await self.dispatcher.close()
+
+
+class TelegramSink:
+    name = "telegram"
+
+    def __init__(
+            self,
+            token: str,
+            chat_id: str,
+            *,
+            guild_ids: t.Optional[t.Collection[int]] = None,
+            simple: bool = False,
+            window: float = 3.0,
+            max_pending: int = 500,
+    ):
+        self.token = token
+        self.chat_id = chat_id
+        # None — все серверы; пустое множество — ни одного (сервер ещё не известен)
+        self.guild_ids = set(guild_ids) if guild_ids is not None else None
+        self.simple = simple
+        self.window = window
+        self.max_pending = max_pending
+        self._items: collections.deque[LogRecord] = collections.deque()
+        self._task: t.Optional[asyncio.Task] = None
+        self._session: t.Optional[aiohttp.ClientSession] = None
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.rate_limited = 0
+
+    def covers(self, guild: discord.Guild) -> bool:
+        return self.guild_ids is None or guild.id in self.guild_ids
+
+    def accepts(self, record: LogRecord) -> bool:
+        return self.covers(record.guild)
+
+    def emit(self, record: LogRecord) -> None:
+        items = self._items
+        if len(items) >= self.max_pending:
+            lowest = min(r.priority for r in items)
+            if lowest > record.priority:
+                self.dropped += 1
+                return
+            for i, queued in enumerate(items):
+                if queued.priority == lowest:
+                    del items[i]
+                    break
+            self.dropped += 1
+        items.append(record)
+        self.queued += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        delay = self.window
+        while self._items:
+            await asyncio.sleep(delay)
+            delay = await self._flush() or self.window
+
+    async def _flush(self) -> t.Optional[float]:
+        """Отправляет очередь сообщениями до лимита Telegram. Число — ждать столько секунд (429)."""
+        items = self._items
+        while items:
+            # записи снимаем с очереди до отправки: вытеснение в emit() не должно
+            # задеть те, что уже в полёте
+            taken: list[LogRecord] = []
+            parts: list[str] = []
+            size = 0
+            while items:
+                text = items[0].text(self.simple)
+                if parts and size + len(text) + 2 > TELEGRAM_MESSAGE_LIMIT:
+                    break
+                taken.append(items.popleft())
+                parts.append(text)
+                size += len(text) + 2
+            count = len(taken)
+            try:
+                ok, retry_after = await self._post("\n\n".join(parts))
+            except asyncio.CancelledError:
+                items.extendleft(reversed(taken))
+                raise
+            if retry_after is not None:
+                items.extendleft(reversed(taken))
+                self.rate_limited += 1
+                return retry_after
+            if ok:
+                self.sent += count
+            else:
+                self.dropped += count
+        return None
+
+    async def _post(self, text: str) -> tuple[bool, t.Optional[float]]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        payload = {"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"}
+        try:
+            async with self._session.post(url, json=payload) as response:
+                if response.status == 200:
+                    return True, None
+                if response.status == 429:
+                    data = await response.json(content_type=None)
+                    return False, float(data.get("parameters", {}).get("retry_after", self.window * 2))
+                print(f"❌ Ошибка отправки в Telegram: {await response.text()}")
+        except Exception as e:
+            print(f"❌ Ошибка соединения с Telegram: {e}")
+        return False, None
+
+    async def send_text(self, text: str) -> bool:
+        """Отправка произвольного текста в обход очереди (тесты моста)."""
+        success = True
+        for start in range(0, len(text), TELEGRAM_MESSAGE_LIMIT):
+            ok, _ = await self._post(text[start:start + TELEGRAM_MESSAGE_LIMIT])
+            success = success and ok
+        return success
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "rate_limited": self.rate_limited,
+            "backlog": len(self._items),
+        }
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            # ждём отмену: прерванная пачка должна вернуться в очередь
+            await asyncio.gather(self._task, return_exceptions=True)
+        # после 429 записи возвращаются в очередь — досылаем, пока не истечёт срок
+        deadline = time.monotonic() + TELEGRAM_CLOSE_TIMEOUT
+        while self._items:
+            retry_after = await self._flush()
+            if retry_after is None:
+                break
+            if time.monotonic() + retry_after > deadline:
+                self.dropped += len(self._items)
+                self._items.clear()
+                break
+            await asyncio.sleep(retry_after)
+        if self._session is not None:
+            await self._session.close()
+
+
+def _append_lines(path: str, rows: list[dict]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+
+
+class JsonlSink:
+    name = "jsonl"
+
+    def __init__(self, path: str, *, window: float = 2.0, max_pending: int = 5000):
+        self.path = path
+        self.window = window
+        self.max_pending = max_pending
+        self._rows: list[dict] = []
+        self._task: t.Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    def covers(self, guild: discord.Guild) -> bool:
+        return True
+
+    def accepts(self, record: LogRecord) -> bool:
+        return True
+
+    def emit(self, record: LogRecord) -> None:
+        if len(self._rows) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._rows.append(record.to_dict())
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self._rows:
+            await asyncio.sleep(self.window)
+            await self._flush()
+
+    async def _flush(self) -> None:
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        try:
+            await asyncio.to_thread(_append_lines, self.path, rows)
+            self.written += len(rows)
+        except OSError as e:
+            self.dropped += len(rows)
+            print(f"❌ Не удалось записать логи в {self.path}: {e}")
+
+    def stats(self) -> dict:
+        return {"written": self.written, "dropped": self.dropped, "backlog": len(self._rows)}
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        await self._flush()
+
+
+class LogBus:
+    def __init__(self):
+        self.discord = DiscordSink()
+        self._sinks: list[Sink] = [self.discord]
+        self.published = 0
+
+    def add_sink(self, sink: Sink) -> None:
+        if sink not in self._sinks:
+            self._sinks.append(sink)
+
+    def remove_sink(self, sink: Sink) -> None:
+        if sink in self._sinks:
+            self._sinks.remove(sink)
+
+    def delivers(self, guild: discord.Guild) -> bool:
+        """Есть ли у логов сервера получатель помимо Discord-маршрутов (Telegram, JSONL)."""
+        for sink in self._sinks:
+            if sink is not self.discord and sink.covers(guild):
+                return True
+        return False
+
+    def publish(self, record: LogRecord) -> None:
+        """Раздаёт запись приёмникам (без ожидания сети)."""
+        self.published += 1
+        for sink in self._sinks:
+            if sink.accepts(record):
+                try:
+                    sink.emit(record)
+                except Exception as e:
+                    print(f"❌ Ошибка приёмника логов {sink.name}: {e}")
+
+    def stats(self) -> dict:
+        return {"published": self.published, **{sink.name: sink.stats() for sink in self._sinks}}
+
+    async def close(self) -> None:
+        for sink in self._sinks:
+            await sink.close()
+
+
+def get_log_bus(bot) -> LogBus:
+    """Общая шина логов бота (создаётся при первом обращении)."""
+    bus = getattr(bot, "log_bus", None)
+    if bus is None:
+        bus = LogBus()
+        path = os.getenv("LOG_JSONL_PATH")
+        if path:
+            bus.add_sink(JsonlSink(path))
+        bot.log_bus = bus
+    return bus
@@ -0,0 +1,274 @@
+"""
+Компактный кэш текста недавних сообщений для логов удаления и правки.
+
+Кэш discord.py на активных серверах прокручивается за минуты, после чего
+on_message_delete / on_message_edit уже не срабатывают. Raw-события приходят
+всегда, но без старого текста — его берём отсюда:
+
+    cache = get_message_cache(bot)
+    cache.add(message)                              # из on_message
+    record = await cache.take(payload.message_id)   # из on_raw_message_delete
+
+- запись — объект со __slots__ (id, канал, автор, текст, число вложений);
+  id каналов и авторов интернируются, тысячи сообщений одного автора делят один int
+- память ограничена max_bytes (текст + накладные расходы записи): сначала
+  выбрасываются записи старше max_age, затем самые старые
+- со spill_path вытесненные по памяти записи дописываются в файл и читаются
+  оттуда при промахе; файл ограничен spill_max_bytes и при переполнении
+  начинается заново
+"""
+
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+import typing as t
+
+import discord
+
+RECORD_OVERHEAD = 200  # объект записи + место в OrderedDict, байт (CPython, 64 бит)
+
+
+def _created(message_id: int) -> float:
+    """Время создания сообщения (unix, секунды) прямо из snowflake."""
+    return ((message_id >> 22) + discord.utils.DISCORD_EPOCH) / 1000
+
+
+class CachedMessage:
+    __slots__ = ("id", "channel_id", "author_id", "content", "attachments")
+
+    def __init__(self, message_id: int, channel_id: int, author_id: int, content: str, attachments: int):
+        self.id = message_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.content = content
+        self.attachments = attachments
+
+    @property
+    def created_at(self) -> float:
+        return _created(self.id)
+
+    @property
+    def size(self) -> int:
+        return RECORD_OVERHEAD + sys.getsizeof(self.content)
+
+    def to_row(self) -> list:
+        return [self.id, self.channel_id, self.author_id, self.content, self.attachments]
+
+
+def _write_rows(path: str, rows: list[list], truncate: bool) -> tuple[list[tuple[int, int]], int]:
+    """Дописывает строки JSON; возвращает (смещение, длина) каждой и новый размер файла."""
+    spans = []
+    with open(path, "wb" if truncate else "ab") as f:
+        offset = f.tell()
+        for row in rows:
+            line = json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(line)
+            spans.append((offset, len(line)))
+            offset += len(line)
+    return spans, offset
+
+
+def _read_row(path: str, offset: int, length: int) -> t.Optional[list]:
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+    except (OSError, ValueError):
+        return None
+
+
+class MessageCache:
+    def __init__(
+            self,
+            *,
+            max_bytes: int = 16 * 1024 * 1024,
+            max_age: float = 24 * 3600,
+            spill_path: t.Optional[str] = None,
+            spill_max_bytes: int = 64 * 1024 * 1024,
+            spill_window: float = 1.0,
+    ):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.spill_window = spill_window
+        # id сообщения -> запись; порядок вставки = порядок появления сообщений
+        self._records: collections.OrderedDict[int, CachedMessage] = collections.OrderedDict()
+        self._ids: dict[int, int] = {}  # интернированные id каналов и авторов
+        self.bytes = 0
+
+        self._spill_index: dict[int, tuple[int, int]] = {}  # id -> (смещение, длина) в файле
+        self._spill_pending: dict[int, CachedMessage] = {}
+        self._spill_writing: dict[int, CachedMessage] = {}
+        self._spill_size = 0
+        self._spill_task: t.Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.spilled = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def stats(self) -> dict:
+        return {
+            "records": len(self._records),
+            "bytes": self.bytes,
+            "on_disk": len(self._spill_index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "spilled": self.spilled,
+        }
+
+    def _intern(self, value: int) -> int:
+        return self._ids.setdefault(value, value)
+
+    def add(self, message: discord.Message) -> None:
+        """Запоминает (или обновляет после правки) текст сообщения."""
+        record = self._records.get(message.id)
+        if record is not None:
+            self.bytes -= record.size
+            record.content = message.content
+            record.attachments = len(message.attachments)
+        else:
+            if not message.content and not message.attachments:
+                return
+            if _created(message.id) < time.time() - self.max_age:
+                return  # правка давнего сообщения — в хвост очереди по возрасту не ставим
+            record = CachedMessage(
+                message.id,
+                self._intern(message.channel.id),
+                self._intern(message.author.id),
+                message.content,
+                len(message.attachments),
+            )
+            self._records[message.id] = record
+            self._forget_spilled(message.id)
+        self.bytes += record.size
+        self._trim()
+
+    def get(self, message_id: int) -> t.Optional[CachedMessage]:
+        """Запись из памяти (без чтения файла)."""
+        return (self._records.get(message_id)
+                or self._spill_pending.get(message_id)
+                or self._spill_writing.get(message_id))
+
+    async def fetch(self, message_id: int) -> t.Optional[CachedMessage]:
+        """Запись из памяти или с диска; None — сообщение старше кэша."""
+        record = self.get(message_id)
+        if record is None and message_id in self._spill_index:
+            offset, length = self._spill_index[message_id]
+            row = await asyncio.to_thread(_read_row, self.spill_path, offset, length)
+            # файл мог начаться заново, пока мы читали, — сверяем id
+            if row is not None and row[0] == message_id and _created(message_id) >= time.time() - self.max_age:
+                record = CachedMessage(*row)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    async def take(self, message_id: int) -> t.Optional[CachedMessage]:
+        """fetch() + discard(): для удалённых сообщений."""
+        record = await self.fetch(message_id)
+        self.discard(message_id)
+        return record
+
+    def discard(self, message_id: int) -> None:
+        record = self._records.pop(message_id, None)
+        if record is not None:
+            self.bytes -= record.size
+        self._forget_spilled(message_id)
+
+    def _forget_spilled(self, message_id: int) -> None:
+        self._spill_pending.pop(message_id, None)
+        self._spill_writing.pop(message_id, None)
+        self._spill_index.pop(message_id, None)
+
+    def _trim(self) -> None:
+        records = self._records
+        horizon = time.time() - self.max_age
+        while records:
+            message_id = next(iter(records))
+            if _created(message_id) >= horizon:
+                break
+            self.bytes -= records.pop(message_id).size
+            self.expired += 1
+
+        while self.bytes > self.max_bytes and records:
+            message_id, record = records.popitem(last=False)
+            self.bytes -= record.size
+            self.evicted += 1
+            if self.spill_path:
+                self._spill_pending[message_id] = record
+
+        if len(self._ids) > 2 * len(records) + 1024:
+            # авторы и каналы вытесненных сообщений больше не нужны
+            self._ids = {}
+            for record in records.values():
+                record.channel_id = self._intern(record.channel_id)
+                record.author_id = self._intern(record.author_id)
+
+        if self._spill_pending and (self._spill_task is None or self._spill_task.done()):
+            self._spill_task = asyncio.create_task(self._drain_spill())
+
+    async def _drain_spill(self) -> None:
+        while self._spill_pending:
+            await asyncio.sleep(self.spill_window)
+            await self._flush_spill()
+
+    async def _flush_spill(self) -> None:
+        if not self._spill_pending:
+            return
+        writing = self._spill_writing = self._spill_pending
+        self._spill_pending = {}
+        ids = list(writing)
+        truncate = self._spill_size >= self.spill_max_bytes
+        try:
+            spans, self._spill_size = await asyncio.to_thread(
+                _write_rows, self.spill_path, [writing[i].to_row() for i in ids], truncate
+            )
+        except OSError as e:
+            print(f"❌ Не удалось записать кэш сообщений в {self.spill_path}: {e}")
+            spans = None
+        self._spill_writing = {}
+        if spans is None:
+            return
+
+        if truncate:
+            self._spill_index.clear()
+        for message_id, span in zip(ids, spans):
+            # удалённые во время записи остаются в файле, но без индекса
+            if message_id in writing:
+                self._spill_index[message_id] = span
+        self.spilled += len(ids)
+
+    async def close(self) -> None:
+        """Останавливает запись на диск и удаляет файл: после перезапуска он не нужен."""
+        if self._spill_task is not None:
+            self._spill_task.cancel()
+        self._records.clear()
+        self._spill_pending.clear()
+        self._spill_index.clear()
+        self.bytes = 0
+        if self.spill_path and os.path.exists(self.spill_path):
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+
+
+def get_message_cache(bot) -> MessageCache:
+    """Общий кэш сообщений бота (создаётся при первом обращении)."""
+    cache = getattr(bot, "message_cache", None)
+    if cache is None:
+        cache = MessageCache(spill_path=os.getenv("MESSAGE_CACHE_SPILL_PATH") or None)
+        bot.message_cache = cache
+    return cache
@@ -0,0 +1,317 @@
+"""
+Хранилища состояния модерации (варны, мьюты, конфиг серверов).
+
+В памяти Moder всегда держит словари (быстрое чтение в автомоде),
+а бэкенд отвечает только за сохранение точечных изменений:
+
+- JsonModerationStorage   — JSON-файлы с отложенной записью (по умолчанию)
+- SqliteModerationStorage — SQLite с индексами; все запросы идут через
+  отдельный поток, цикл событий не блокируется
+
+Выбор бэкенда: переменная окружения MODERATION_STORAGE=json|sqlite.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import sqlite3
+import time
+import typing as t
+
+from utils.json_store import JsonStore, load_json
+from utils.warning_ledger import HISTORY_LIMIT, upgrade_legacy
+
+
+class JsonModerationStorage:
+    """Три JSON-файла; любое изменение помечает соответствующий файл к записи."""
+
+    def __init__(self, warnings_file: str, config_file: str, mutes_file: str):
+        self._warnings = JsonStore(warnings_file, {})
+        self._config = JsonStore(config_file, {})
+        self._mutes = JsonStore(mutes_file, {})
+
+    def load(self) -> tuple[dict, dict, dict]:
+        """(warnings, config, mutes) — те же объекты, что пишутся на диск."""
+        if upgrade_legacy(self._warnings.data):
+            self._warnings.mark_dirty()
+        return self._warnings.data, self._config.data, self._mutes.data
+
+    def warning_added(self, guild_id: int, user_id: int, entry: dict) -> None:
+        self._warnings.mark_dirty()
+
+    def warnings_cleared(self, guild_id: int, user_id: int, cleared_at: float) -> None:
+        self._warnings.mark_dirty()
+
+    def mute_set(self, guild_id: int, user_id: int, unmute_ts: float) -> None:
+        self._mutes.mark_dirty()
+
+    def mute_removed(self, guild_id: int, user_id: int) -> None:
+        self._mutes.mark_dirty()
+
+    def config_changed(self, guild_id: int, cfg: dict) -> None:
+        self._config.mark_dirty()
+
+    async def flush(self) -> None:
+        for store in (self._warnings, self._config, self._mutes):
+            await store.flush()
+
+    async def close(self) -> None:
+        await self.flush()
+
+
+_SCHEMA = """
+-- warnings: счётчики из версий до журнала предупреждений (только для миграции)
+CREATE TABLE IF NOT EXISTS warnings (
+    guild_id INTEGER NOT NULL,
+    user_id  INTEGER NOT NULL,
+    count    INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS warning_history (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    user_id  INTEGER NOT NULL,
+    ts       REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_warning_history_user ON warning_history (guild_id, user_id, ts);
+CREATE TABLE IF NOT EXISTS warning_clears (
+    guild_id   INTEGER NOT NULL,
+    user_id    INTEGER NOT NULL,
+    cleared_at REAL    NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS mutes (
+    guild_id  INTEGER NOT NULL,
+    user_id   INTEGER NOT NULL,
+    unmute_ts REAL    NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_mutes_expiry ON mutes (unmute_ts);
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id INTEGER PRIMARY KEY,
+    data     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# колонки, добавленные в warning_history вместе с журналом предупреждений
+_HISTORY_COLUMNS = (
+    ("reason", "TEXT"),
+    ("moderator", "TEXT"),
+    ("moderator_id", "INTEGER"),
+    ("message", "TEXT"),
+    ("content", "TEXT"),
+)
+
+_INSERT_HISTORY = (
+    "INSERT INTO warning_history (guild_id, user_id, ts, reason, moderator, moderator_id, message, content) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _history_row(guild_id: int, user_id: int, entry: dict) -> tuple:
+    return (
+        guild_id, user_id, entry["ts"], entry.get("reason"), entry.get("moderator"),
+        entry.get("moderator_id"), entry.get("message"), entry.get("content"),
+    )
+
+
+class SqliteModerationStorage:
+    """
+    SQLite-бэкенд. Соединение живёт в единственном потоке executor'а,
+    записи ставятся в его очередь и выполняются по порядку.
+    """
+
+    def __init__(self, db_path: str, *, import_from: t.Optional[tuple[str, str, str]] = None):
+        self.db_path = db_path
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="moderation-db")
+        self._conn: t.Optional[sqlite3.Connection] = None
+        self._call(self._open)
+        if import_from is not None:
+            self._call(self._import_json, *import_from)
+
+    # ----- поток БД -----
+
+    def _open(self) -> None:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(warning_history)")}
+        for column, sql_type in _HISTORY_COLUMNS:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE warning_history ADD COLUMN {column} {sql_type}")
+        conn.commit()
+        self._conn = conn
+        self._migrate_warning_counts()
+
+    def _migrate_warning_counts(self) -> None:
+        """
+        Старые БД хранили текущий счётчик в warnings, а историю без отметки сброса.
+        Всё, что старше последних `count` записей, считаем снятым.
+        """
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'warning_ledger'").fetchone():
+            return
+        counts = {
+            (gid, uid): count
+            for gid, uid, count in conn.execute("SELECT guild_id, user_id, count FROM warnings")
+        }
+        history: dict[tuple[int, int], list[float]] = {}
+        for gid, uid, ts in conn.execute(
+                "SELECT guild_id, user_id, ts FROM warning_history ORDER BY guild_id, user_id, ts, id"):
+            history.setdefault((gid, uid), []).append(ts)
+
+        with conn:
+            for (gid, uid), stamps in history.items():
+                active = counts.get((gid, uid), 0)
+                if active < len(stamps):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO warning_clears (guild_id, user_id, cleared_at) VALUES (?, ?, ?)",
+                        (gid, uid, stamps[len(stamps) - active - 1]),
+                    )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('warning_ledger', ?)", (str(time.time()),))
+
+    def _call(self, fn, *args):
+        """Синхронно выполнить fn в потоке БД (только при запуске/миграции)."""
+        return self._executor.submit(fn, *args).result()
+
+    def _submit(self, sql: str, params: tuple = ()) -> None:
+        """Поставить запись в очередь потока БД, не дожидаясь результата."""
+        future = self._executor.submit(self._execute, sql, params)
+        future.add_done_callback(self._report_error)
+
+    def _execute(self, sql: str, params: tuple) -> None:
+        self._conn.execute(sql, params)
+        self._conn.commit()
+
+    @staticmethod
+    def _report_error(future: concurrent.futures.Future) -> None:
+        exc = future.exception()
+        if exc is not None:
+            print(f"❌ Ошибка записи в БД модерации: {exc}")
+
+    def _import_json(self, warnings_file: str, config_file: str, mutes_file: str) -> None:
+        """Одноразовый импорт из JSON-файлов (если БД ещё не заполнялась)."""
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return
+
+        warnings = load_json(warnings_file, {}) or {}
+        config = load_json(config_file, {}) or {}
+        mutes = load_json(mutes_file, {}) or {}
+        now = time.time()
+        upgrade_legacy(warnings, now)
+
+        with conn:
+            for gid, users in warnings.items():
+                for uid, record in users.items():
+                    conn.executemany(
+                        _INSERT_HISTORY,
+                        [_history_row(int(gid), int(uid), entry) for entry in record["entries"]],
+                    )
+                    if record.get("cleared_at"):
+                        conn.execute(
+                            "INSERT OR REPLACE INTO warning_clears (guild_id, user_id, cleared_at) VALUES (?, ?, ?)",
+                            (int(gid), int(uid), record["cleared_at"]),
+                        )
+            for gid, cfg in config.items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO guild_config (guild_id, data) VALUES (?, ?)",
+                    (int(gid), json.dumps(cfg, ensure_ascii=False)),
+                )
+            for gid, users in mutes.items():
+                for uid, ts in users.items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO mutes (guild_id, user_id, unmute_ts) VALUES (?, ?, ?)",
+                        (int(gid), int(uid), float(ts)),
+                    )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (str(now),))
+        print(f"✅ Данные модерации импортированы из JSON в {self.db_path}")
+
+    def _load(self) -> tuple[dict, dict, dict]:
+        conn = self._conn
+        warnings: dict = {}
+        rows = conn.execute(
+            "SELECT guild_id, user_id, ts, reason, moderator, moderator_id, message, content "
+            "FROM warning_history ORDER BY guild_id, user_id, ts, id"
+        )
+        for gid, uid, ts, reason, moderator, moderator_id, message, content in rows:
+            record = warnings.setdefault(str(gid), {}).setdefault(str(uid), {"entries": [], "cleared_at": None})
+            record["entries"].append({
+                "ts": ts,
+                "reason": reason,
+                "moderator": moderator,
+                "moderator_id": moderator_id,
+                "message": message,
+                "content": content,
+            })
+        for gid, uid, cleared_at in conn.execute("SELECT guild_id, user_id, cleared_at FROM warning_clears"):
+            record = warnings.setdefault(str(gid), {}).setdefault(str(uid), {"entries": [], "cleared_at": None})
+            record["cleared_at"] = cleared_at
+        for users in warnings.values():
+            for record in users.values():
+                del record["entries"][:-HISTORY_LIMIT]
+        config: dict = {}
+        for gid, data in conn.execute("SELECT guild_id, data FROM guild_config"):
+            config[str(gid)] = json.loads(data)
+        mutes: dict = {}
+        for gid, uid, ts in conn.execute("SELECT guild_id, user_id, unmute_ts FROM mutes"):
+            mutes.setdefault(str(gid), {})[str(uid)] = ts
+        return warnings, config, mutes
+
+    # ----- интерфейс хранилища -----
+
+    def load(self) -> tuple[dict, dict, dict]:
+        return self._call(self._load)
+
+    def warning_added(self, guild_id: int, user_id: int, entry: dict) -> None:
+        self._submit(_INSERT_HISTORY, _history_row(guild_id, user_id, entry))
+
+    def warnings_cleared(self, guild_id: int, user_id: int, cleared_at: float) -> None:
+        # история остаётся, запоминается только момент сброса
+        self._submit(
+            "INSERT OR REPLACE INTO warning_clears (guild_id, user_id, cleared_at) VALUES (?, ?, ?)",
+            (guild_id, user_id, cleared_at),
+        )
+
+    def mute_set(self, guild_id: int, user_id: int, unmute_ts: float) -> None:
+        self._submit(
+            "INSERT INTO mutes (guild_id, user_id, unmute_ts) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id, user_id) DO UPDATE SET unmute_ts = excluded.unmute_ts",
+            (guild_id, user_id, unmute_ts),
+        )
+
+    def mute_removed(self, guild_id: int, user_id: int) -> None:
+        self._submit("DELETE FROM mutes WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+
+    def config_changed(self, guild_id: int, cfg: dict) -> None:
+        # сериализуем сейчас: словарь может измениться до выполнения запроса
+        self._submit(
+            "INSERT OR REPLACE INTO guild_config (guild_id, data) VALUES (?, ?)",
+            (guild_id, json.dumps(cfg, ensure_ascii=False)),
+        )
+
+    async def flush(self) -> None:
+        # поток один, поэтому пустая задача завершится после всех поставленных записей
+        await asyncio.get_running_loop().run_in_executor(self._executor, lambda: None)
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._conn is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+
+def create_storage(warnings_file: str, config_file: str, mutes_file: str):
+    """Бэкенд по переменным окружения MODERATION_STORAGE / MODERATION_DB."""
+    backend = os.getenv("MODERATION_STORAGE", "json").lower()
+    if backend == "sqlite":
+        db_path = os.getenv("MODERATION_DB", "moderation.db")
+        return SqliteModerationStorage(db_path, import_from=(warnings_file, config_file, mutes_file))
+    return JsonModerationStorage(warnings_file, config_file, mutes_file)
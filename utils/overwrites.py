@@ -0,0 +1,53 @@
+"""
+Массовая установка прав (permission overwrites) по каналам сервера.
+
+Запросы идут параллельно, но не более `concurrency` одновременно:
+у каждого канала свой rate-limit bucket, а глобальный лимит и 429
+обрабатывает HTTP-клиент discord.py — семафор не даёт упереться в него разом.
+"""
+
+import asyncio
+import typing as t
+
+import discord
+
+ProgressCallback = t.Callable[[int, int], t.Awaitable[None]]
+
+DEFAULT_CONCURRENCY = 5
+
+
+def overwrite_missing(channel: discord.abc.GuildChannel, target: discord.Role,
+                      desired: discord.PermissionOverwrite) -> bool:
+    """True, если у канала нет нужных значений прав для target."""
+    current = channel.overwrites_for(target)
+    return any(getattr(current, name) != value for name, value in desired if value is not None)
+
+
+async def apply_overwrites(
+        channels: t.Sequence[discord.abc.GuildChannel],
+        target: discord.Role,
+        desired: discord.PermissionOverwrite,
+        *,
+        reason: t.Optional[str] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        progress: t.Optional[ProgressCallback] = None,
+) -> tuple[int, list[discord.abc.GuildChannel]]:
+    """Применяет desired к каналам. Возвращает (успешно, каналы с ошибкой)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(channels)
+    done = 0
+    failed: list[discord.abc.GuildChannel] = []
+
+    async def apply(channel: discord.abc.GuildChannel):
+        nonlocal done
+        async with semaphore:
+            try:
+                await channel.set_permissions(target, overwrite=desired, reason=reason)
+            except discord.HTTPException:
+                failed.append(channel)
+            done += 1
+            if progress is not None:
+                await progress(done, total)
+
+    await asyncio.gather(*(apply(channel) for channel in channels))
+    return done - len(failed), failed
@@ -0,0 +1,54 @@
+"""Постраничный просмотр длинных списков в эмбедах (кнопки ◀ / ▶)."""
+
+import typing as t
+
+import discord
+
+
+class EmbedPaginator(discord.ui.View):
+    """
+    render(page) строит эмбед только для текущей страницы,
+    поэтому список из тысяч элементов не форматируется целиком.
+    """
+
+    def __init__(
+            self,
+            author_id: int,
+            page_count: int,
+            render: t.Callable[[int], discord.Embed],
+            timeout: float = 180.0,
+    ):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.page_count = max(1, page_count)
+        self.render = render
+        self.page = 0
+        self._update_buttons()
+
+    @staticmethod
+    def pages_for(total_items: int, per_page: int) -> int:
+        return max(1, (total_items + per_page - 1) // per_page)
+
+    def _update_buttons(self):
+        self.prev_button.disabled = self.page <= 0
+        self.next_button.disabled = self.page >= self.page_count - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Эти кнопки не для вас.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction):
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.render(self.page), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(self.page_count - 1, self.page + 1)
+        await self._show(interaction)
@@ -0,0 +1,87 @@
+"""
+Лестница наказаний по количеству предупреждений.
+
+Конфиг сервера хранит шаги списком:
+
+    "punishment_ladder": [{"warns": 3, "action": "timeout", "minutes": 10}, ...]
+    "flood_punishment":  {"action": "timeout", "minutes": 5}
+
+compile_ladder() превращает их в PunishmentLadder со словарём
+{число варнов: шаг} — проверка в автомоде стоит один поиск в dict.
+"""
+
+import typing as t
+
+ACTIONS = ("warn", "timeout", "mute", "kick", "ban")
+TIMED_ACTIONS = ("timeout", "mute")
+
+MAX_TIMEOUT_MINUTES = 28 * 24 * 60  # предел Discord для тайм-аута
+
+DEFAULT_LADDER = [{"warns": 3, "action": "timeout", "minutes": 10}]
+DEFAULT_FLOOD_PUNISHMENT = {"action": "timeout", "minutes": 5}
+
+
+class PunishmentStep(t.NamedTuple):
+    action: str
+    minutes: t.Optional[int] = None  # None — бессрочно (для mute) / не используется
+
+
+class PunishmentLadder(t.NamedTuple):
+    steps: dict[int, PunishmentStep]
+    max_warnings: int
+    flood: PunishmentStep
+
+
+def _step(raw: dict) -> t.Optional[PunishmentStep]:
+    action = raw.get("action")
+    if action not in ACTIONS:
+        return None
+    minutes = raw.get("minutes")
+    if action not in TIMED_ACTIONS:
+        minutes = None
+    elif action == "timeout":
+        # тайм-аут не бывает бессрочным
+        minutes = min(int(minutes or 10), MAX_TIMEOUT_MINUTES)
+    elif minutes is not None:
+        minutes = int(minutes)
+    return PunishmentStep(action, minutes)
+
+
+def compile_ladder(cfg: dict) -> PunishmentLadder:
+    """Конфиг сервера -> таблица поиска (битые шаги пропускаются)."""
+    steps: dict[int, PunishmentStep] = {}
+    for raw in cfg.get("punishment_ladder") or DEFAULT_LADDER:
+        step = _step(raw)
+        warns = raw.get("warns")
+        if step is not None and isinstance(warns, int) and warns > 0:
+            steps[warns] = step
+    if not steps:
+        steps = {raw["warns"]: _step(raw) for raw in DEFAULT_LADDER}
+    flood = _step(cfg.get("flood_punishment") or DEFAULT_FLOOD_PUNISHMENT) or _step(DEFAULT_FLOOD_PUNISHMENT)
+    return PunishmentLadder(steps, max(steps), flood)
+
+
+def format_minutes(minutes: t.Optional[int]) -> str:
+    if minutes is None:
+        return "бессрочно"
+    if minutes % 1440 == 0:
+        return f"{minutes // 1440} дн."
+    if minutes % 60 == 0:
+        return f"{minutes // 60} ч."
+    return f"{minutes} мин."
+
+
+ACTION_NAMES = {
+    "warn": "только предупреждение",
+    "timeout": "тайм-аут",
+    "mute": "мьют (роль Muted)",
+    "kick": "кик",
+    "ban": "бан",
+}
+
+
+def describe_step(step: PunishmentStep) -> str:
+    name = ACTION_NAMES[step.action]
+    if step.action in TIMED_ACTIONS:
+        return f"{name} — {format_minutes(step.minutes)}"
+    return name
@@ -0,0 +1,148 @@
+"""
+Журнал предупреждений с историей и «затуханием».
+
+Формат данных (тот же словарь пишется в warnings.json):
+
+    {guild_id: {user_id: {"entries": [{"ts", "reason", "moderator",
+                                       "moderator_id", "message", "content"}, ...],
+                          "cleared_at": ts | None}}}
+
+Записи идут по возрастанию ts. Активными считаются записи новее
+max(cleared_at, now - decay). Для каждого пользователя хранится курсор
+на первую активную запись: он только сдвигается вперёд, поэтому
+count() — амортизированное O(1), без фоновой чистки.
+"""
+
+import time
+import typing as t
+
+HISTORY_LIMIT = 100  # сколько последних записей держать на пользователя
+
+
+def upgrade_legacy(data: dict, now: t.Optional[float] = None) -> bool:
+    """Переводит старый формат {uid: count} в журнал. True — если что-то изменилось."""
+    now = time.time() if now is None else now
+    changed = False
+    for users in data.values():
+        for uid, value in list(users.items()):
+            if isinstance(value, int):
+                users[uid] = {
+                    "entries": [
+                        {"ts": now, "reason": "(выдано до ведения истории)", "moderator": None,
+                         "moderator_id": None, "message": None, "content": None}
+                        for _ in range(value)
+                    ],
+                    "cleared_at": None,
+                }
+                changed = True
+    return changed
+
+
+class WarningLedger:
+    def __init__(self, data: dict):
+        self.data = data
+        self._cursors: dict[tuple[str, str], int] = {}
+        self._decay: dict[str, float] = {}  # guild_id -> секунды (нет ключа — не затухают)
+
+    def set_decay(self, guild_id: int, days: t.Optional[float]) -> None:
+        gid = str(guild_id)
+        if days:
+            self._decay[gid] = days * 86400
+        else:
+            self._decay.pop(gid, None)
+        # срок мог увеличиться — курсоры сервера пересчитаются при следующем чтении
+        for key in [k for k in self._cursors if k[0] == gid]:
+            del self._cursors[key]
+
+    def decay_days(self, guild_id: int) -> t.Optional[float]:
+        seconds = self._decay.get(str(guild_id))
+        return seconds / 86400 if seconds else None
+
+    def _record(self, gid: str, uid: str) -> t.Optional[dict]:
+        return self.data.get(gid, {}).get(uid)
+
+    def _cutoff(self, gid: str, record: dict, now: float) -> float:
+        cutoff = record.get("cleared_at") or 0.0
+        decay = self._decay.get(gid)
+        if decay:
+            cutoff = max(cutoff, now - decay)
+        return cutoff
+
+    def count(self, guild_id: int, user_id: int, now: t.Optional[float] = None) -> int:
+        """Число активных предупреждений."""
+        gid, uid = str(guild_id), str(user_id)
+        record = self._record(gid, uid)
+        if record is None:
+            return 0
+        now = time.time() if now is None else now
+        entries = record["entries"]
+        cutoff = self._cutoff(gid, record, now)
+        key = (gid, uid)
+        cursor = self._cursors.get(key, 0)
+        while cursor < len(entries) and entries[cursor]["ts"] <= cutoff:
+            cursor += 1
+        self._cursors[key] = cursor
+        return len(entries) - cursor
+
+    def is_active(self, guild_id: int, user_id: int, entry: dict, now: t.Optional[float] = None) -> bool:
+        gid, uid = str(guild_id), str(user_id)
+        record = self._record(gid, uid)
+        if record is None:
+            return False
+        now = time.time() if now is None else now
+        return entry["ts"] > self._cutoff(gid, record, now)
+
+    def add(
+            self,
+            guild_id: int,
+            user_id: int,
+            *,
+            reason: str,
+            moderator: t.Optional[str] = None,
+            moderator_id: t.Optional[int] = None,
+            message: t.Optional[str] = None,
+            content: t.Optional[str] = None,
+            ts: t.Optional[float] = None,
+    ) -> tuple[dict, int]:
+        """Добавляет запись; возвращает (запись, число активных предупреждений)."""
+        gid, uid = str(guild_id), str(user_id)
+        ts = time.time() if ts is None else ts
+        record = self.data.setdefault(gid, {}).setdefault(uid, {"entries": [], "cleared_at": None})
+        entries = record["entries"]
+        if entries and entries[-1]["ts"] > ts:
+            ts = entries[-1]["ts"]  # порядок записей важен для курсора
+        entry = {
+            "ts": ts,
+            "reason": reason,
+            "moderator": moderator,
+            "moderator_id": moderator_id,
+            "message": message,
+            "content": content,
+        }
+        entries.append(entry)
+
+        overflow = len(entries) - HISTORY_LIMIT
+        if overflow > 0:
+            del entries[:overflow]
+            key = (gid, uid)
+            if key in self._cursors:
+                self._cursors[key] = max(0, self._cursors[key] - overflow)
+        return entry, self.count(guild_id, user_id, ts)
+
+    def clear(self, guild_id: int, user_id: int, ts: t.Optional[float] = None) -> bool:
+        """Снимает все активные предупреждения (история остаётся)."""
+        gid, uid = str(guild_id), str(user_id)
+        record = self._record(gid, uid)
+        if record is None:
+            return False
+        ts = time.time() if ts is None else ts
+        if record["entries"]:
+            ts = max(ts, record["entries"][-1]["ts"])
+        record["cleared_at"] = ts
+        self._cursors[(gid, uid)] = len(record["entries"])
+        return True
+
+    def history(self, guild_id: int, user_id: int) -> list[dict]:
+        """Все записи пользователя, от новых к старым."""
+        record = self._record(str(guild_id), str(user_id))
+        return list(reversed(record["entries"])) if record else []